@@ -2,557 +2,891 @@
 # Converts mitsuba (2.0) project file to Ignis scene description
 
 import argparse
+import hashlib
 import json
+import math
 import numpy as np
 from pathlib import Path
 from lxml import etree
 import re
 import os
+import shutil
+import struct
+import tempfile
+import time
+import zlib
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
 
-lightCount = 0
-nameCount = 0
-matCount = 0
-texCount = 0
-defaults = {}
-bsdfs = []
-textures = []
 
+CamelCasePattern = pattern = re.compile(
+    r'((?<=[a-z0-9])[A-Z]|(?!^)[A-Z](?=[a-z]))')
 
-def getDefaults(child):
-    global defaults
-    var = child.attrib['name']
-    val = child.attrib['value']
-    defaults[var] = val
 
+def toSnakeCase(name):
+    return pattern.sub(r'_\1', name).lower()
 
-def toInt(var):
-    try:
-        var = int(var)
-    except:
-        arr = var.split('$')
-        if len(arr) != 2:
-            varname = arr[1]
-            if varname in defaults:
-                var = int(defaults[varname])
-            else:
-                print("Warning: %s has no value given" % varname)
-                var = 0
-        else:
-            print("Error: Invalid substitution entry %s" % var)
-            var = 0
-    return var
 
+# Maximum number of composed transformations cached per converter
+TRANSFORM_CACHE_SIZE = 4096
 
-def toFloat(var):
-    try:
-        var = float(var)
-    except:
-        arr = var.split('$')
-        if len(arr) != 2:
-            varname = arr[1]
-            if varname in defaults:
-                var = float(defaults[varname])
-            else:
-                print("Warning: %s has no value given" % varname)
-                var = 0
-        else:
-            print("Error: Invalid substitution entry %s" % var)
-            var = 0
-    return var
 
+def transformKey(child):
+    # Canonical form of a transform block, ignoring whitespace and comments
+    return tuple((str(transform.tag), tuple(sorted(transform.attrib.items()))) for transform in child)
 
-CamelCasePattern = pattern = re.compile(
-    r'((?<=[a-z0-9])[A-Z]|(?!^)[A-Z](?=[a-z]))')
 
+def composeTransformations(matrices):
+    # Compose a stack of K transformation steps given as array of shape (K, 4, 4), with the first step being applied first
+    result = matrices[0]
+    for k in range(1, len(matrices)):
+        result = np.matmul(matrices[k], result)
+    return result
 
-def toSnakeCase(name):
-    return pattern.sub(r'_\1', name).lower()
+
+# TODO: Incomplete list of IORs extracted around wavelength ~540nm
+IOR_DICT = {
+    "Ag": (0.129, 3.250),
+    "Au": (0.402, 2.540),
+    "Cu": (1.040, 2.583),
+    "none": (0.000, 1.000)
+}
 
 
-def computeTransformation(child):
-    matrix = []
-    # Start with Identity Matrix to build up the final transformation matrix
-    matrix_transform = np.identity(4)
+def isIOR(elem):
+    return "name" in elem.attrib and elem.attrib['name'] == "material"
 
-    for transform in child:
 
-        # Start with identity matrix and only modify relevant entries
-        matrix_action = np.identity(4)
+# Flags of a shape inside a mitsuba serialized file
+MTS_MF_VERTEXNORMALS = 0x0001
+MTS_MF_TEXCOORDS = 0x0002
+MTS_MF_VERTEXCOLORS = 0x0008
+MTS_MF_DOUBLE = 0x2000
+
+# Directory next to the output file the converted serialized shapes are written to
+SERIALIZED_MESH_DIR = 'meshes'
+
+
+def readSerializedShape(filePath, shapeIndex):
+    """Decode a single shape of a mitsuba serialized file.
+    Returns the vertices, normals, texture coordinates and triangle indices as arrays. Normals and texture coordinates are None if not present"""
+    with open(filePath, 'rb') as file:
+        ident, version = struct.unpack('<HH', file.read(4))
+        if (ident != 0x041C or version < 3):
+            raise ValueError("'%s' is not a valid mitsuba serialized file" % filePath)
+
+        # The file ends with the offset of each shape followed by the number of shapes
+        end = file.seek(-4, os.SEEK_END)
+        shapeCount, = struct.unpack('<I', file.read(4))
+        if (shapeIndex >= shapeCount):
+            raise ValueError("'%s' contains only %i shapes, can not access shape index %i" % (filePath, shapeCount, shapeIndex))
+
+        offsetType = '<u8' if version >= 4 else '<u4'
+        dictStart = end - np.dtype(offsetType).itemsize * shapeCount
+        file.seek(dictStart)
+        offsets = np.frombuffer(file.read(end - dictStart), dtype=offsetType)
+
+        start = int(offsets[shapeIndex])
+        stop = int(offsets[shapeIndex + 1]) if shapeIndex + 1 < shapeCount else dictStart
+        file.seek(start + 4)  # Skip the header of the shape
+        data = zlib.decompressobj().decompress(file.read(stop - start - 4))
+
+    flags, = struct.unpack_from('<I', data, 0)
+    pos = 4
+    if (version >= 4):
+        pos = data.index(b'\0', pos) + 1  # Skip the name of the shape
+    vertexCount, triCount = struct.unpack_from('<QQ', data, pos)
+    pos = pos + 16
+    if (vertexCount == 0 or triCount == 0):
+        raise ValueError("'%s' has no valid mesh at shape index %i" % (filePath, shapeIndex))
+
+    def take(dtype, count, width):
+        nonlocal pos
+        array = np.frombuffer(data, dtype=dtype, count=count * width, offset=pos).reshape(count, width)
+        pos = pos + array.nbytes
+        return array
+
+    floatType = '<f8' if flags & MTS_MF_DOUBLE else '<f4'
+    vertices = take(floatType, vertexCount, 3)
+    normals = take(floatType, vertexCount, 3) if flags & MTS_MF_VERTEXNORMALS else None
+    texcoords = take(floatType, vertexCount, 2) if flags & MTS_MF_TEXCOORDS else None
+    if (flags & MTS_MF_VERTEXCOLORS):
+        take(floatType, vertexCount, 3)  # Ignored
+    indices = take('<u8' if vertexCount > 0xFFFFFFFF else '<u4', triCount, 3)
+
+    return vertices, normals, texcoords, indices
+
+
+def encodePly(vertices, normals, texcoords, indices):
+    # Binary little endian ply with float vertex properties and a single 'uchar int' face list, which is loaded by memory mapping
+    columns = [vertices]
+    properties = ['x', 'y', 'z']
+    if normals is not None:
+        columns.append(normals)
+        properties += ['nx', 'ny', 'nz']
+    if texcoords is not None:
+        columns.append(texcoords)
+        properties += ['u', 'v']
+
+    faces = np.empty(len(indices), dtype=[('count', 'u1'), ('indices', '<i4', (3,))])
+    faces['count'] = 3
+    faces['indices'] = indices
+
+    header = 'ply\nformat binary_little_endian 1.0\nelement vertex %i\n' % len(vertices)
+    header += ''.join('property float %s\n' % prop for prop in properties)
+    header += 'element face %i\nproperty list uchar int vertex_indices\nend_header\n' % len(indices)
+    return header.encode('ascii') + np.hstack(columns).astype('<f4').tobytes() + faces.tobytes()
+
+
+def convertSerializedShape(task):
+    """Write a single shape of a serialized file as ply into the given directory. The file is named by the hash of its content,
+    therefore identical shapes share the same file. Returns the file name and an error message, one of them being None"""
+    filePath, shapeIndex, meshDir = task
+    try:
+        data = encodePly(*readSerializedShape(filePath, shapeIndex))
+    except Exception as e:
+        return None, str(e)
+
+    name = hashlib.sha1(data).hexdigest()[:20] + '.ply'
+    meshPath = Path(meshDir) / name
+    if not meshPath.exists():
+        # Write to a temporary file first, as other processes might write the same shape concurrently
+        tmpPath = meshPath.with_suffix('.%i.tmp' % os.getpid())
+        with open(tmpPath, 'wb') as file:
+            file.write(data)
+        os.replace(tmpPath, meshPath)
+    return name, None
+
+
+class JsonArrayWriter:
+    """List-like sink serializing each appended element into a temporary file instead of keeping it in memory"""
+
+    def __init__(self):
+        self.file = tempfile.TemporaryFile(mode='w+', encoding='utf-8')
+        self.count = 0
+
+    def append(self, item):
+        if self.count > 0:
+            self.file.write(',\n')
+        self.file.write('        ' + indentJson(item, 2))
+        self.count = self.count + 1
+
+    def __len__(self):
+        return self.count
+
+    def copyTo(self, file):
+        self.file.seek(0)
+        shutil.copyfileobj(self.file, file)
+        self.file.close()
+
+
+def indentJson(value, level):
+    return json.dumps(value, indent=4).replace('\n', '\n' + '    ' * level)
+
+
+def writeJson(res_dict, file):
+    # Same layout as json.dumps(res_dict, indent=4), but arrays given as JsonArrayWriter are copied from their temporary files
+    file.write('{')
+    for i, (key, value) in enumerate(res_dict.items()):
+        if i > 0:
+            file.write(',')
+        file.write('\n    ' + json.dumps(key) + ': ')
+        if isinstance(value, JsonArrayWriter):
+            file.write('[\n')
+            value.copyTo(file)
+            file.write('\n    ]')
+        else:
+            file.write(indentJson(value, 1))
+    file.write('\n}')
+
+
+def iterateElements(xmlFilePath):
+    # Yield all top-level elements one after another. Processed elements are removed from the tree to keep the memory bounded
+    for _, elem in etree.iterparse(str(xmlFilePath), events=('end',)):
+        parent = elem.getparent()
+        if parent is None or parent.getparent() is not None:
+            continue
+
+        yield elem
+
+        elem.clear()
+        while elem.getprevious() is not None:
+            del parent[0]
+
+
+class MtsConverter:
+    """Converts mitsuba scenes. All state is kept per instance, therefore multiple converters can be used in parallel"""
+
+    def __init__(self, quiet=False):
+        self.quiet = quiet
+        self.reset()
+
+    def reset(self):
+        self.lightCount = 0
+        self.nameCount = 0
+        self.matCount = 0
+        self.texCount = 0
+        self.defaults = {}
+        self.bsdfs = []
+        self.textures = []
+        self.warnings = []
+        self.transformCache = OrderedDict()
+        self.serializedToPly = False
+        self.serializedShapes = []
+        self.shapeGroups = {}
+
+    def warn(self, *args):
+        msg = " ".join(str(a) for a in args)
+        self.warnings.append(msg)
+        if not self.quiet:
+            print(msg)
+
+    def getDefaults(self, child):
+        var = child.attrib['name']
+        val = child.attrib['value']
+        self.defaults[var] = val
+        # Cached transformations might depend on the previous value
+        self.transformCache.clear()
+
+    def toInt(self, var):
+        try:
+            var = int(var)
+        except:
+            arr = var.split('$')
+            if len(arr) != 2:
+                varname = arr[1]
+                if varname in self.defaults:
+                    var = int(self.defaults[varname])
+                else:
+                    self.warn("Warning: %s has no value given" % varname)
+                    var = 0
+            else:
+                self.warn("Error: Invalid substitution entry %s" % var)
+                var = 0
+        return var
+
+    def toFloat(self, var):
+        try:
+            var = float(var)
+        except:
+            arr = var.split('$')
+            if len(arr) != 2:
+                varname = arr[1]
+                if varname in self.defaults:
+                    var = float(self.defaults[varname])
+                else:
+                    self.warn("Warning: %s has no value given" % varname)
+                    var = 0
+            else:
+                self.warn("Error: Invalid substitution entry %s" % var)
+                var = 0
+        return var
+
+    def toFloats(self, text):
+        values = text.replace(',', ' ').split()
+        try:
+            return [float(v) for v in values]
+        except ValueError:
+            return [self.toFloat(v) for v in values]
+
+    def computeTransformationStep(self, transform, child):
+        # Returns the matrix of a single step in row-major order. Start with identity matrix and only modify relevant entries
+        matrix_action = [1.0, 0.0, 0.0, 0.0,
+                         0.0, 1.0, 0.0, 0.0,
+                         0.0, 0.0, 1.0, 0.0,
+                         0.0, 0.0, 0.0, 1.0]
 
         if (transform.tag == "translate"):
             if 'value' in transform.attrib:
-                vec = transform.attrib['value']
-                vec = re.split(',\s|\s', vec)
-
+                vec = self.toFloats(transform.attrib['value'])
             else:
-                x = transform.attrib.get('x', '0')
-                y = transform.attrib.get('y', '0')
-                z = transform.attrib.get('z', '0')
-                vec = [x, y, z]
-
-            matrix_action[0][3] = toFloat(vec[0])
-            matrix_action[1][3] = toFloat(vec[1])
-            matrix_action[2][3] = toFloat(vec[2])
+                vec = [self.toFloat(transform.attrib.get(c, '0')) for c in 'xyz']
+
+            matrix_action[3] = vec[0]
+            matrix_action[7] = vec[1]
+            matrix_action[11] = vec[2]
         elif (transform.tag == "rotate"):
             # In this case, the rotation is around a vector
             if ("value" in transform.attrib):
-                vec = transform.attrib['value']
-                vec = re.split(',\s|\s', vec)
-                angle = toFloat(transform.attrib['angle'])
-                sine = np.sin(angle)
-                cosine = np.cos(angle)
-                x = toFloat(vec[0])
-                y = toFloat(vec[1])
-                z = toFloat(vec[2])
-
-                matrix_action[0][0] = cosine + x*x*(1-cosine)
-                matrix_action[0][1] = x*y*(1-cosine) - z*sine
-                matrix_action[0][2] = x*z*(1-cosine) - y*sine
-                matrix_action[1][0] = y*x*(1-cosine) + z * sine
-                matrix_action[1][1] = cosine + y*y*(1-cosine)
-                matrix_action[1][2] = y * z * (1-cosine) - x*sine
-                matrix_action[2][0] = z*x*(1-cosine) - y * sine
-                matrix_action[2][1] = z*y*(1-cosine) + x*sine
-                matrix_action[2][2] = cosine + z*z*(1-cosine)
+                x, y, z = self.toFloats(transform.attrib['value'])[0:3]
+                angle = self.toFloat(transform.attrib['angle'])
+                sine = math.sin(angle)
+                cosine = math.cos(angle)
+
+                matrix_action[0:3] = [cosine + x*x*(1-cosine), x*y*(1-cosine) - z*sine, x*z*(1-cosine) - y*sine]
+                matrix_action[4:7] = [y*x*(1-cosine) + z * sine, cosine + y*y*(1-cosine), y * z * (1-cosine) - x*sine]
+                matrix_action[8:11] = [z*x*(1-cosine) - y * sine, z*y*(1-cosine) + x*sine, cosine + z*z*(1-cosine)]
             # In this case, the rotation is around x-axis
             elif ("x" in transform.attrib):
-                angle = toFloat(transform.attrib['angle'])
-                sine = np.sin(angle)
-                cosine = np.cos(angle)
-
-                matrix_action[1][1] = cosine
-                matrix_action[1][2] = -sine
-                matrix_action[2][1] = sine
-                matrix_action[2][2] = cosine
+                angle = self.toFloat(transform.attrib['angle'])
+                sine = math.sin(angle)
+                cosine = math.cos(angle)
+
+                matrix_action[5:7] = [cosine, -sine]
+                matrix_action[9:11] = [sine, cosine]
             # In this case, the rotation is around y-axis
             elif ("y" in transform.attrib):
-                angle = toFloat(transform.attrib['angle'])
-                sine = np.sin(angle)
-                cosine = np.cos(angle)
-
-                matrix_action[0][0] = cosine
-                matrix_action[0][2] = sine
-                matrix_action[2][0] = -sine
-                matrix_action[2][2] = cosine
+                angle = self.toFloat(transform.attrib['angle'])
+                sine = math.sin(angle)
+                cosine = math.cos(angle)
+
+                matrix_action[0:3] = [cosine, 0.0, sine]
+                matrix_action[8:11] = [-sine, 0.0, cosine]
             # In this case, the rotation is around z-axis
             elif ("z" in transform.attrib):
-                angle = toFloat(transform.attrib['angle'])
-                sine = np.sin(angle)
-                cosine = np.cos(angle)
+                angle = self.toFloat(transform.attrib['angle'])
+                sine = math.sin(angle)
+                cosine = math.cos(angle)
 
-                matrix_action[0][0] = cosine
-                matrix_action[0][1] = -sine
-                matrix_action[1][0] = sine
-                matrix_action[1][1] = cosine
+                matrix_action[0:2] = [cosine, -sine]
+                matrix_action[4:6] = [sine, cosine]
 
         elif (transform.tag == "scale"):
-            vec = transform.attrib['value']
-            vec = re.split(',\s|\s', vec)
+            vec = self.toFloats(transform.attrib['value'])
             if (len(vec) == 1):
-                matrix_action[0][0] = vec[0]
-                matrix_action[1][1] = vec[0]
-                matrix_action[2][2] = vec[0]
-
-            else:
-                matrix_action[0][0] = vec[0]
-                matrix_action[1][1] = vec[1]
-                matrix_action[2][2] = vec[2]
+                vec = [vec[0], vec[0], vec[0]]
+            matrix_action[0] = vec[0]
+            matrix_action[5] = vec[1]
+            matrix_action[10] = vec[2]
 
         elif (transform.tag == "lookat"):
-            origin = re.split(',\s|\s', transform.attrib['origin'])
-            target = re.split(',\s|\s', transform.attrib['target'])
-            origin = np.array([toFloat(o) for o in origin])
-            target = np.array([toFloat(t) for t in target])
+            origin = np.array(self.toFloats(transform.attrib['origin']))
+            target = np.array(self.toFloats(transform.attrib['target']))
             if ('up' in child.attrib):
-                up = re.split(',\s|\s', transform.attrib['up'])
-                up = np.array([toFloat(u) for u in up])
+                up = np.array(self.toFloats(transform.attrib['up']))
             else:
                 up = np.array([0, 1, 0])
 
-            fwd_h = np.array(
-                [target[0]-origin[0], target[1]-origin[1], target[2]-origin[2]])
+            fwd_h = target - origin
             fwd = fwd_h / np.linalg.norm(fwd_h)
             left_h = np.cross(up, fwd)
             left = left_h / np.linalg.norm(left_h)
             alt_up_h = np.cross(fwd, left)
             alt_up = alt_up_h / np.linalg.norm(alt_up_h)
 
-            matrix_action[0][0] = left[0]
-            matrix_action[0][1] = alt_up[0]
-            matrix_action[0][2] = fwd[0]
-            matrix_action[0][3] = origin[0]
-            matrix_action[1][0] = left[1]
-            matrix_action[1][1] = alt_up[1]
-            matrix_action[1][2] = fwd[1]
-            matrix_action[1][3] = origin[1]
-            matrix_action[2][0] = left[2]
-            matrix_action[2][1] = alt_up[2]
-            matrix_action[2][2] = fwd[2]
-            matrix_action[2][3] = origin[2]
+            matrix_action[0:12] = np.stack([left, alt_up, fwd, origin], axis=1).flatten().tolist()
 
         elif(transform.tag == "matrix"):
-            vec = transform.attrib['value']
-            vec = re.split(',\s|\s', vec)
-
-            matrix_action[0][0] = vec[0]
-            matrix_action[0][1] = vec[1]
-            matrix_action[0][2] = vec[2]
-            matrix_action[0][3] = vec[3]
-            matrix_action[1][0] = vec[4]
-            matrix_action[1][1] = vec[5]
-            matrix_action[1][2] = vec[6]
-            matrix_action[1][3] = vec[7]
-            matrix_action[2][0] = vec[8]
-            matrix_action[2][1] = vec[9]
-            matrix_action[2][2] = vec[10]
-            matrix_action[2][3] = vec[11]
-            matrix_action[3][0] = vec[12]
-            matrix_action[3][1] = vec[13]
-            matrix_action[3][2] = vec[14]
-            matrix_action[3][3] = vec[15]
+            matrix_action = self.toFloats(transform.attrib['value'])[0:16]
         # This happens e.g. for the transformation name, or for invalid transformation steps
         else:
-            print("Unknown transfomation")
-        # Compute the transformation step to the end-Transformation matrix
-        matrix_transform = matrix_action.dot(matrix_transform)
-    matrix = [item for sublist in matrix_transform for item in sublist]
-    return matrix
-
-
-def getAdditionalProperties(child, res_dict):
-    global texCount, textures
-    for elem in child:
-        if len(elem):
-            if(elem.tag == "film" or elem.tag == "transform" or elem.tag == "sampler" or elem.tag == "bsdf"):
-                continue
-            if(elem.tag == "texture"):
-                tex_name = "texture_" + str(texCount)
-                texCount = texCount + 1
-                prop = toSnakeCase(elem.attrib['name'])
-                res_dict[prop] = tex_name
-                getTexture(elem, textures, tex_name)
-                continue
-            getAdditionalProperties(elem, res_dict)
-        else:
-            if(elem.tag == "integer"):
-                if (child.tag == "camera" or child.tag == "film"):
-                    continue  # Already done
-                prop = toSnakeCase(elem.attrib['name'])
-                val = toInt(elem.attrib['value'])
-                res_dict[prop] = val
-            elif (elem.tag == "rgb"):
-                prop = toSnakeCase(elem.attrib['name'])
-                vec = elem.attrib['value']
-                if vec.startswith('#'):
-                    r = int(vec[1:2], 16) / 255.0
-                    g = int(vec[3:4], 16) / 255.0
-                    b = int(vec[5:6], 16) / 255.0
-                    vec = [r, g, b]
-                else:
-                    vec = re.split(',\s|\s', vec)
-                    vec = [toFloat(v) for v in vec]
-                res_dict[prop] = vec
-            elif (elem.tag == "float"):
-                prop = toSnakeCase(elem.attrib['name'])
-                val = toFloat(elem.attrib['value'])
-                res_dict[prop] = val
-            elif (elem.tag == "point" or elem.tag == "vector"):
-                prop = toSnakeCase(elem.attrib['name'])
-                vec = [0, 0, 0]
-                if('value' in elem.attrib):
-                    vec = elem.attrib['value']
-                    vec = re.split(',\s|\s', vec)
-                else:
-                    if('x' in elem.attrib):
-                        vec[0] = elem.attrib['x']
-                    if('y' in elem.attrib):
-                        vec[1] = elem.attrib['y']
-                    if('z' in elem.attrib):
-                        vec[2] = elem.attrib['z']
-                vec = [toFloat(v) for v in vec]
-                res_dict[prop] = vec
-            elif (elem.tag == "spectrum"):
-                prop = toSnakeCase(elem.attrib['name'])
-                if ('value' in elem.attrib):
+            self.warn("Unknown transfomation")
+
+        return matrix_action
+
+    def computeTransformationSteps(self, child):
+        steps = [self.computeTransformationStep(transform, child) for transform in child]
+        if len(steps) == 0:
+            steps = [np.identity(4).flatten().tolist()]
+        return steps
+
+    def computeTransformation(self, child):
+        # Instanced scenes contain the same transform blocks many times, therefore the composed matrix is cached by the canonical form of the block
+        key = transformKey(child)
+
+        matrix = self.transformCache.get(key)
+        if matrix is not None:
+            self.transformCache.move_to_end(key)
+            return list(matrix)
+
+        steps = self.computeTransformationSteps(child)
+        matrix = composeTransformations(np.array(steps).reshape(-1, 4, 4)).flatten().tolist()
+
+        self.transformCache[key] = matrix
+        if len(self.transformCache) > TRANSFORM_CACHE_SIZE:
+            self.transformCache.popitem(last=False)
+        return list(matrix)
+
+    def getAdditionalProperties(self, child, res_dict):
+        for elem in child:
+            if len(elem):
+                if(elem.tag == "film" or elem.tag == "transform" or elem.tag == "sampler" or elem.tag == "bsdf"):
+                    continue
+                if(elem.tag == "texture"):
+                    tex_name = "texture_" + str(self.texCount)
+                    self.texCount = self.texCount + 1
+                    prop = toSnakeCase(elem.attrib['name'])
+                    res_dict[prop] = tex_name
+                    self.getTexture(elem, self.textures, tex_name)
+                    continue
+                self.getAdditionalProperties(elem, res_dict)
+            else:
+                if(elem.tag == "integer"):
+                    if (child.tag == "camera" or child.tag == "film"):
+                        continue  # Already done
+                    prop = toSnakeCase(elem.attrib['name'])
+                    val = self.toInt(elem.attrib['value'])
+                    res_dict[prop] = val
+                elif (elem.tag == "rgb"):
+                    prop = toSnakeCase(elem.attrib['name'])
                     vec = elem.attrib['value']
-                    vec = re.split(',\s|\s', vec)
-                    vec = [toFloat(v) for v in vec]
+                    if vec.startswith('#'):
+                        r = int(vec[1:2], 16) / 255.0
+                        g = int(vec[3:4], 16) / 255.0
+                        b = int(vec[5:6], 16) / 255.0
+                        vec = [r, g, b]
+                    else:
+                        vec = re.split(',\s|\s', vec)
+                        vec = [self.toFloat(v) for v in vec]
                     res_dict[prop] = vec
-                elif ('filename' in elem.attrib):
-                    res_dict[prop] = elem.attrib['filename']
-            elif (elem.tag == "boolean" or elem.tag == "string"):
-                if(isIOR(elem)):
-                    continue  # Ignore IOR material specification, as it is handled elsewhere
-                val = elem.attrib['value']
-                prop = toSnakeCase(elem.attrib['name'])
-                res_dict[prop] = val
-            elif(elem.tag == "rfilter"):
-                res_dict["rfilter"] = elem.attrib['type']
-            elif(elem.tag == "ref"):
-                continue  # can be ignored atm
-            else:
-                if (not str(elem.tag).startswith("<cyfunction") and not elem.tag == "bsdf"):
-                    print("Found unhandled element:", elem.tag)
-                    print(res_dict)
-
-
-def computeTechnique(child, res_dict):
-    res_dict["type"] = child.attrib['type']  # Required
-    getAdditionalProperties(child, res_dict)
-
-
-def computeCameraFilm(child, camera_dict, film_dict, smapler_dict):
-    # Camera
-    if ('type' in child.attrib):
-        camera_dict['type'] = child.attrib['type']
-    getAdditionalProperties(child, camera_dict)
-
-    if (len(child.find('transform'))):
-        camera_dict['transform'] = {
-            'matrix':  computeTransformation(child.find('transform'))}
-
-    # Film
-    film = child.find('film')
-    film_dict['type'] = film.attrib['type']
-    x = -1
-    y = -1
-    for elem in film:
-        if(elem.tag == "integer"):
-            if(elem.attrib['name'] == 'width'):
-                x = toInt(elem.attrib['value'])
-            else:
-                y = toInt(elem.attrib['value'])
-    film_dict["size"] = [x, y]
-    getAdditionalProperties(film, film_dict)
-
-    if(child.find('sampler') is not None):
-        sampler = child.find('sampler')
-        smapler_dict['type'] = sampler.attrib['type']
-        getAdditionalProperties(sampler, smapler_dict)
+                elif (elem.tag == "float"):
+                    prop = toSnakeCase(elem.attrib['name'])
+                    val = self.toFloat(elem.attrib['value'])
+                    res_dict[prop] = val
+                elif (elem.tag == "point" or elem.tag == "vector"):
+                    prop = toSnakeCase(elem.attrib['name'])
+                    vec = [0, 0, 0]
+                    if('value' in elem.attrib):
+                        vec = elem.attrib['value']
+                        vec = re.split(',\s|\s', vec)
+                    else:
+                        if('x' in elem.attrib):
+                            vec[0] = elem.attrib['x']
+                        if('y' in elem.attrib):
+                            vec[1] = elem.attrib['y']
+                        if('z' in elem.attrib):
+                            vec[2] = elem.attrib['z']
+                    vec = [self.toFloat(v) for v in vec]
+                    res_dict[prop] = vec
+                elif (elem.tag == "spectrum"):
+                    prop = toSnakeCase(elem.attrib['name'])
+                    if ('value' in elem.attrib):
+                        vec = elem.attrib['value']
+                        vec = re.split(',\s|\s', vec)
+                        vec = [self.toFloat(v) for v in vec]
+                        res_dict[prop] = vec
+                    elif ('filename' in elem.attrib):
+                        res_dict[prop] = elem.attrib['filename']
+                elif (elem.tag == "boolean" or elem.tag == "string"):
+                    if(isIOR(elem)):
+                        continue  # Ignore IOR material specification, as it is handled elsewhere
+                    val = elem.attrib['value']
+                    prop = toSnakeCase(elem.attrib['name'])
+                    res_dict[prop] = val
+                elif(elem.tag == "rfilter"):
+                    res_dict["rfilter"] = elem.attrib['type']
+                elif(elem.tag == "ref"):
+                    continue  # can be ignored atm
+                else:
+                    if (not str(elem.tag).startswith("<cyfunction") and not elem.tag == "bsdf"):
+                        self.warn("Found unhandled element:", elem.tag)
+                        if not self.quiet:
+                            print(res_dict)
+
+    def computeTechnique(self, child, res_dict):
+        res_dict["type"] = child.attrib['type']  # Required
+        self.getAdditionalProperties(child, res_dict)
+
+    def computeCameraFilm(self, child, camera_dict, film_dict, smapler_dict):
+        # Camera
+        if ('type' in child.attrib):
+            camera_dict['type'] = child.attrib['type']
+        self.getAdditionalProperties(child, camera_dict)
+
+        if (len(child.find('transform'))):
+            camera_dict['transform'] = {
+                'matrix':  self.computeTransformation(child.find('transform'))}
+
+        # Film
+        film = child.find('film')
+        film_dict['type'] = film.attrib['type']
+        x = -1
+        y = -1
+        for elem in film:
+            if(elem.tag == "integer"):
+                if(elem.attrib['name'] == 'width'):
+                    x = self.toInt(elem.attrib['value'])
+                else:
+                    y = self.toInt(elem.attrib['value'])
+        film_dict["size"] = [x, y]
+        self.getAdditionalProperties(film, film_dict)
+
+        if(child.find('sampler') is not None):
+            sampler = child.find('sampler')
+            smapler_dict['type'] = sampler.attrib['type']
+            self.getAdditionalProperties(sampler, smapler_dict)
+
+    def lookupIOR(self, bsdf_dict, material):
+        if material in IOR_DICT:
+            eta, k = IOR_DICT[material]
+            bsdf_dict['eta'] = eta
+            bsdf_dict['k'] = k
+        else:
+            self.warn("No IOR material '" + material + "' found")
+            bsdf_dict['eta'] = 0
+            bsdf_dict['k'] = 1
 
+    def computeBsdfs(self, child, bsdf_dict):
+        if ('id' in child.attrib):
+            bsdf_name = child.attrib['id']
+        else:
+            bsdf_name = "material_" + str(self.matCount)
+            self.matCount = self.matCount + 1
+        bsdf_type = child.attrib['type']
+        bsdf = {"type": bsdf_type, "name": bsdf_name}
+
+        if(bsdf_type == 'blendbsdf'):
+            childs = []
+            for elem in child:
+                if (elem.tag == "bsdf"):
+                    childs.append(self.computeBsdfs(elem, bsdf_dict))
+            bsdf["first"] = childs[0]
+            bsdf["second"] = childs[1]
+            self.getAdditionalProperties(child, bsdf)
+        else:
+            for elem in child:
+                if(elem.tag == "ref"):
+                    if ('name' in elem.attrib):
+                        refname = elem.attrib["name"]
+                        bsdf[refname] = elem.attrib['id']
+                    else:
+                        bsdf["texture"] = elem.attrib['id']
+                elif (elem.tag == "bsdf"):
+                    bsdf_child = self.computeBsdfs(elem, bsdf_dict)
+                    bsdf['bsdf'] = bsdf_child
+                elif (elem.tag == "string" and isIOR(elem)):
+                    self.lookupIOR(bsdf, elem.attrib["value"])
+            self.getAdditionalProperties(child, bsdf)
+
+        bsdf_dict.append(bsdf)
+        return bsdf_name
+
+    def getTexture(self, child, texture, tex_name):
+        tex_type = child.attrib['type']
+
+        tex = {"type": tex_type, "name": tex_name}
+        self.getAdditionalProperties(child, tex)
+
+        texture.append(tex)
+
+    def computeTextures(self, child, textures):
+        if ('id' in child.attrib):
+            tex_name = child.attrib['id']
+        else:
+            self.warn("Error: Texture got no name!")
+            tex_name = '_unknown'
 
-# TODO: Incomplete list of IORs extracted around wavelength ~540nm
-IOR_DICT = {
-    "Ag": (0.129, 3.250),
-    "Au": (0.402, 2.540),
-    "Cu": (1.040, 2.583),
-    "none": (0.000, 1.000)
-}
+        tex_type = child.attrib['type']
 
+        texture = {"type": tex_type, "name": tex_name}
+        self.getAdditionalProperties(child, texture)
 
-def lookupIOR(bsdf_dict, material):
-    if material in IOR_DICT:
-        eta, k = IOR_DICT[material]
-        bsdf_dict['eta'] = eta
-        bsdf_dict['k'] = k
-    else:
-        print("No IOR material '" + material + "' found")
-        bsdf_dict['eta'] = 0
-        bsdf_dict['k'] = 1
+        textures.append(texture)
 
+    def computeLights(self, child, light_dict):
+        light = {}
+        name = "light_" + str(self.lightCount)
+        self.lightCount = self.lightCount + 1
+        light["name"] = name
+        light["type"] = child.attrib['type']
+        self.getAdditionalProperties(child, light)
+        light_dict.append(light)
 
-def isIOR(elem):
-    return "name" in elem.attrib and elem.attrib['name'] == "material"
+    def computeShapes(self, child, shape_dict, entity_dict, light_dict):
 
+        shape_type = child.attrib['type']
+        if shape_type == 'serialized':
+            shape_type = 'mitsuba'
+        
+        shape = {"type": shape_type}
+        entity = {}
 
-def computeBsdfs(child, bsdf_dict):
-    global matCount
-    if ('id' in child.attrib):
-        bsdf_name = child.attrib['id']
-    else:
-        bsdf_name = "material_" + str(matCount)
-        matCount = matCount + 1
-    bsdf_type = child.attrib['type']
-    bsdf = {"type": bsdf_type, "name": bsdf_name}
+        name = child.attrib['type'] + str(self.nameCount)
+        self.nameCount = self.nameCount + 1
+        for elem in child:
+            if(elem.tag == "string"):
+                filename = elem.attrib['value']
+                name = filename.split("/")[-1].split(".")[0]
+                shape["filename"] = filename
+            if (elem.tag == "bsdf" or elem.tag == "ref"):
+                bsdf_name = ""
+                if(elem.tag == "bsdf"):
+                    bsdf_name = self.computeBsdfs(elem, self.bsdfs)
+                else:
+                    if ('name' in elem.attrib):
+                        bsdf_name = elem.attrib["id"]
+                        entity[elem.attrib["name"]] = elem.attrib['id']
+                    else:
+                        bsdf_name = elem.attrib['id']
+                entity["bsdf"] = bsdf_name
+
+            if (elem.tag == "emitter"):  # isLight
+                light = {}
+                light["name"] = name
+                light["type"] = elem.attrib['type']
+                light["entity"] = name
+                self.getAdditionalProperties(elem, light)
+                light_dict.append(light)
+            if (elem.tag == "transform"):
+                entity['transform'] = {'matrix':  self.computeTransformation(elem)}
+        self.getAdditionalProperties(child, entity)
+        self.getAdditionalProperties(child, shape)
+
+        shape["name"] = name
+        entity["name"] = name
+        entity["shape"] = name
+
+        if (self.serializedToPly and child.attrib['type'] == 'serialized'):
+            # Written after all elements are processed and the shape is converted
+            self.serializedShapes.append(shape)
+        else:
+            shape_dict.append(shape)
+        entity_dict.append(entity)
 
-    if(bsdf_type == 'blendbsdf'):
-        childs = []
+    def computeShapeGroup(self, child, shape_dict, light_dict):
+        # The shapes of a group are written only once. Their entities are kept as template for the instances referencing the group
+        group_entities = []
+        group_lights = []
         for elem in child:
-            if (elem.tag == "bsdf"):
-                childs.append(computeBsdfs(elem, bsdf_dict))
-        bsdf["first"] = childs[0]
-        bsdf["second"] = childs[1]
-        getAdditionalProperties(child, bsdf)
-    else:
+            if (elem.tag == "shape"):
+                self.computeShapes(elem, shape_dict, group_entities, group_lights)
+
+        if (group_lights):
+            self.warn("Emitters inside shapegroups are not supported. Ignoring emitters of shapegroup", child.attrib.get('id'))
+        if ('id' not in child.attrib):
+            self.warn("Found shapegroup without id")
+            return
+        self.shapeGroups[child.attrib['id']] = group_entities
+
+    def computeInstance(self, child, entity_dict):
+        # Each instance is mapped to one entity per shape of the referenced group, all sharing the shapes of the group
+        name = child.attrib['id'] if 'id' in child.attrib else "instance" + str(self.nameCount)
+        self.nameCount = self.nameCount + 1
+
+        group_entities = None
+        matrix = None
         for elem in child:
-            if(elem.tag == "ref"):
-                if ('name' in elem.attrib):
-                    refname = elem.attrib["name"]
-                    bsdf[refname] = elem.attrib['id']
+            if (elem.tag == "ref"):
+                group_entities = self.shapeGroups.get(elem.attrib['id'])
+            elif (elem.tag == "transform"):
+                matrix = self.computeTransformation(elem)
+
+        if (group_entities is None):
+            self.warn("Instance", name, "does not reference a known shapegroup")
+            return
+
+        for group_entity in group_entities:
+            entity = dict(group_entity)
+            entity["name"] = name + "_" + group_entity["name"]
+            if (matrix is not None):
+                if ('transform' in group_entity):
+                    steps = np.array([group_entity['transform']['matrix'], matrix]).reshape(2, 4, 4)
+                    entity['transform'] = {'matrix': composeTransformations(steps).flatten().tolist()}
                 else:
-                    bsdf["texture"] = elem.attrib['id']
-            elif (elem.tag == "bsdf"):
-                bsdf_child = computeBsdfs(elem, bsdf_dict)
-                bsdf['bsdf'] = bsdf_child
-            elif (elem.tag == "string" and isIOR(elem)):
-                lookupIOR(bsdf, elem.attrib["value"])
-        getAdditionalProperties(child, bsdf)
-
-    bsdf_dict.append(bsdf)
-    return bsdf_name
-
-
-def getTexture(child, texture, tex_name):
-    tex_type = child.attrib['type']
-
-    tex = {"type": tex_type, "name": tex_name}
-    getAdditionalProperties(child, tex)
-
-    texture.append(tex)
-
-
-def computeTextures(child, textures):
-    if ('id' in child.attrib):
-        tex_name = child.attrib['id']
-    else:
-        print("Error: Texture got no name!")
-        tex_name = '_unknown'
-
-    tex_type = child.attrib['type']
-
-    texture = {"type": tex_type, "name": tex_name}
-    getAdditionalProperties(child, texture)
-
-    textures.append(texture)
-
-
-def computeLights(child, light_dict):
-    global lightCount
-    light = {}
-    name = "light_" + str(lightCount)
-    lightCount = lightCount + 1
-    light["name"] = name
-    light["type"] = child.attrib['type']
-    getAdditionalProperties(child, light)
-    light_dict.append(light)
-
-
-def computeShapes(child, shape_dict, entity_dict, light_dict):
-
-    shape_type = child.attrib['type']
-    if shape_type == 'serialized':
-        shape_type = 'mitsuba'
-    
-    shape = {"type": shape_type}
-    entity = {}
-    global nameCount, bsdfs, matCount
-
-    name = child.attrib['type'] + str(nameCount)
-    nameCount = nameCount + 1
-    for elem in child:
-        if(elem.tag == "string"):
-            filename = elem.attrib['value']
-            name = filename.split("/")[-1].split(".")[0]
-            shape["filename"] = filename
-        if (elem.tag == "bsdf" or elem.tag == "ref"):
-            bsdf_name = ""
-            if(elem.tag == "bsdf"):
-                bsdf_name = computeBsdfs(elem, bsdfs)
+                    entity['transform'] = {'matrix': matrix}
+            entity_dict.append(entity)
+
+    def computeElement(self, child, technique, camera, film, sampler, shapes, entities, lights):
+        if (child.tag == "integrator"):
+            self.computeTechnique(child, technique)
+        elif (child.tag == "sensor"):
+            self.computeCameraFilm(child, camera, film, sampler)
+        elif (child.tag == "bsdf"):
+            self.computeBsdfs(child, self.bsdfs)
+        elif (child.tag == "shape"):
+            if ('type' in child.attrib):
+                if (child.attrib["type"] == "shapegroup"):
+                    self.computeShapeGroup(child, shapes, lights)
+                    return
+                if (child.attrib["type"] == "instance"):
+                    self.computeInstance(child, entities)
+                    return
+            self.computeShapes(child, shapes, entities, lights)
+        elif(child.tag == "texture"):
+            self.computeTextures(child, self.textures)
+        elif(child.tag == "default"):
+            self.getDefaults(child)
+        elif(child.tag == "emitter"):
+            self.computeLights(child, lights)
+        else:
+            if (not str(child.tag).startswith("<cyfunction")):
+                self.warn("Found unhandled element:", child.tag)
+
+    def convertSerializedShapes(self, xmlFilePath, outFilePath, shapes, jobs=None):
+        # Decode each referenced shape only once with a pool of processes and replace the references by the written ply files
+        if (not self.serializedShapes):
+            return
+
+        meshDir = Path(outFilePath).parent / SERIALIZED_MESH_DIR
+        meshDir.mkdir(parents=True, exist_ok=True)
+
+        keys = [(str(Path(xmlFilePath).parent / shape.get("filename", "")), int(shape.get("shape_index", 0)))
+                for shape in self.serializedShapes]
+        tasks = [(filePath, shapeIndex, str(meshDir)) for filePath, shapeIndex in dict.fromkeys(keys)]
+        if (jobs == 1):
+            results = list(map(convertSerializedShape, tasks))
+        else:
+            with ProcessPoolExecutor(max_workers=jobs) as executor:
+                results = list(executor.map(convertSerializedShape, tasks))
+        converted = dict(zip((task[:2] for task in tasks), results))
+
+        for shape, key in zip(self.serializedShapes, keys):
+            name, error = converted[key]
+            if (name is None):
+                self.warn("Could not convert serialized shape", shape["name"] + ":", error)
             else:
-                if ('name' in elem.attrib):
-                    bsdf_name = elem.attrib["id"]
-                    entity[elem.attrib["name"]] = elem.attrib['id']
-                else:
-                    bsdf_name = elem.attrib['id']
-            entity["bsdf"] = bsdf_name
+                shape["type"] = "ply"
+                shape["filename"] = SERIALIZED_MESH_DIR + "/" + name
+                shape.pop("shape_index", None)
+            shapes.append(shape)
+        self.serializedShapes = []
+
+    def convert(self, xmlFilePath, outFilePath=None, stream=False, serializedToPly=False, jobs=None):
+        """Convert the given XML file and write the result into outFilePath, or next to the input if not given.
+        If serializedToPly is set, all shapes from mitsuba serialized files are converted to ply files with up to the given number of processes.
+        Returns the path of the written file"""
+        self.reset()
+        self.serializedToPly = serializedToPly
+
+        if outFilePath is None:
+            outFilePath = os.path.splitext(xmlFilePath)[0]+'.json'
+
+        technique = {}
+        camera = {}
+        film = {}
+        shapes = []
+        entities = []
+        lights = []
+        sampler = {}
+
+        if stream:
+            # Keep only the currently processed element in memory and spool all converted elements to temporary files
+            shapes = JsonArrayWriter()
+            entities = JsonArrayWriter()
+            lights = JsonArrayWriter()
+            self.bsdfs = JsonArrayWriter()
+            self.textures = JsonArrayWriter()
+
+            for child in iterateElements(xmlFilePath):
+                self.computeElement(child, technique, camera, film,
+                                    sampler, shapes, entities, lights)
+        else:
+            with open(xmlFilePath) as xmlFile:
+                tree = etree.parse(xmlFile)
+
+            for child in tree.getroot():
+                self.computeElement(child, technique, camera, film,
+                                    sampler, shapes, entities, lights)
+
+        self.convertSerializedShapes(xmlFilePath, outFilePath, shapes, jobs)
+
+        res_dict = {}
+        if (technique):
+            res_dict['technique'] = technique
+        # Those two are required
+        res_dict['camera'] = camera
+        res_dict['film'] = film
+        if (sampler):
+            res_dict['sampler'] = sampler
+        if (self.textures):
+            res_dict['textures'] = self.textures
+        if (self.bsdfs):
+            res_dict['bsdfs'] = self.bsdfs
+        if (shapes):
+            res_dict['shapes'] = shapes
+        if (entities):
+            res_dict['entities'] = entities
+        if (lights):
+            res_dict['lights'] = lights
+
+        with open(outFilePath, "w") as json_file:
+            if stream:
+                writeJson(res_dict, json_file)
+            else:
+                json_file.write(json.dumps(res_dict, indent=4))
+
+        return outFilePath
+
+
+def convert(xmlFilePath, outFilePath=None, stream=False, quiet=False, serializedToPly=False, jobs=None):
+    """Convert a single XML file. Returns the list of warnings"""
+    converter = MtsConverter(quiet)
+    converter.convert(xmlFilePath, outFilePath, stream, serializedToPly, jobs)
+    return converter.warnings
+
+
+def convertTimed(task):
+    xmlFilePath, outFilePath, stream, serializedToPly = task
+
+    converter = MtsConverter(quiet=True)
+    start = time.perf_counter()
+    error = None
+    try:
+        # Files are already converted in parallel, therefore serialized shapes are converted in the same process
+        converter.convert(xmlFilePath, outFilePath, stream, serializedToPly, jobs=1)
+    except Exception as e:
+        error = str(e)
+
+    return {"input": str(xmlFilePath), "output": str(outFilePath), "seconds": time.perf_counter() - start,
+            "warnings": converter.warnings, "error": error}
+
+
+def convertDirectory(inputDir, outputDir=None, stream=False, jobs=None, summaryFilePath=None, serializedToPly=False):
+    """Convert all XML files in the given directory and its subdirectories with a pool of processes.
+    The output mirrors the directory structure of the input. A summary with timings and warnings of each file is written as JSON.
+    Returns the summary"""
+    inputDir = Path(inputDir)
+    outputDir = inputDir if outputDir is None else Path(outputDir)
 
-        if (elem.tag == "emitter"):  # isLight
-            light = {}
-            light["name"] = name
-            light["type"] = elem.attrib['type']
-            light["entity"] = name
-            getAdditionalProperties(elem, light)
-            light_dict.append(light)
-        if (elem.tag == "transform"):
-            entity['transform'] = {'matrix':  computeTransformation(elem)}
-    getAdditionalProperties(child, entity)
-    getAdditionalProperties(child, shape)
+    tasks = []
+    for xmlFilePath in sorted(inputDir.rglob('*.xml')):
+        outFilePath = (outputDir / xmlFilePath.relative_to(inputDir)).with_suffix('.json')
+        outFilePath.parent.mkdir(parents=True, exist_ok=True)
+        tasks.append((xmlFilePath, outFilePath, stream, serializedToPly))
 
-    shape["name"] = name
-    entity["name"] = name
-    entity["shape"] = name
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        results = list(executor.map(convertTimed, tasks, chunksize=4))
 
-    shape_dict.append(shape)
-    entity_dict.append(entity)
+    summary = {
+        "files": len(results),
+        "failed": sum(1 for r in results if r["error"] is not None),
+        "warnings": sum(len(r["warnings"]) for r in results),
+        "seconds": time.perf_counter() - start,
+        "results": results
+    }
+
+    if summaryFilePath is None:
+        summaryFilePath = outputDir / 'mts2json_summary.json'
+    with open(summaryFilePath, "w") as summary_file:
+        summary_file.write(json.dumps(summary, indent=4))
+
+    return summary
 
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser()
     parser.add_argument('InputFile', type=Path,
-                        help='Path of the XML file to be converted.')
+                        help='Path of the XML file or a directory of XML files to be converted.')
     parser.add_argument('OutputFile', nargs='?', type=Path, default=None,
-                        help='Path to export')
-
-    xmlFilePath = parser.parse_args().InputFile
+                        help='Path to export. Has to be a directory if the input is a directory')
+    parser.add_argument('--stream', action='store_true',
+                        help='Convert the XML file element by element with bounded memory. Intended for very large scenes')
+    parser.add_argument('--serialized-to-ply', action='store_true',
+                        help='Convert all shapes from mitsuba serialized files to ply files in a \'%s\' directory next to the output' % SERIALIZED_MESH_DIR)
+    parser.add_argument('--jobs', type=int, default=None,
+                        help='Number of processes used to convert a directory or serialized shapes. Defaults to the number of processors')
+    parser.add_argument('--summary', type=Path, default=None,
+                        help='Path of the summary written when converting a directory. Defaults to mts2json_summary.json in the output directory')
+
+    args = parser.parse_args()
+    xmlFilePath = args.InputFile
 
     if (not xmlFilePath.exists()):
         print("The specified file does not exist.")
         exit()
+
+    if xmlFilePath.is_dir():
+        summary = convertDirectory(xmlFilePath, args.OutputFile, args.stream, args.jobs, args.summary, args.serialized_to_ply)
+        for result in summary["results"]:
+            if result["error"] is not None:
+                print("Error: Converting %s failed: %s" % (result["input"], result["error"]))
+        print("Converted %i files in %.2fs with %i failures and %i warnings" %
+              (summary["files"], summary["seconds"], summary["failed"], summary["warnings"]))
+        exit()
+
     if (not xmlFilePath.suffix == '.xml'):
         print("The specified file is not a XML file.")
         exit()
 
-    with open(xmlFilePath) as xmlFile:
-        tree = etree.parse(xmlFile)
-    xmlFile.close()
-
-    technique = {}
-    camera = {}
-    film = {}
-    shapes = []
-    entities = []
-    lights = []
-    sampler = {}
-
-    for child in tree.getroot():
-        if (child.tag == "integrator"):
-            computeTechnique(child, technique)
-        elif (child.tag == "sensor"):
-            computeCameraFilm(child, camera, film, sampler)
-        elif (child.tag == "bsdf"):
-            computeBsdfs(child, bsdfs)
-        elif (child.tag == "shape"):
-            if ('type' in child.attrib):
-                if (child.attrib["type"] == "shapegroup"):
-                    for elem in child:
-                        computeShapes(elem, shapes, entities, lights)
-                    continue
-            computeShapes(child, shapes, entities, lights)
-        elif(child.tag == "texture"):
-            computeTextures(child, textures)
-        elif(child.tag == "default"):
-            getDefaults(child)
-        elif(child.tag == "emitter"):
-            computeLights(child, lights)
-        else:
-            if (not str(child.tag).startswith("<cyfunction")):
-                print("Found unhandled element:", child.tag)
-
-    res_dict = {}
-    if (technique):
-        res_dict['technique'] = technique
-    # Those two are required
-    res_dict['camera'] = camera
-    res_dict['film'] = film
-    if (sampler):
-        res_dict['sampler'] = sampler
-    if (textures):
-        res_dict['textures'] = textures
-    if (bsdfs):
-        res_dict['bsdfs'] = bsdfs
-    if (shapes):
-        res_dict['shapes'] = shapes
-    if (entities):
-        res_dict['entities'] = entities
-    if (lights):
-        res_dict['lights'] = lights
-
-    json_data = json.dumps(res_dict, indent=4)
-
-    outFilePath = parser.parse_args().OutputFile
-    if outFilePath is None:
-        outFilePath = os.path.splitext(xmlFilePath)[0]+'.json'
-    with open(outFilePath, "w") as json_file:
-        json_file.write(json_data)
-
-    json_file.close()
+    convert(xmlFilePath, args.OutputFile, args.stream, serializedToPly=args.serialized_to_ply, jobs=args.jobs)
@@ -2,6 +2,7 @@
 #include "Logger.h"
 #include "RuntimeStructs.h"
 #include "Statistics.h"
+#include "TiledImage.h"
 #include "config/Version.h"
 #include "driver/Interface.h"
 #include "table/SceneDatabase.h"
@@ -13,6 +14,7 @@
 #include <anydsl_jit.h>
 #include <anydsl_runtime.hpp>
 
+#include <algorithm>
 #include <atomic>
 #include <cstdlib>
 #include <cstring>
@@ -139,6 +141,7 @@ public:
         std::array<anydsl::Array<float>, GPUStreamBufferCount> secondary;
         std::vector<anydsl::Array<float>> aovs;
         anydsl::Array<float> film_pixels;
+        std::atomic_flag rays_loaded = ATOMIC_FLAG_INIT;
         anydsl::Array<StreamRay> ray_list;
         std::array<anydsl::Array<float>*, GPUStreamBufferCount> current_primary;
         std::array<anydsl::Array<float>*, GPUStreamBufferCount> current_secondary;
@@ -176,6 +179,9 @@ public:
 #endif
     std::unordered_map<void*, ShaderInfo> shader_infos;
 
+    std::unique_ptr<IG::TileCache> tile_cache;
+    std::unordered_map<std::string, int32_t> tiled_images; // Filename to tile cache handle
+
     std::vector<anydsl::Array<float>> aovs;
     anydsl::Array<float> host_pixels;
     const IG::SceneDatabase* database;
@@ -259,6 +265,9 @@ public:
             available_thread_data.push(ptr);
         }
 #endif
+
+        for (const auto& data : thread_data)
+            data->stats.enableTimeline(setup.acquire_stats && setup.acquire_timeline);
     }
 
     inline void setupShaderSet(const IG::TechniqueVariantShaderSet& shaderSet)
@@ -437,7 +446,7 @@ public:
     inline const anydsl::Array<StreamRay>& loadRayList(int32_t dev)
     {
         auto& device = devices[dev];
-        if (device.ray_list.size() == (int64_t)film_width)
+        if (device.rays_loaded.test_and_set() && device.ray_list.size() == (int64_t)film_width)
             return device.ray_list;
 
         IG_ASSERT(current_settings.rays != nullptr, "Expected list of rays to be available");
@@ -614,6 +623,55 @@ public:
         }
     }
 
+    /// Open a tiled image and return its handle for the tile cache or -1 on error. Tiles are paged in on demand
+    inline int32_t loadTiledImage(const std::string& filename)
+    {
+        std::lock_guard<std::mutex> _guard(thread_mutex);
+
+        auto it = tiled_images.find(filename);
+        if (it != tiled_images.end())
+            return it->second;
+
+        if (!tile_cache) {
+            tile_cache = std::make_unique<IG::TileCache>(IG::TileCache::defaultSize());
+            IG_LOG(IG::L_DEBUG) << "Using tile cache with " << tile_cache->maxMemory() / (1024 * 1024) << " MiB" << std::endl;
+        }
+
+        IG_LOG(IG::L_DEBUG) << "Loading tiled image " << filename << std::endl;
+        try {
+            return tiled_images[filename] = (int32_t)tile_cache->add(std::make_unique<IG::TiledImage>(filename));
+        } catch (const IG::ImageLoadException& e) {
+            IG_LOG(IG::L_ERROR) << e.what() << std::endl;
+            return tiled_images[filename] = -1;
+        }
+    }
+
+    /// Load a single level of a tiled image fully to the device. Used on targets which can not page in tiles on demand
+    inline const DeviceImage& loadTiledImageLevel(int32_t dev, const std::string& filename, size_t level)
+    {
+        std::lock_guard<std::mutex> _guard(thread_mutex);
+
+        const std::string key = filename + "#" + std::to_string(level);
+
+        auto& images = devices[dev].images;
+        auto it      = images.find(key);
+        if (it != images.end())
+            return it->second;
+
+        IG_LOG(IG::L_DEBUG) << "Loading level " << level << " of tiled image " << filename << std::endl;
+        try {
+            const IG::TiledImage tiled(filename);
+            const auto img = tiled.readLevel(std::min(level, tiled.levelCount() - 1));
+            auto& res      = getCurrentShaderInfo(dev).images[key];
+            res.counter++;
+            res.memory_usage   = img.width * img.height * 4 * sizeof(float);
+            return images[key] = copyToDevice(dev, img);
+        } catch (const IG::ImageLoadException& e) {
+            IG_LOG(IG::L_ERROR) << e.what() << std::endl;
+            return images[key] = copyToDevice(dev, IG::Image());
+        }
+    }
+
     std::vector<uint8_t> readBufferFile(const std::string& filename)
     {
         std::ifstream file(filename, std::ios::binary);
@@ -1083,6 +1141,17 @@ void glue_render(const IG::TechniqueVariantShaderSet& shaderSet, const DriverRen
     sInterface->current_parameters = parameterSet;
     sInterface->driver_settings    = convert_settings(settings, iter, frame);
 
+    // Each call to trace might provide a new list of rays, even if the number of rays did not change
+    if (settings.rays != nullptr) {
+        for (auto& pair : sInterface->devices)
+            pair.second.rays_loaded.clear();
+    }
+
+    if (sInterface->setup.acquire_timeline) {
+        for (const auto& data : sInterface->thread_data)
+            data->stats.setIteration(iter);
+    }
+
     CPUData* cpu_data = nullptr;
     if (sInterface->setup.acquire_stats) {
         cpu_data = sInterface->getThreadData();
@@ -1102,6 +1171,10 @@ void glue_setup(const DriverSetupSettings& settings)
     IG_ASSERT(sInterface == nullptr, "Only a single instance allowed!");
     sInterface = std::make_unique<Interface>(settings);
 
+    // Compiled modules are stored and looked up by their source in the given directory
+    if (settings.cache_dir != nullptr)
+        anydsl_set_cache_directory(settings.cache_dir);
+
     // Make sure the functions exposed are available in the linking process
     anydsl_link(settings.driver_filename);
 }
@@ -1426,6 +1499,39 @@ IG_EXPORT void ignis_load_packed_image(int32_t dev, const char* file, uint32_t**
     *height   = (int)std::get<2>(img);
 }
 
+IG_EXPORT void ignis_load_tiled_image(int32_t, const char* file, int32_t level, int32_t* handle, int32_t* width, int32_t* height)
+{
+    *handle = sInterface->loadTiledImage(file);
+    if (*handle < 0) {
+        *width  = 1;
+        *height = 1;
+        return;
+    }
+
+    auto& image = sInterface->tile_cache->image((uint32_t)*handle);
+    auto& info  = image.level(std::min((size_t)std::max(0, level), image.levelCount() - 1));
+    *width      = (int)info.Width;
+    *height     = (int)info.Height;
+}
+
+IG_EXPORT void ignis_fetch_tiled_image(int32_t handle, int32_t level, int32_t x, int32_t y, float* rgba)
+{
+    if (handle < 0) {
+        std::fill_n(rgba, 4, 0.0f);
+        return;
+    }
+
+    sInterface->tile_cache->fetch((uint32_t)handle, (size_t)std::max(0, level), (size_t)std::max(0, x), (size_t)std::max(0, y), rgba);
+}
+
+IG_EXPORT void ignis_load_tiled_image_level(int32_t dev, const char* file, int32_t level, float** pixels, int32_t* width, int32_t* height)
+{
+    auto& img = sInterface->loadTiledImageLevel(dev, file, (size_t)std::max(0, level));
+    *pixels   = const_cast<float*>(std::get<0>(img).data());
+    *width    = (int)std::get<1>(img);
+    *height   = (int)std::get<2>(img);
+}
+
 IG_EXPORT void ignis_load_buffer(int32_t dev, const char* file, uint8_t** data, int32_t* size)
 {
     auto& img = sInterface->loadBuffer(dev, file);
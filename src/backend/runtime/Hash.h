@@ -0,0 +1,90 @@
+#pragma once
+
+#include "IG_Config.h"
+
+#include <iomanip>
+#include <sstream>
+
+namespace IG {
+/// Simple and fast non-cryptographic 64bit hash.
+/// The result is stable between runs and processes, which makes it suitable as a key for on-disk caches
+class Hasher {
+public:
+    inline explicit Hasher(uint64 seed = 0)
+        : mState(seed ^ 0x9E3779B97F4A7C15ull)
+    {
+    }
+
+    inline Hasher& add(const void* data, size_t size)
+    {
+        const uint8* ptr = reinterpret_cast<const uint8*>(data);
+
+        size_t i = 0;
+        for (; i + sizeof(uint64) <= size; i += sizeof(uint64)) {
+            uint64 k;
+            std::memcpy(&k, ptr + i, sizeof(uint64));
+            mix(k);
+        }
+
+        if (i < size) {
+            uint64 k = 0;
+            std::memcpy(&k, ptr + i, size - i);
+            mix(k ^ (uint64(size - i) << 56));
+        }
+
+        mix(size);
+        return *this;
+    }
+
+    template <typename T>
+    inline Hasher& add(const T& value)
+    {
+        static_assert(std::is_trivially_copyable_v<T>, "Expected plain data to hash");
+        return add(&value, sizeof(T));
+    }
+
+    inline Hasher& add(const std::string& str) { return add(str.data(), str.size()); }
+
+    template <typename T>
+    inline Hasher& add(const std::vector<T>& vec)
+    {
+        static_assert(std::is_trivially_copyable_v<T>, "Expected plain data to hash");
+        return add(vec.data(), vec.size() * sizeof(T));
+    }
+
+    /// Final hash value
+    inline uint64 value() const
+    {
+        // Avalanche (splitmix64 finalizer)
+        uint64 h = mState;
+        h ^= h >> 30;
+        h *= 0xBF58476D1CE4E5B9ull;
+        h ^= h >> 27;
+        h *= 0x94D049BB133111EBull;
+        h ^= h >> 31;
+        return h;
+    }
+
+    /// Final hash value as a hexadecimal string with fixed width
+    inline std::string hex() const
+    {
+        std::stringstream stream;
+        stream << std::hex << std::setw(16) << std::setfill('0') << value();
+        return stream.str();
+    }
+
+private:
+    inline void mix(uint64 k)
+    {
+        k *= 0x87C37B91114253D5ull;
+        k = (k << 31) | (k >> 33);
+        k *= 0x4CF5AD432745937Full;
+
+        mState ^= k;
+        mState = (mState << 27) | (mState >> 37);
+        mState = mState * 5 + 0x52DCE729;
+    }
+
+    uint64 mState;
+};
+} // namespace IG
\ No newline at end of file
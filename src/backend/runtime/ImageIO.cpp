@@ -59,6 +59,110 @@ EXRAttribute makeIntAttribute(const std::string_view& name, int data)
     return attr;
 }
 
+static inline std::string getStringAttribute(const EXRAttribute& attr)
+{
+    int len;
+    memcpy(&len, attr.value, sizeof(len));
+
+    std::string str;
+    str.resize(len);
+    memcpy(str.data(), attr.value + sizeof(len), len);
+
+    return str;
+}
+
+static inline Vector3f getVec3Attribute(const EXRAttribute& attr)
+{
+    float xyz[3];
+    memcpy(xyz, attr.value, 3 * sizeof(float));
+    return Vector3f(xyz[0], xyz[1], xyz[2]);
+}
+
+static inline int getIntAttribute(const EXRAttribute& attr)
+{
+    return *reinterpret_cast<const int*>(attr.value);
+}
+
+// Also used by Image::load
+void readEXRMetaData(const EXRHeader& header, ImageMetaData& metaData)
+{
+    for (int i = 0; i < header.num_custom_attributes; ++i) {
+        const auto& attr = header.custom_attributes[i];
+        if (strcmp(attr.name, "igCameraType") == 0 && strcmp(attr.type, "string") == 0)
+            metaData.CameraType = getStringAttribute(attr);
+        else if (strcmp(attr.name, "igTechniqueType") == 0 && strcmp(attr.type, "string") == 0)
+            metaData.TechniqueType = getStringAttribute(attr);
+        else if (strcmp(attr.name, "igCameraEye") == 0 && strcmp(attr.type, "v3f") == 0)
+            metaData.CameraEye = getVec3Attribute(attr);
+        else if (strcmp(attr.name, "igCameraUp") == 0 && strcmp(attr.type, "v3f") == 0)
+            metaData.CameraUp = getVec3Attribute(attr);
+        else if (strcmp(attr.name, "igCameraDir") == 0 && strcmp(attr.type, "v3f") == 0)
+            metaData.CameraDir = getVec3Attribute(attr);
+        else if (strcmp(attr.name, "igSPP") == 0 && strcmp(attr.type, "int") == 0)
+            metaData.SamplePerPixel = getIntAttribute(attr);
+    }
+}
+
+void ImageIO::load(const std::filesystem::path& path, size_t& width, size_t& height,
+                   std::vector<std::vector<float>>& layers, std::vector<std::string>& layer_names,
+                   ImageMetaData* metaData)
+{
+    EXRVersion exr_version;
+    int ret = ParseEXRVersionFromFile(&exr_version, path.generic_u8string().c_str());
+    if (ret != 0)
+        throw ImageLoadException("Could not extract exr version information", path);
+
+    EXRHeader exr_header;
+    InitEXRHeader(&exr_header);
+
+    const char* err = nullptr;
+    ret             = ParseEXRHeaderFromFile(&exr_header, &exr_version, path.generic_u8string().c_str(), &err);
+    if (ret != 0) {
+        std::string _err = err;
+        FreeEXRErrorMessage(err);
+        throw ImageLoadException(_err, path);
+    }
+
+    if (metaData)
+        readEXRMetaData(exr_header, *metaData);
+
+    // Make sure exr loads full floating point
+    for (int i = 0; i < exr_header.num_channels; i++) {
+        if (exr_header.pixel_types[i] == TINYEXR_PIXELTYPE_HALF)
+            exr_header.requested_pixel_types[i] = TINYEXR_PIXELTYPE_FLOAT;
+    }
+
+    EXRImage exr_image;
+    InitEXRImage(&exr_image);
+    ret = LoadEXRImageFromFile(&exr_image, &exr_header, path.generic_u8string().c_str(), &err);
+    if (ret != TINYEXR_SUCCESS) {
+        std::string _err = err;
+        FreeEXRErrorMessage(err);
+        FreeEXRHeader(&exr_header);
+        throw ImageLoadException(_err, path);
+    }
+
+    width  = exr_image.width;
+    height = exr_image.height;
+
+    layers.resize(exr_header.num_channels);
+    layer_names.resize(exr_header.num_channels);
+    for (int c = 0; c < exr_header.num_channels; ++c) {
+        if (exr_header.requested_pixel_types[c] != TINYEXR_PIXELTYPE_FLOAT) {
+            FreeEXRHeader(&exr_header);
+            FreeEXRImage(&exr_image);
+            throw ImageLoadException("Expected channels of floating point type", path);
+        }
+
+        const float* src = reinterpret_cast<float**>(exr_image.images)[c];
+        layer_names[c]   = exr_header.channels[c].name;
+        layers[c].assign(src, src + width * height);
+    }
+
+    FreeEXRHeader(&exr_header);
+    FreeEXRImage(&exr_image);
+}
+
 bool ImageIO::save(const std::filesystem::path& path, size_t width, size_t height,
                    const std::vector<const float*>& layer_ptrs, const std::vector<std::string>& layer_names,
                    const ImageMetaData& metaData)
@@ -15,6 +15,12 @@ struct ImageMetaData {
 
 class ImageIO {
 public:
+    /// Load all channels of an EXR file. The channels are returned in file order, each with width*height floats.
+    /// Throws ImageLoadException on error
+    static void load(const std::filesystem::path& path, size_t& width, size_t& height,
+                     std::vector<std::vector<float>>& layers, std::vector<std::string>& layer_names,
+                     ImageMetaData* metaData = nullptr);
+
     static bool save(const std::filesystem::path& path, size_t width, size_t height,
                      const std::vector<const float*>& layer_ptrs, const std::vector<std::string>& layer_names,
                      const ImageMetaData& metaData = ImageMetaData());
@@ -73,6 +73,11 @@ bool Logger::isUsingAnsiTerminal() const
     return mConsoleLogListener->isUsingAnsi();
 }
 
+void Logger::useStdErr(bool b)
+{
+    mConsoleLogListener->useStdErr(b);
+}
+
 void Logger::addListener(const std::shared_ptr<LogListener>& listener)
 {
     mListener.push_back(listener);
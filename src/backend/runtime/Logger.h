@@ -84,6 +84,9 @@ public:
     void enableAnsiTerminal(bool b);
     bool isUsingAnsiTerminal() const;
 
+    /// Write console output to the standard error stream, e.g., if the standard output is used for data
+    void useStdErr(bool b);
+
     std::ostream& startEntry(LogLevel level);
 
     static inline Logger& instance()
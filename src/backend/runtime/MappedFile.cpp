@@ -0,0 +1,122 @@
+#include "MappedFile.h"
+
+#if defined(IG_OS_LINUX) || defined(IG_OS_APPLE)
+#define USE_MMAP
+#include <fcntl.h>
+#include <sys/mman.h>
+#include <sys/stat.h>
+#include <unistd.h>
+#elif defined(IG_OS_WINDOWS)
+#define WIN32_LEAN_AND_MEAN
+#include <Windows.h>
+#else
+#error Memory mapping implementation missing
+#endif
+
+namespace IG {
+class MappedFileInternal {
+    IG_CLASS_NON_COPYABLE(MappedFileInternal);
+    IG_CLASS_NON_MOVEABLE(MappedFileInternal);
+
+public:
+    const uint8* Data = nullptr;
+    size_t Size       = 0;
+
+#ifdef USE_MMAP
+    explicit MappedFileInternal(const std::filesystem::path& path)
+    {
+        const int fd = open(path.u8string().c_str(), O_RDONLY);
+        if (fd < 0)
+            throw std::runtime_error("Could not open file " + path.u8string());
+
+        struct stat st;
+        if (fstat(fd, &st) != 0) {
+            close(fd);
+            throw std::runtime_error("Could not query size of file " + path.u8string());
+        }
+
+        Size = (size_t)st.st_size;
+        if (Size > 0) {
+            void* ptr = mmap(nullptr, Size, PROT_READ, MAP_PRIVATE, fd, 0);
+            if (ptr == MAP_FAILED) {
+                close(fd);
+                throw std::runtime_error("Could not map file " + path.u8string());
+            }
+            Data = reinterpret_cast<const uint8*>(ptr);
+        }
+
+        // The mapping stays valid after closing the descriptor
+        close(fd);
+    }
+
+    ~MappedFileInternal()
+    {
+        if (Data)
+            munmap(const_cast<uint8*>(Data), Size);
+    }
+#elif defined(IG_OS_WINDOWS)
+    HANDLE File    = INVALID_HANDLE_VALUE;
+    HANDLE Mapping = nullptr;
+
+    explicit MappedFileInternal(const std::filesystem::path& path)
+    {
+        File = CreateFileW(path.c_str(), GENERIC_READ, FILE_SHARE_READ, nullptr, OPEN_EXISTING, FILE_ATTRIBUTE_NORMAL, nullptr);
+        if (File == INVALID_HANDLE_VALUE)
+            throw std::runtime_error("Could not open file " + path.u8string());
+
+        LARGE_INTEGER size;
+        if (!GetFileSizeEx(File, &size)) {
+            CloseHandle(File);
+            throw std::runtime_error("Could not query size of file " + path.u8string());
+        }
+
+        Size = (size_t)size.QuadPart;
+        if (Size > 0) {
+            Mapping = CreateFileMappingW(File, nullptr, PAGE_READONLY, 0, 0, nullptr);
+            if (Mapping == nullptr) {
+                CloseHandle(File);
+                throw std::runtime_error("Could not map file " + path.u8string());
+            }
+
+            Data = reinterpret_cast<const uint8*>(MapViewOfFile(Mapping, FILE_MAP_READ, 0, 0, 0));
+            if (Data == nullptr) {
+                CloseHandle(Mapping);
+                CloseHandle(File);
+                throw std::runtime_error("Could not map file " + path.u8string());
+            }
+        }
+    }
+
+    ~MappedFileInternal()
+    {
+        if (Data)
+            UnmapViewOfFile(Data);
+        if (Mapping)
+            CloseHandle(Mapping);
+        if (File != INVALID_HANDLE_VALUE)
+            CloseHandle(File);
+    }
+#endif
+};
+
+MappedFile::MappedFile(const std::filesystem::path& file)
+    : mPath(file)
+    , mInternal(new MappedFileInternal(file))
+{
+}
+
+void MappedFile::unmap()
+{
+    mInternal.reset();
+}
+
+const uint8* MappedFile::data() const
+{
+    return mInternal ? mInternal->Data : nullptr;
+}
+
+size_t MappedFile::size() const
+{
+    return mInternal ? mInternal->Size : 0;
+}
+} // namespace IG
\ No newline at end of file
@@ -0,0 +1,25 @@
+#pragma once
+
+#include "IG_Config.h"
+
+namespace IG {
+/// Read-only memory mapping of a whole file
+class MappedFile {
+public:
+    MappedFile() = default;
+    explicit MappedFile(const std::filesystem::path& file);
+    ~MappedFile() = default;
+
+    void unmap();
+
+    inline operator bool() const { return mInternal != nullptr; }
+    inline const std::filesystem::path& path() const { return mPath; }
+
+    const uint8* data() const;
+    size_t size() const;
+
+private:
+    std::filesystem::path mPath;
+    std::shared_ptr<class MappedFileInternal> mInternal;
+};
+} // namespace IG
\ No newline at end of file
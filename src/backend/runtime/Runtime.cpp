@@ -1,11 +1,19 @@
 #include "Runtime.h"
 #include "Logger.h"
+#include "MappedFile.h"
+#include "config/Build.h"
 #include "loader/Parser.h"
+#include "serialization/FileSerializer.h"
+#include "serialization/MemorySerializer.h"
+#include "shader/ShaderCache.h"
 
+#include <algorithm>
 #include <chrono>
 #include <fstream>
 
 namespace IG {
+constexpr uint32 SnapshotMagic   = 0x53504E53; // 'SNPS'
+constexpr uint32 SnapshotVersion = 2;
 
 static inline void setup_technique(LoaderOptions& lopts, const RuntimeOptions& opts)
 {
@@ -127,6 +135,9 @@ Runtime::Runtime(const RuntimeOptions& opts)
         mScriptPreprocessor.loadStdLibFromDirectory(mOptions.ScriptDir);
     }
 
+    // The seed is only used while generating rays, therefore a registry parameter prevents recompilations for different seeds
+    setParameter("__seed", (int)opts.Seed);
+
     // Force flush to zero mode for denormals
 #if defined(__x86_64__) || defined(__amd64__) || defined(_M_X64)
     _mm_setcsr(_mm_getcsr() | (_MM_FLUSH_ZERO_ON | _MM_DENORMALS_ZERO_ON));
@@ -141,6 +152,9 @@ Runtime::~Runtime()
 
 bool Runtime::loadFromFile(const std::filesystem::path& path)
 {
+    if (to_lowercase(path.extension().generic_u8string()) == ".igs")
+        return loadSnapshot(path);
+
     // Parse scene file
     IG_LOG(L_DEBUG) << "Parsing scene file" << std::endl;
     const auto startParser = std::chrono::high_resolution_clock::now();
@@ -158,6 +172,11 @@ bool Runtime::loadFromFile(const std::filesystem::path& path)
 }
 
 bool Runtime::loadFromString(const std::string& str)
+{
+    return loadFromString(str, MeshBufferMap{});
+}
+
+bool Runtime::loadFromString(const std::string& str, const MeshBufferMap& meshes)
 {
     // Parse scene string
     IG_LOG(L_DEBUG) << "Parsing scene string" << std::endl;
@@ -172,10 +191,232 @@ bool Runtime::loadFromString(const std::string& str)
     if (mOptions.AddExtraEnvLight)
         scene.addConstantEnvLight();
 
-    return load({}, std::move(scene));
+    // Make sure all given meshes are available as shapes
+    for (const auto& pair : meshes) {
+        if (!scene.shape(pair.first))
+            scene.addShape(pair.first, std::make_shared<Parser::Object>(Parser::OT_SHAPE, "buffer", std::filesystem::path{}));
+    }
+
+    return load({}, std::move(scene), meshes);
+}
+
+// Strings are stored as a block, as the default string serialization works character-wise
+static inline void serialize_block(Serializer& serializer, std::string& str)
+{
+    std::vector<uint8> buffer;
+    if (serializer.isReadMode()) {
+        serializer.read(buffer);
+        str.assign(buffer.begin(), buffer.end());
+    } else {
+        buffer.assign(str.begin(), str.end());
+        serializer.write(buffer);
+    }
+}
+
+static inline void serialize_optional(Serializer& serializer, std::optional<size_t>& value)
+{
+    bool has_value = value.has_value();
+    uint64 v       = value.value_or(0);
+    serializer | has_value | v;
+
+    if (serializer.isReadMode())
+        value = has_value ? std::make_optional<size_t>(v) : std::nullopt;
+}
+
+static inline void serialize_variant_info(Serializer& serializer, TechniqueVariantInfo& info)
+{
+    uint32 shadow_mode = (uint32)info.ShadowHandlingMode;
+    serializer | shadow_mode | info.UsesLights | info.UsesMedia | info.UsesAllLightsInMiss | info.RequiresExplicitCamera | info.LockFramebuffer;
+    info.ShadowHandlingMode = (ShadowHandlingMode)shadow_mode;
+
+    serialize_optional(serializer, info.OverrideWidth);
+    serialize_optional(serializer, info.OverrideHeight);
+    serialize_optional(serializer, info.OverrideSPI);
+}
+
+static inline void serialize_variant(Serializer& serializer, TechniqueVariant& variant)
+{
+    const auto serialize_list = [&](std::vector<std::string>& list) {
+        uint64 count = list.size();
+        serializer | count;
+        list.resize(count);
+        for (auto& str : list)
+            serialize_block(serializer, str);
+    };
+
+    serialize_block(serializer, variant.RayGenerationShader);
+    serialize_block(serializer, variant.MissShader);
+    serialize_list(variant.HitShaders);
+    serialize_list(variant.AdvancedShadowHitShaders);
+    serialize_list(variant.AdvancedShadowMissShaders);
+    for (auto& str : variant.CallbackShaders)
+        serialize_block(serializer, str);
+}
+
+static inline void serialize_database(Serializer& serializer, SceneDatabase& database)
+{
+    serializer | database.EntityTable | database.ShapeTable | database.BVHTable;
+
+    uint64 table_count = database.CustomTables.size();
+    serializer | table_count;
+    if (serializer.isReadMode()) {
+        database.CustomTables.clear();
+        for (size_t i = 0; i < table_count; ++i) {
+            std::string name;
+            serializer | name;
+            serializer | database.CustomTables[name];
+        }
+    } else {
+        for (auto& pair : database.CustomTables) {
+            std::string name = pair.first;
+            serializer | name | pair.second;
+        }
+    }
+
+    uint64 material_count = database.MaterialCount;
+    serializer | database.SceneBVH.Nodes | database.SceneBVH.Leaves;
+    serializer | database.SceneRadius | database.SceneBBox.min | database.SceneBBox.max;
+    serializer | material_count | database.EntityToMaterial;
+    database.MaterialCount = material_count;
+}
+
+void Runtime::serializeSnapshot(Serializer& serializer)
+{
+    uint64 film_width  = mFilmWidth;
+    uint64 film_height = mFilmHeight;
+    uint64 spi         = mSamplesPerIteration;
+    serializer | mTechniqueName | mCameraName | film_width | film_height | spi;
+    mFilmWidth           = film_width;
+    mFilmHeight          = film_height;
+    mSamplesPerIteration = spi;
+
+    serializer | mInitialCameraOrientation.Eye | mInitialCameraOrientation.Dir | mInitialCameraOrientation.Up;
+
+    serializer | mTechniqueInfo.EnabledAOVs;
+
+    uint64 variant_count = mTechniqueVariants.size();
+    serializer | variant_count;
+    mTechniqueInfo.Variants.resize(variant_count);
+    mTechniqueVariants.resize(variant_count);
+    for (size_t i = 0; i < variant_count; ++i) {
+        serialize_variant_info(serializer, mTechniqueInfo.Variants[i]);
+        serialize_variant(serializer, mTechniqueVariants[i]);
+    }
+
+    serialize_database(serializer, mDatabase);
+
+    // Tiled textures are read from the on-disk cache while rendering, therefore the used entries have to be protected from eviction
+    std::vector<std::string> cache_keys(mCacheKeys.begin(), mCacheKeys.end());
+    serializer | cache_keys;
+    mCacheKeys = std::unordered_set<std::string>(cache_keys.begin(), cache_keys.end());
+}
+
+bool Runtime::saveSnapshot(const std::filesystem::path& path) const
+{
+    if (mTechniqueVariants.empty()) {
+        IG_LOG(L_ERROR) << "No scene loaded!" << std::endl;
+        return false;
+    }
+
+    // Callbacks can not be stored. Techniques making use of them have to be loaded from the scene
+    if (mTechniqueInfo.VariantSelector) {
+        IG_LOG(L_ERROR) << "Technique '" << mTechniqueName << "' makes use of a variant selector and can not be stored in a snapshot" << std::endl;
+        return false;
+    }
+
+    const auto start = std::chrono::high_resolution_clock::now();
+
+    FileSerializer serializer(path, false);
+    if (!serializer.isValid()) {
+        IG_LOG(L_ERROR) << "Could not open snapshot file " << path << std::endl;
+        return false;
+    }
+
+    uint32 magic      = SnapshotMagic;
+    uint32 version    = SnapshotVersion;
+    uint32 target     = (uint32)mTarget;
+    std::string build = Build::getBuildString();
+    serializer | magic | version | target | build;
+
+    // Serialization is symmetric and does not modify the runtime in write mode
+    const_cast<Runtime*>(this)->serializeSnapshot(serializer);
+
+    serializer | magic;
+
+    IG_LOG(L_DEBUG) << "Saving snapshot took " << std::chrono::duration_cast<std::chrono::milliseconds>(std::chrono::high_resolution_clock::now() - start).count() / 1000.0f << " seconds" << std::endl;
+    return true;
+}
+
+bool Runtime::loadSnapshot(const std::filesystem::path& path)
+{
+    if (!mTechniqueVariants.empty()) {
+        IG_LOG(L_ERROR) << "A scene is already loaded!" << std::endl;
+        return false;
+    }
+
+    IG_LOG(L_DEBUG) << "Loading snapshot " << path << std::endl;
+    const auto start = std::chrono::high_resolution_clock::now();
+
+    try {
+        MappedFile file(path);
+
+        // Only reading from the mapped memory
+        MemorySerializer serializer(const_cast<uint8*>(file.data()), file.size(), true);
+
+        uint32 magic   = 0;
+        uint32 version = 0;
+        uint32 target  = 0;
+        std::string build;
+        serializer | magic | version;
+        if (magic != SnapshotMagic) {
+            IG_LOG(L_ERROR) << "File " << path << " is not a snapshot" << std::endl;
+            return false;
+        }
+        if (version != SnapshotVersion) {
+            IG_LOG(L_ERROR) << "Snapshot " << path << " has version " << version << " but version " << SnapshotVersion << " is expected. Please recreate the snapshot" << std::endl;
+            return false;
+        }
+
+        serializer | target | build;
+        if (target != (uint32)mTarget) {
+            IG_LOG(L_ERROR) << "Snapshot " << path << " was created for target " << targetToString((Target)target) << " but the runtime uses " << targetToString(mTarget) << std::endl;
+            return false;
+        }
+        if (build != Build::getBuildString()) {
+            IG_LOG(L_ERROR) << "Snapshot " << path << " was created by a different build. Please recreate the snapshot" << std::endl;
+            return false;
+        }
+
+        serializeSnapshot(serializer);
+
+        magic = 0;
+        serializer | magic;
+        if (magic != SnapshotMagic) {
+            IG_LOG(L_ERROR) << "Snapshot " << path << " is corrupted" << std::endl;
+            mTechniqueVariants.clear();
+            return false;
+        }
+    } catch (const std::exception& e) {
+        IG_LOG(L_ERROR) << "Could not load snapshot " << path << ": " << e.what() << std::endl;
+        mTechniqueVariants.clear();
+        return false;
+    }
+
+    IG_LOG(L_DEBUG) << "Loading snapshot took " << std::chrono::duration_cast<std::chrono::milliseconds>(std::chrono::high_resolution_clock::now() - start).count() / 1000.0f << " seconds" << std::endl;
+
+    // Generated shaders are fixed, only the size of the film can be changed afterwards
+    if (!mOptions.OverrideTechnique.empty() || !mOptions.OverrideCamera.empty() || mOptions.SPI != 0)
+        IG_LOG(L_WARNING) << "Technique, camera and spi are fixed by the snapshot. Given overrides are ignored" << std::endl;
+
+    if (mOptions.OverrideFilmSize.first > 0)
+        mFilmWidth = mOptions.OverrideFilmSize.first;
+    if (mOptions.OverrideFilmSize.second > 0)
+        mFilmHeight = mOptions.OverrideFilmSize.second;
+
+    return setup();
 }
 
-bool Runtime::load(const std::filesystem::path& path, Parser::Scene&& scene)
+bool Runtime::load(const std::filesystem::path& path, Parser::Scene&& scene, const MeshBufferMap& meshes)
 {
     LoaderOptions lopts;
     lopts.FilePath = path;
@@ -183,6 +424,10 @@ bool Runtime::load(const std::filesystem::path& path, Parser::Scene&& scene)
     lopts.IsTracer = mOptions.IsTracer;
     lopts.Scene    = std::move(scene);
 
+    lopts.MeshBuffers = meshes;
+    if (mOptions.EnableCache)
+        lopts.CacheDir = mOptions.CacheDir.empty() ? ShaderCache::defaultDirectory() : mOptions.CacheDir;
+
     // Extract technique
     setup_technique(lopts, mOptions);
 
@@ -215,6 +460,7 @@ bool Runtime::load(const std::filesystem::path& path, Parser::Scene&& scene)
     mTechniqueInfo            = result.TechniqueInfo;
     mInitialCameraOrientation = result.CameraOrientation;
     mTechniqueVariants        = std::move(result.TechniqueVariants);
+    mCacheKeys                = std::move(result.CacheKeys);
 
     return setup();
 }
@@ -269,6 +515,16 @@ void Runtime::stepVariant(size_t variant)
 }
 
 void Runtime::trace(const std::vector<Ray>& rays, std::vector<float>& data)
+{
+    trace(rays);
+
+    // Get result
+    const float* data_ptr = getFramebuffer(0);
+    data.resize(rays.size() * 3);
+    std::memcpy(data.data(), data_ptr, sizeof(float) * rays.size() * 3);
+}
+
+void Runtime::trace(const std::vector<Ray>& rays)
 {
     if (!mOptions.IsTracer) {
         IG_LOG(L_ERROR) << "Trying to use trace() in a camera driver!" << std::endl;
@@ -280,6 +536,10 @@ void Runtime::trace(const std::vector<Ray>& rays, std::vector<float>& data)
         return;
     }
 
+    // The framebuffer contains exactly one entry per ray
+    if (!rays.empty() && (mFilmWidth != rays.size() || mFilmHeight != 1))
+        resizeFramebuffer(rays.size(), 1);
+
     if (mTechniqueInfo.VariantSelector) {
         const auto& active = mTechniqueInfo.VariantSelector(mCurrentIteration);
         for (const auto& ind : active)
@@ -290,11 +550,6 @@ void Runtime::trace(const std::vector<Ray>& rays, std::vector<float>& data)
     }
 
     ++mCurrentIteration;
-
-    // Get result
-    const float* data_ptr = getFramebuffer(0);
-    data.resize(rays.size() * 3);
-    std::memcpy(data.data(), data_ptr, sizeof(float) * rays.size() * 3);
 }
 
 void Runtime::traceVariant(const std::vector<Ray>& rays, size_t variant)
@@ -355,6 +610,16 @@ const Statistics* Runtime::getStatistics() const
     return mAcquireStats ? mLoadedInterface.GetStatisticsFunction() : nullptr;
 }
 
+bool Runtime::saveTimeline(const std::filesystem::path& path) const
+{
+    if (!mOptions.AcquireTimeline) {
+        IG_LOG(L_ERROR) << "Trying to save a timeline without the timeline being recorded" << std::endl;
+        return false;
+    }
+
+    return mLoadedInterface.GetStatisticsFunction()->exportTimeline(path);
+}
+
 bool Runtime::setup()
 {
     const std::string driver_filename = mManager.getPath(mTarget).generic_u8string();
@@ -364,17 +629,50 @@ bool Runtime::setup()
     settings.database           = &mDatabase;
     settings.framebuffer_width  = (uint32)mFilmWidth;
     settings.framebuffer_height = (uint32)mFilmHeight;
-    settings.acquire_stats      = mAcquireStats;
+    settings.acquire_stats      = mAcquireStats || mOptions.AcquireTimeline;
+    settings.acquire_timeline   = mOptions.AcquireTimeline;
     settings.aov_count          = mTechniqueInfo.EnabledAOVs.size();
 
     settings.logger = &IG_LOGGER;
 
+    // Setup shader cache
+    std::unique_ptr<ShaderCache> cache;
+    std::string cache_key;
+    std::string cache_dir;
+    if (mOptions.EnableCache) {
+        std::vector<std::string> sources;
+        for (const auto& variant : mTechniqueVariants) {
+            sources.push_back(variant.RayGenerationShader);
+            sources.push_back(variant.MissShader);
+            sources.insert(sources.end(), variant.HitShaders.begin(), variant.HitShaders.end());
+            sources.insert(sources.end(), variant.AdvancedShadowHitShaders.begin(), variant.AdvancedShadowHitShaders.end());
+            sources.insert(sources.end(), variant.AdvancedShadowMissShaders.begin(), variant.AdvancedShadowMissShaders.end());
+            sources.insert(sources.end(), variant.CallbackShaders.begin(), variant.CallbackShaders.end());
+        }
+        sources.push_back(mOptions.ScriptDir.generic_u8string());
+
+        cache     = std::make_unique<ShaderCache>(mOptions.CacheDir.empty() ? ShaderCache::defaultDirectory() : mOptions.CacheDir, mOptions.CacheMaxSize);
+        cache_key = ShaderCache::computeKey(sources, mTarget, mDevice, mManager.getPath(mTarget));
+        cache_dir = cache->acquire(cache_key).generic_u8string();
+        if (!cache_dir.empty()) {
+            IG_LOG(L_DEBUG) << "Using shader cache " << cache_dir << std::endl;
+            settings.cache_dir = cache_dir.c_str();
+        }
+    }
+
     IG_LOG(L_DEBUG) << "Init driver" << std::endl;
     mLoadedInterface.SetupFunction(settings);
 
     if (!compileShaders())
         return false;
 
+    if (cache) {
+        // Entries acquired while loading the scene are still in use
+        std::unordered_set<std::string> active_keys = mCacheKeys;
+        active_keys.insert(cache_key);
+        cache->evict(active_keys);
+    }
+
     clearFramebuffer();
     return true;
 }
@@ -386,90 +684,99 @@ void Runtime::shutdown()
 
 bool Runtime::compileShaders()
 {
+    // A single shader to be compiled
+    struct ShaderJob {
+        const std::string* Source;
+        const char* Function;
+        std::string Name;
+        std::string Description;
+        void** Output;
+        size_t PrepareMS;
+        size_t CompileMS;
+    };
+
     const auto startJIT = std::chrono::high_resolution_clock::now();
+
+    // Gather all shaders of all variants
+    std::vector<ShaderJob> jobs;
     mTechniqueVariantShaderSets.resize(mTechniqueVariants.size());
     for (size_t i = 0; i < mTechniqueVariants.size(); ++i) {
         const auto& variant = mTechniqueVariants[i];
         auto& shaders       = mTechniqueVariantShaderSets[i];
+        const std::string v = "v" + std::to_string(i);
 
-        IG_LOG(L_DEBUG) << "Handling technique variant " << i << std::endl;
-        IG_LOG(L_DEBUG) << "Compiling ray generation shader" << std::endl;
-        shaders.RayGenerationShader = compileShader(variant.RayGenerationShader, "ig_ray_generation_shader", "v" + std::to_string(i) + "_rayGeneration");
-        if (shaders.RayGenerationShader == nullptr) {
-            IG_LOG(L_ERROR) << "Failed to compile ray generation shader in variant " << i << "." << std::endl;
-            return false;
-        }
+        shaders.HitShaders.resize(variant.HitShaders.size(), nullptr);
+        shaders.AdvancedShadowHitShaders.resize(variant.AdvancedShadowHitShaders.size(), nullptr);
+        shaders.AdvancedShadowMissShaders.resize(variant.AdvancedShadowMissShaders.size(), nullptr);
 
-        IG_LOG(L_DEBUG) << "Compiling miss shader" << std::endl;
-        shaders.MissShader = compileShader(variant.MissShader, "ig_miss_shader", "v" + std::to_string(i) + "_missShader");
-        if (shaders.MissShader == nullptr) {
-            IG_LOG(L_ERROR) << "Failed to compile miss shader in variant " << i << "." << std::endl;
-            return false;
-        }
+        jobs.push_back(ShaderJob{ &variant.RayGenerationShader, "ig_ray_generation_shader", v + "_rayGeneration", "ray generation shader", &shaders.RayGenerationShader, 0, 0 });
+        jobs.push_back(ShaderJob{ &variant.MissShader, "ig_miss_shader", v + "_missShader", "miss shader", &shaders.MissShader, 0, 0 });
 
-        IG_LOG(L_DEBUG) << "Compiling hit shaders" << std::endl;
-        for (size_t j = 0; j < variant.HitShaders.size(); ++j) {
-            IG_LOG(L_DEBUG) << "Compiling Hit shader [" << j << "]" << std::endl;
-            shaders.HitShaders.push_back(compileShader(variant.HitShaders[j].c_str(), "ig_hit_shader", "v" + std::to_string(i) + "_hitShader" + std::to_string(j)));
-            if (shaders.HitShaders[j] == nullptr) {
-                IG_LOG(L_ERROR) << "Failed to compile hit shader " << j << " in variant " << i << "." << std::endl;
-                return false;
-            }
-        }
+        for (size_t j = 0; j < variant.HitShaders.size(); ++j)
+            jobs.push_back(ShaderJob{ &variant.HitShaders[j], "ig_hit_shader", v + "_hitShader" + std::to_string(j), "hit shader " + std::to_string(j), &shaders.HitShaders[j], 0, 0 });
 
-        if (!variant.AdvancedShadowHitShaders.empty()) {
-            IG_LOG(L_DEBUG) << "Compiling advanced shadow shaders" << std::endl;
+        for (size_t j = 0; j < variant.AdvancedShadowHitShaders.size(); ++j)
+            jobs.push_back(ShaderJob{ &variant.AdvancedShadowHitShaders[j], "ig_advanced_shadow_shader", v + "_advancedShadowHit" + std::to_string(j), "advanced shadow hit shader " + std::to_string(j), &shaders.AdvancedShadowHitShaders[j], 0, 0 });
 
-            for (size_t j = 0; j < variant.AdvancedShadowHitShaders.size(); ++j) {
-                IG_LOG(L_DEBUG) << "Compiling Advanced Shadow Hit shader [" << j << "]" << std::endl;
-                shaders.AdvancedShadowHitShaders.push_back(compileShader(variant.AdvancedShadowHitShaders[j].c_str(), "ig_advanced_shadow_shader", "v" + std::to_string(i) + "_advancedShadowHit" + std::to_string(j)));
+        for (size_t j = 0; j < variant.AdvancedShadowMissShaders.size(); ++j)
+            jobs.push_back(ShaderJob{ &variant.AdvancedShadowMissShaders[j], "ig_advanced_shadow_shader", v + "_advancedShadowMiss" + std::to_string(j), "advanced shadow miss shader " + std::to_string(j), &shaders.AdvancedShadowMissShaders[j], 0, 0 });
 
-                if (shaders.AdvancedShadowHitShaders[j] == nullptr) {
-                    IG_LOG(L_ERROR) << "Failed to compile advanced shadow hit shader " << j << " in variant " << i << "." << std::endl;
-                    return false;
-                }
-            }
+        for (size_t j = 0; j < variant.CallbackShaders.size(); ++j) {
+            shaders.CallbackShaders[j] = nullptr;
+            if (!variant.CallbackShaders.at(j).empty())
+                jobs.push_back(ShaderJob{ &variant.CallbackShaders.at(j), "ig_callback_shader", v + "_callback" + std::to_string(j), "callback " + std::to_string(j) + " shader", &shaders.CallbackShaders[j], 0, 0 });
+        }
+    }
 
-            for (size_t j = 0; j < variant.AdvancedShadowMissShaders.size(); ++j) {
-                IG_LOG(L_DEBUG) << "Compiling Advanced Shadow Miss shader [" << j << "]" << std::endl;
-                shaders.AdvancedShadowMissShaders.push_back(compileShader(variant.AdvancedShadowMissShaders[j].c_str(), "ig_advanced_shadow_shader", "v" + std::to_string(i) + "_advancedShadowMiss" + std::to_string(j)));
+    IG_LOG(L_DEBUG) << "Compiling " << jobs.size() << " shaders for " << mTechniqueVariants.size() << " technique variants" << std::endl;
 
-                if (shaders.AdvancedShadowMissShaders[j] == nullptr) {
-                    IG_LOG(L_ERROR) << "Failed to compile advanced shadow miss shader " << j << " in variant " << i << "." << std::endl;
-                    return false;
-                }
-            }
-        }
+    // The jit compiler keeps global state, which is not known to be thread safe. Therefore the shaders are compiled one after another
+    for (auto& job : jobs) {
+        Timer prepareTimer;
+        prepareTimer.start();
+        const std::string full_shader = prepareShader(*job.Source, job.Name);
+        job.PrepareMS                 = prepareTimer.stopMS();
 
-        for (size_t j = 0; j < variant.CallbackShaders.size(); ++j) {
-            if (variant.CallbackShaders.at(j).empty()) {
-                shaders.CallbackShaders[j] = nullptr;
-            } else {
-                IG_LOG(L_DEBUG) << "Compiling callback shader [" << i << "]" << std::endl;
-                shaders.CallbackShaders[j] = compileShader(variant.CallbackShaders.at(j), "ig_callback_shader", "v" + std::to_string(i) + "_callback" + std::to_string(j));
-                if (shaders.CallbackShaders.at(j) == nullptr) {
-                    IG_LOG(L_ERROR) << "Failed to compile callback " << j << " shader in variant " << i << "." << std::endl;
-                    return false;
-                }
-            }
+        Timer compileTimer;
+        compileTimer.start();
+        *job.Output   = compileShader(full_shader, job.Function);
+        job.CompileMS = compileTimer.stopMS();
+    }
+
+    bool success = true;
+    for (const auto& job : jobs) {
+        if (*job.Output == nullptr) {
+            IG_LOG(L_ERROR) << "Failed to compile " << job.Description << " [" << job.Name << "]." << std::endl;
+            success = false;
         }
     }
+
+    // Report the most expensive shaders first
+    std::sort(jobs.begin(), jobs.end(), [](const ShaderJob& a, const ShaderJob& b) { return a.CompileMS > b.CompileMS; });
+    for (const auto& job : jobs)
+        IG_LOG(L_DEBUG) << "Compiling " << job.Name << " took " << job.CompileMS / 1000.0f << " seconds (preparation took " << job.PrepareMS / 1000.0f << " seconds)" << std::endl;
+
     IG_LOG(L_DEBUG) << "Compiling shaders took " << std::chrono::duration_cast<std::chrono::milliseconds>(std::chrono::high_resolution_clock::now() - startJIT).count() / 1000.0f << " seconds" << std::endl;
 
-    return true;
+    return success;
 }
 
-void* Runtime::compileShader(const std::string& src, const std::string& func, const std::string& name)
+std::string Runtime::prepareShader(const std::string& src, const std::string& name)
 {
     if (mOptions.DumpShader)
         dumpShader(name + ".art", src);
 
-    const std::string full_shader = mScriptPreprocessor.prepare(src);
+    std::string full_shader = mScriptPreprocessor.prepare(src);
 
     if (mOptions.DumpShaderFull)
         dumpShader(name + "_full.art", full_shader);
 
-    return mLoadedInterface.CompileSourceFunction(full_shader.c_str(), func.c_str(), IG_LOGGER.verbosity() == L_DEBUG);
+    return full_shader;
+}
+
+void* Runtime::compileShader(const std::string& full_src, const std::string& func)
+{
+    return mLoadedInterface.CompileSourceFunction(full_src.c_str(), func.c_str(), IG_LOGGER.verbosity() == L_DEBUG);
 }
 
 void Runtime::tonemap(uint32* out_pixels, const TonemapSettings& settings)
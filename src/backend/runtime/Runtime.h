@@ -12,6 +12,8 @@ namespace Parser {
 class Scene;
 }
 
+class Serializer;
+
 struct LoaderOptions;
 
 struct RuntimeOptions {
@@ -20,11 +22,13 @@ struct RuntimeOptions {
     bool DumpShader      = false;
     bool DumpShaderFull  = false;
     bool AcquireStats    = false;
+    bool AcquireTimeline = false; // Record every shader launch with a timestamp. See Runtime::saveTimeline
     Target DesiredTarget = Target::INVALID;
     bool RecommendCPU    = true;
     bool RecommendGPU    = true;
     uint32 Device        = 0;
     uint32 SPI           = 0; // Detect automatically
+    uint32 Seed          = 0; // Iteration offset of the random sequence. Runtimes with distinct seeds render distinct samples
     std::string OverrideTechnique;
     std::string OverrideCamera;
     std::pair<uint32, uint32> OverrideFilmSize = { 0, 0 };
@@ -32,6 +36,10 @@ struct RuntimeOptions {
     bool AddExtraEnvLight            = false;                           // User option to add a constant environment light (just to see something)
     std::filesystem::path ModulePath = std::filesystem::current_path(); // Optional path to modules
     std::filesystem::path ScriptDir  = {};                              // Path to a new script directory, replacing the internal standard library
+
+    bool EnableCache               = true;       // Store compiled shader modules and BVHs in an on-disk cache
+    std::filesystem::path CacheDir = {};         // Path to the shader cache directory. Empty uses the default location of the user
+    size_t CacheMaxSize            = 2ull << 30; // Maximum size of the shader cache in bytes. Least recently used entries are evicted first
 };
 
 class Runtime {
@@ -42,15 +50,24 @@ public:
     explicit Runtime(const RuntimeOptions& opts);
     ~Runtime();
 
-    /// Load from file and initialize
+    /// Load from file and initialize. Files with the '.igs' extension are loaded as snapshots, see loadSnapshot
     bool loadFromFile(const std::filesystem::path& path);
     /// Load from string and initialize
     bool loadFromString(const std::string& str);
+    /// Load from string and initialize. The given meshes are referenced by shapes of type 'buffer' and added as such if not referenced already
+    bool loadFromString(const std::string& str, const MeshBufferMap& meshes);
+
+    /// Write the loaded scene database and the generated shaders into a snapshot file
+    bool saveSnapshot(const std::filesystem::path& path) const;
+    /// Load a snapshot written by saveSnapshot and initialize. Parsing and loading of the scene is skipped entirely
+    bool loadSnapshot(const std::filesystem::path& path);
 
     /// Do a single iteration in non-tracing mode
     void step();
     /// Do a single iteration in tracing mode
     void trace(const std::vector<Ray>& rays, std::vector<float>& data);
+    /// Do a single iteration in tracing mode. The accumulated radiance of each ray is available in framebuffer 0 afterwards
+    void trace(const std::vector<Ray>& rays);
     /// Reset internal counters etc. This should be used if data (like camera orientation) has changed. Frame counter will NOT be reset
     void reset();
 
@@ -80,6 +97,9 @@ public:
     /// Return pointer to structure containing statistics
     const Statistics* getStatistics() const;
 
+    /// Write all shader launches recorded so far in the Chrome trace event format. Requires the AcquireTimeline option
+    bool saveTimeline(const std::filesystem::path& path) const;
+
     /// Returns the name of the loaded technique
     inline const std::string& technique() const { return mTechniqueName; }
 
@@ -106,6 +126,8 @@ public:
     void setParameter(const std::string& name, const Vector3f& value);
     /// Set 4d vector parameter in the registry. Will replace already present values
     void setParameter(const std::string& name, const Vector4f& value);
+    /// Return all parameters currently set in the registry
+    inline const ParameterSet& parameters() const { return mParameterSet; }
 
     /// The current framebuffer width
     inline size_t framebufferWidth() const { return mFilmWidth; }
@@ -125,11 +147,13 @@ public:
     static std::vector<std::string> getAvailableCameraTypes();
 
 private:
-    bool load(const std::filesystem::path& path, Parser::Scene&& scene);
+    bool load(const std::filesystem::path& path, Parser::Scene&& scene, const MeshBufferMap& meshes = {});
     bool setup();
     void shutdown();
+    void serializeSnapshot(Serializer& serializer);
     bool compileShaders();
-    void* compileShader(const std::string& src, const std::string& func, const std::string& name);
+    std::string prepareShader(const std::string& src, const std::string& name);
+    void* compileShader(const std::string& full_src, const std::string& func);
     void stepVariant(size_t variant);
     void traceVariant(const std::vector<Ray>& rays, size_t variant);
 
@@ -162,5 +186,7 @@ private:
 
     std::vector<TechniqueVariant> mTechniqueVariants;
     std::vector<TechniqueVariantShaderSet> mTechniqueVariantShaderSets; // Compiled shaders
+
+    std::unordered_set<std::string> mCacheKeys; // Entries of the on-disk cache used by the loaded scene
 };
 } // namespace IG
\ No newline at end of file
@@ -1,7 +1,25 @@
 #include "Statistics.h"
+#include "Logger.h"
+
+#include <algorithm>
+#include <atomic>
+#include <fstream>
 #include <sstream>
 
 namespace IG {
+static inline uint64 timestampUS()
+{
+    return (uint64)std::chrono::duration_cast<std::chrono::microseconds>(std::chrono::steady_clock::now().time_since_epoch()).count();
+}
+
+// Small and stable index of the calling thread, which is easier to read in a timeline than the system thread id
+static inline uint32 threadIndex()
+{
+    static std::atomic<uint32> counter = 0;
+    thread_local uint32 index          = counter++;
+    return index;
+}
+
 Statistics::Statistics()
     : mQuantities()
 {
@@ -16,12 +34,22 @@ void Statistics::beginShaderLaunch(ShaderType type, size_t workload, size_t id)
     stats->workload += workload;
     stats->max_workload = std::max(stats->max_workload, workload);
     stats->min_workload = std::min(stats->min_workload, workload);
+
+    if (mRecordTimeline) {
+        stats->last_workload = workload;
+        stats->last_startUS  = timestampUS();
+    }
 }
 
 void Statistics::endShaderLaunch(ShaderType type, size_t id)
 {
     ShaderStats* stats = getStats(type, id);
     stats->elapsedMS += stats->timer.stopMS();
+
+    if (mRecordTimeline) {
+        const uint64 end = timestampUS();
+        mTimeline.push_back(TimelineEvent{ type, id, stats->last_workload, mIteration, threadIndex(), stats->last_startUS, end - std::min(end, stats->last_startUS) });
+    }
 }
 
 Statistics::ShaderStats& Statistics::ShaderStats::operator+=(const Statistics::ShaderStats& other)
@@ -53,6 +81,68 @@ void Statistics::add(const Statistics& other)
 
     for (size_t i = 0; i < other.mQuantities.size(); ++i)
         mQuantities[i] += other.mQuantities[i];
+
+    mTimeline.insert(mTimeline.end(), other.mTimeline.begin(), other.mTimeline.end());
+}
+
+bool Statistics::exportTimeline(const std::filesystem::path& path) const
+{
+    std::ofstream stream(path);
+    if (!stream) {
+        IG_LOG(L_ERROR) << "Could not open " << path << " for writing" << std::endl;
+        return false;
+    }
+
+    std::vector<TimelineEvent> events = mTimeline;
+    std::sort(events.begin(), events.end(), [](const TimelineEvent& a, const TimelineEvent& b) { return a.StartUS < b.StartUS; });
+
+    const uint64 origin = events.empty() ? 0 : events.front().StartUS;
+
+    std::vector<uint32> threads;
+    for (const auto& event : events)
+        threads.push_back(event.Thread);
+    std::sort(threads.begin(), threads.end());
+    threads.erase(std::unique(threads.begin(), threads.end()), threads.end());
+
+    stream << "{\"displayTimeUnit\":\"ms\",\"traceEvents\":[" << std::endl;
+
+    bool first = true;
+    for (uint32 thread : threads) {
+        stream << (first ? "" : ",\n")
+               << "{\"name\":\"thread_name\",\"ph\":\"M\",\"pid\":0,\"tid\":" << thread
+               << ",\"args\":{\"name\":\"Thread " << thread << "\"}}";
+        first = false;
+    }
+
+    for (const auto& event : events) {
+        // Device launches span a whole iteration of a technique variant, all other launches are nested inside
+        const bool isIteration = event.Type == ShaderType::Device;
+        const bool hasID       = event.Type == ShaderType::Hit || event.Type == ShaderType::AdvancedShadowHit || event.Type == ShaderType::AdvancedShadowMiss || event.Type == ShaderType::Callback;
+
+        stream << (first ? "" : ",\n") << "{\"name\":\"";
+        if (isIteration)
+            stream << "Iteration " << event.Iteration;
+        else if (hasID)
+            stream << shaderTypeString(event.Type) << " @" << event.ID;
+        else
+            stream << shaderTypeString(event.Type);
+
+        stream << "\",\"cat\":\"" << (isIteration ? "iteration" : "shader") << "\""
+               << ",\"ph\":\"X\",\"pid\":0,\"tid\":" << event.Thread
+               << ",\"ts\":" << (event.StartUS - origin)
+               << ",\"dur\":" << event.DurationUS
+               << ",\"args\":{\"iteration\":" << event.Iteration
+               << ",\"workload\":" << event.Workload;
+        if (hasID)
+            stream << ",\"id\":" << event.ID;
+        stream << "}}";
+        first = false;
+    }
+
+    stream << std::endl
+           << "]}" << std::endl;
+
+    return (bool)stream;
 }
 
 class DumpTable {
@@ -231,6 +321,71 @@ std::string Statistics::dump(size_t totalMS, size_t iter, bool verbose) const
     return table.print(false, true);
 }
 
+std::vector<Statistics::ShaderEntry> Statistics::entries() const
+{
+    std::vector<ShaderEntry> entries;
+    const auto addSingle = [&](ShaderType type, const ShaderStats& stats) {
+        if (stats.count > 0)
+            entries.push_back(ShaderEntry{ type, 0, &stats });
+    };
+    const auto addMap = [&](ShaderType type, const std::map<size_t, ShaderStats>& map) {
+        for (const auto& pair : map) {
+            if (pair.second.count > 0)
+                entries.push_back(ShaderEntry{ type, pair.first, &pair.second });
+        }
+    };
+
+    addSingle(ShaderType::Device, mDeviceStats);
+    addSingle(ShaderType::RayGeneration, mRayGenerationStats);
+    addSingle(ShaderType::Miss, mMissStats);
+    addMap(ShaderType::Hit, mHitStats);
+    addMap(ShaderType::AdvancedShadowHit, mAdvancedShadowHitStats);
+    addMap(ShaderType::AdvancedShadowMiss, mAdvancedShadowMissStats);
+    addMap(ShaderType::Callback, mCallbackStats);
+    addSingle(ShaderType::ImageInfo, mImageInfoStats);
+    addSingle(ShaderType::Tonemap, mTonemapStats);
+
+    return entries;
+}
+
+const char* Statistics::shaderTypeString(ShaderType type)
+{
+    switch (type) {
+    default:
+    case ShaderType::Device:
+        return "Device";
+    case ShaderType::RayGeneration:
+        return "RayGeneration";
+    case ShaderType::Hit:
+        return "Hit";
+    case ShaderType::Miss:
+        return "Miss";
+    case ShaderType::AdvancedShadowHit:
+        return "AdvancedShadowHit";
+    case ShaderType::AdvancedShadowMiss:
+        return "AdvancedShadowMiss";
+    case ShaderType::Callback:
+        return "Callback";
+    case ShaderType::Tonemap:
+        return "Tonemap";
+    case ShaderType::ImageInfo:
+        return "ImageInfo";
+    }
+}
+
+const char* Statistics::quantityString(Quantity quantity)
+{
+    switch (quantity) {
+    default:
+    case Quantity::CameraRayCount:
+        return "CameraRayCount";
+    case Quantity::ShadowRayCount:
+        return "ShadowRayCount";
+    case Quantity::BounceRayCount:
+        return "BounceRayCount";
+    }
+}
+
 Statistics::ShaderStats* Statistics::getStats(ShaderType type, size_t id)
 {
     switch (type) {
@@ -248,7 +403,7 @@ Statistics::ShaderStats* Statistics::getStats(ShaderType type, size_t id)
     case ShaderType::AdvancedShadowMiss:
         return &mAdvancedShadowMissStats[id];
     case ShaderType::Callback:
-        return &mHitStats[id];
+        return &mCallbackStats[id];
     case ShaderType::Tonemap:
         return &mTonemapStats;
     case ShaderType::ImageInfo:
@@ -27,6 +27,17 @@ enum class Quantity {
     _COUNT
 };
 
+/// Single shader launch recorded on the timeline
+struct TimelineEvent {
+    ShaderType Type;
+    size_t ID;
+    size_t Workload;
+    size_t Iteration;
+    uint32 Thread;
+    uint64 StartUS; // Microseconds since an arbitrary, but fixed, point in time
+    uint64 DurationUS;
+};
+
 class Statistics {
 public:
     Statistics();
@@ -46,20 +57,49 @@ public:
 
     void add(const Statistics& other);
 
+    /// Record every shader launch with a timestamp in addition to the accumulated statistics
+    inline void enableTimeline(bool b = true) { mRecordTimeline = b; }
+    inline bool isTimelineEnabled() const { return mRecordTimeline; }
+
+    /// Set the iteration attached to all following timeline events
+    inline void setIteration(size_t iter) { mIteration = iter; }
+
+    [[nodiscard]] inline const std::vector<TimelineEvent>& timeline() const { return mTimeline; }
+
+    /// Export the recorded timeline in the Chrome trace event format, which can be loaded by chrome://tracing or Perfetto
+    bool exportTimeline(const std::filesystem::path& path) const;
+
     [[nodiscard]] std::string dump(size_t totalMS, size_t iter, bool verbose) const;
 
-private:
     struct ShaderStats {
         Timer timer;
-        size_t elapsedMS    = 0;
-        size_t count        = 0;
-        size_t workload     = 0; // This might overflow, but who cares for statistical stuff after that huge number of iterations
-        size_t max_workload = 0;
-        size_t min_workload = std::numeric_limits<size_t>::max();
+        size_t elapsedMS     = 0;
+        size_t count         = 0;
+        size_t workload      = 0; // This might overflow, but who cares for statistical stuff after that huge number of iterations
+        size_t max_workload  = 0;
+        size_t min_workload  = std::numeric_limits<size_t>::max();
+        size_t last_workload = 0;
+        uint64 last_startUS  = 0;
 
         ShaderStats& operator+=(const ShaderStats& other);
     };
 
+    /// Statistics of a single shader. The id is only meaningful for shader types with multiple instances, e.g., hit shaders
+    struct ShaderEntry {
+        ShaderType Type;
+        size_t ID;
+        const ShaderStats* Stats;
+    };
+
+    /// Returns all shaders which were launched at least once
+    [[nodiscard]] std::vector<ShaderEntry> entries() const;
+
+    [[nodiscard]] inline uint64 quantity(Quantity quantity) const { return mQuantities[(size_t)quantity]; }
+
+    [[nodiscard]] static const char* shaderTypeString(ShaderType type);
+    [[nodiscard]] static const char* quantityString(Quantity quantity);
+
+private:
     [[nodiscard]] ShaderStats* getStats(ShaderType type, size_t id);
 
     ShaderStats mDeviceStats;
@@ -73,5 +113,9 @@ private:
     ShaderStats mTonemapStats;
 
     std::array<uint64, (size_t)Quantity::_COUNT> mQuantities;
+
+    bool mRecordTimeline = false;
+    size_t mIteration    = 0;
+    std::vector<TimelineEvent> mTimeline;
 };
 } // namespace IG
\ No newline at end of file
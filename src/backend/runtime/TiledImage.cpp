@@ -0,0 +1,421 @@
+#include "TiledImage.h"
+#include "Hash.h"
+#include "Logger.h"
+
+#include <algorithm>
+#include <array>
+#include <atomic>
+#include <cmath>
+#include <cstring>
+#include <fstream>
+
+#include <tbb/parallel_for.h>
+
+namespace IG {
+// File layout:
+// Header [Magic, Version, Width, Height, LevelCount, TileSize, Format] as uint32
+// Per level [Width, Height, TilesX, TilesY] as uint32 and [Offset] as uint64
+// Tiles of all levels in row-major order, each with TileSize x TileSize RGBA pixels in the given format
+constexpr uint32 TiledMagic   = 0x58544749; // IGTX
+constexpr uint32 TiledVersion = 2;
+
+static std::vector<TiledImage::Level> compute_levels(size_t width, size_t height, uint64 offset, size_t tileBytes)
+{
+    std::vector<TiledImage::Level> levels;
+    while (true) {
+        TiledImage::Level level;
+        level.Width  = width;
+        level.Height = height;
+        level.TilesX = (width + TiledImage::TileSize - 1) / TiledImage::TileSize;
+        level.TilesY = (height + TiledImage::TileSize - 1) / TiledImage::TileSize;
+        level.Offset = offset;
+        levels.push_back(level);
+
+        offset += (uint64)(level.TilesX * level.TilesY * tileBytes);
+
+        if (width == 1 && height == 1)
+            break;
+
+        width  = std::max<size_t>(1, width / 2);
+        height = std::max<size_t>(1, height / 2);
+    }
+    return levels;
+}
+
+inline static uint64 header_size(size_t levelCount)
+{
+    return 7 * sizeof(uint32) + levelCount * (4 * sizeof(uint32) + sizeof(uint64));
+}
+/// 2x2 box filter. Odd sizes are handled by clamping
+static Image downsample(const Image& src, size_t width, size_t height)
+{
+    Image dst;
+    dst.width  = width;
+    dst.height = height;
+    dst.pixels.reset(new float[width * height * 4]);
+
+    tbb::parallel_for(tbb::blocked_range<size_t>(0, height), [&](const tbb::blocked_range<size_t>& range) {
+        for (size_t y = range.begin(); y < range.end(); ++y) {
+            const size_t y0 = std::min(2 * y, src.height - 1);
+            const size_t y1 = std::min(2 * y + 1, src.height - 1);
+            for (size_t x = 0; x < width; ++x) {
+                const size_t x0 = std::min(2 * x, src.width - 1);
+                const size_t x1 = std::min(2 * x + 1, src.width - 1);
+                for (size_t c = 0; c < 4; ++c) {
+                    dst.pixels[4 * (y * width + x) + c] = (src.pixels[4 * (y0 * src.width + x0) + c]
+                                                           + src.pixels[4 * (y0 * src.width + x1) + c]
+                                                           + src.pixels[4 * (y1 * src.width + x0) + c]
+                                                           + src.pixels[4 * (y1 * src.width + x1) + c])
+                                                          / 4;
+                }
+            }
+        }
+    });
+
+    return dst;
+}
+
+static void write_tiles(std::ostream& stream, const Image& img, const TiledImage::Level& level, TiledImage::Format format)
+{
+    constexpr size_t TilePixels = TiledImage::TileSize * TiledImage::TileSize;
+
+    std::vector<float> tile(TilePixels * 4);
+    std::vector<uint8> packed(format == TiledImage::Format::RGBA8 ? TilePixels * 4 : 0);
+    for (size_t ty = 0; ty < level.TilesY; ++ty) {
+        for (size_t tx = 0; tx < level.TilesX; ++tx) {
+            for (size_t y = 0; y < TiledImage::TileSize; ++y) {
+                const size_t sy = std::min(ty * TiledImage::TileSize + y, img.height - 1);
+                for (size_t x = 0; x < TiledImage::TileSize; ++x) {
+                    const size_t sx = std::min(tx * TiledImage::TileSize + x, img.width - 1);
+                    std::memcpy(&tile[4 * (y * TiledImage::TileSize + x)], &img.pixels[4 * (sy * img.width + sx)], 4 * sizeof(float));
+                }
+            }
+
+            if (format == TiledImage::Format::RGBA8) {
+                for (size_t i = 0; i < tile.size(); ++i)
+                    packed[i] = (uint8)std::lround(std::clamp(tile[i], 0.0f, 1.0f) * 255.0f);
+                stream.write(reinterpret_cast<const char*>(packed.data()), packed.size());
+            } else {
+                stream.write(reinterpret_cast<const char*>(tile.data()), tile.size() * sizeof(float));
+            }
+        }
+    }
+}
+
+void TiledImage::convert(const std::filesystem::path& src, const std::filesystem::path& dst)
+{
+    Image img = Image::load(src);
+    if (!img.isValid() || img.width == 0 || img.height == 0)
+        throw ImageLoadException("Could not load image", src);
+
+    // Low dynamic range sources are kept with 8 bits per channel, which is a quarter of the size
+    const Format format = Image::isPacked(src) ? Format::RGBA8 : Format::RGBA32F;
+
+    auto levels         = compute_levels(img.width, img.height, 0, tileBytes(format));
+    const uint64 offset = header_size(levels.size());
+    for (auto& level : levels)
+        level.Offset += offset;
+
+    // Write into a temporary file first, such that no partial file is left behind
+    const std::filesystem::path tmp = dst.generic_u8string() + ".tmp";
+    {
+        std::ofstream stream(tmp, std::ios::binary | std::ios::trunc);
+        if (!stream)
+            throw ImageSaveException("Could not open file for writing", tmp);
+
+        const uint32 header[] = { TiledMagic, TiledVersion, (uint32)img.width, (uint32)img.height, (uint32)levels.size(), (uint32)TileSize, (uint32)format };
+        stream.write(reinterpret_cast<const char*>(header), sizeof(header));
+        for (const auto& level : levels) {
+            const uint32 data[] = { (uint32)level.Width, (uint32)level.Height, (uint32)level.TilesX, (uint32)level.TilesY };
+            stream.write(reinterpret_cast<const char*>(data), sizeof(data));
+            stream.write(reinterpret_cast<const char*>(&level.Offset), sizeof(level.Offset));
+        }
+
+        for (size_t i = 0; i < levels.size(); ++i) {
+            if (i > 0)
+                img = downsample(img, levels[i].Width, levels[i].Height);
+            write_tiles(stream, img, levels[i], format);
+        }
+
+        if (!stream)
+            throw ImageSaveException("Could not write tiled image", tmp);
+    }
+
+    std::error_code ec;
+    std::filesystem::rename(tmp, dst, ec);
+    if (ec)
+        throw ImageSaveException("Could not write tiled image: " + ec.message(), dst);
+}
+
+std::string TiledImage::computeKey(const std::filesystem::path& src)
+{
+    Hasher hasher;
+    hasher.add(std::filesystem::absolute(src).generic_u8string());
+    hasher.add(TiledVersion);
+    hasher.add((uint64)TileSize);
+
+    std::error_code ec;
+    const auto size = std::filesystem::file_size(src, ec);
+    if (!ec)
+        hasher.add((uint64)size);
+    const auto time = std::filesystem::last_write_time(src, ec);
+    if (!ec)
+        hasher.add((int64)time.time_since_epoch().count());
+
+    return hasher.hex();
+}
+
+TiledImage::TiledImage(const std::filesystem::path& path)
+    : mPath(path)
+{
+    try {
+        mFile = MappedFile(path);
+    } catch (const std::runtime_error& e) {
+        throw ImageLoadException(std::string("Could not open tiled image: ") + e.what(), path);
+    }
+
+    const uint8* data = mFile.data();
+    const size_t size = mFile.size();
+
+    uint32 header[7];
+    if (size < sizeof(header))
+        throw ImageLoadException("Invalid tiled image", path);
+    std::memcpy(header, data, sizeof(header));
+
+    if (header[0] != TiledMagic || header[1] != TiledVersion || header[5] != TileSize || header[6] > (uint32)Format::RGBA32F)
+        throw ImageLoadException("Invalid tiled image", path);
+    mFormat = (Format)header[6];
+
+    const auto expected = compute_levels(header[2], header[3], header_size(header[4]), tileBytes());
+    if (expected.size() != header[4] || size < header_size(header[4]))
+        throw ImageLoadException("Invalid tiled image", path);
+
+    mLevels.reserve(header[4]);
+    const uint8* ptr = data + sizeof(header);
+    for (size_t i = 0; i < header[4]; ++i) {
+        uint32 info[4];
+        uint64 offset;
+        std::memcpy(info, ptr, sizeof(info));
+        std::memcpy(&offset, ptr + sizeof(info), sizeof(offset));
+        ptr += sizeof(info) + sizeof(offset);
+
+        if (info[0] != expected[i].Width || info[1] != expected[i].Height || offset != expected[i].Offset)
+            throw ImageLoadException("Invalid tiled image", path);
+        mLevels.push_back(expected[i]);
+    }
+
+    if (size < mLevels.back().Offset + tileBytes())
+        throw ImageLoadException("Truncated tiled image", path);
+}
+
+size_t TiledImage::levelForResolution(size_t maxResolution) const
+{
+    if (maxResolution == 0)
+        return 0;
+
+    for (size_t i = 0; i < mLevels.size(); ++i) {
+        if (mLevels[i].Width <= maxResolution && mLevels[i].Height <= maxResolution)
+            return i;
+    }
+    return mLevels.size() - 1;
+}
+
+const uint8* TiledImage::tileData(size_t level, size_t tx, size_t ty) const
+{
+    const Level& info = mLevels.at(level);
+    return mFile.data() + info.Offset + (uint64)((ty * info.TilesX + tx) * tileBytes());
+}
+
+void TiledImage::readTile(size_t level, size_t tx, size_t ty, float* dst) const
+{
+    const uint8* tile = tileData(level, tx, ty);
+    for (size_t i = 0; i < TileSize * TileSize; ++i)
+        decodeTexel(mFormat, tile, i, dst + 4 * i);
+}
+
+Image TiledImage::readLevel(size_t level) const
+{
+    const Level& info = mLevels.at(level);
+
+    Image img;
+    img.width  = info.Width;
+    img.height = info.Height;
+    img.pixels.reset(new float[info.Width * info.Height * 4]);
+
+    std::vector<float> tile(TileSize * TileSize * 4);
+    for (size_t ty = 0; ty < info.TilesY; ++ty) {
+        for (size_t tx = 0; tx < info.TilesX; ++tx) {
+            readTile(level, tx, ty, tile.data());
+
+            const size_t w = std::min(TileSize, info.Width - tx * TileSize);
+            const size_t h = std::min(TileSize, info.Height - ty * TileSize);
+            for (size_t y = 0; y < h; ++y)
+                std::memcpy(&img.pixels[4 * ((ty * TileSize + y) * info.Width + tx * TileSize)], &tile[4 * y * TileSize], 4 * w * sizeof(float));
+        }
+    }
+
+    return img;
+}
+
+////////////////////////////////////
+
+constexpr const char* const CACHE_SIZE_ENV_NAME = "IG_TEXTURE_CACHE_SIZE";
+constexpr size_t DefaultTileCacheSize           = 1024ull * 1024 * 1024; // 1 GiB
+
+static std::atomic<uint64> sTileCacheCounter = 0;
+
+TileCache::TileCache(size_t maxMemory, size_t shardCount)
+    : mId(++sTileCacheCounter)
+    , mShards(std::max<size_t>(1, shardCount))
+    , mMaxMemory(maxMemory)
+    , mShardMemory(maxMemory / std::max<size_t>(1, shardCount))
+{
+}
+
+size_t TileCache::defaultSize()
+{
+    if (const char* env = std::getenv(CACHE_SIZE_ENV_NAME); env != nullptr && env[0] != '\0') {
+        try {
+            return (size_t)std::stoull(env) * 1024 * 1024;
+        } catch (...) {
+            IG_LOG(L_WARNING) << "Invalid value '" << env << "' for " << CACHE_SIZE_ENV_NAME << ". Using default" << std::endl;
+        }
+    }
+    return DefaultTileCacheSize;
+}
+
+uint32 TileCache::add(std::unique_ptr<TiledImage>&& image)
+{
+    std::unique_lock<std::shared_mutex> guard(mImageMutex);
+    mImages.emplace_back(std::move(image));
+    return (uint32)(mImages.size() - 1);
+}
+
+const TiledImage& TileCache::image(uint32 handle) const
+{
+    std::shared_lock<std::shared_mutex> guard(mImageMutex);
+    return *mImages.at(handle);
+}
+
+uint64 TileCache::tileKey(uint32 handle, size_t level, size_t tx, size_t ty)
+{
+    // Key layout [Handle:20, Level:6, TY:19, TX:19]
+    return ((uint64)handle << 44) | ((uint64)level << 38) | ((uint64)ty << 19) | (uint64)tx;
+}
+
+TileCache::Shard& TileCache::shard(uint64 key)
+{
+    return mShards[Hasher().add(key).value() % mShards.size()];
+}
+
+const TileCache::Shard& TileCache::shard(uint64 key) const
+{
+    return mShards[Hasher().add(key).value() % mShards.size()];
+}
+
+namespace {
+/// Last tile used by a thread for a specific image
+struct ThreadTile {
+    uint64 CacheId          = 0;
+    uint32 Handle           = 0;
+    const TiledImage* Image = nullptr;
+    uint64 Key              = 0;
+    std::shared_ptr<const uint8[]> Data;
+};
+constexpr size_t ThreadTileCount = 8;
+} // namespace
+
+void TileCache::fetch(uint32 handle, size_t level, size_t x, size_t y, float* rgba)
+{
+    // Neighboring lookups, like the four texels of a bilinear lookup, mostly hit the same tile.
+    // Each thread keeps the last tile per image to skip the shared structure and its locks
+    thread_local std::array<ThreadTile, ThreadTileCount> thread_tiles;
+
+    ThreadTile& entry = thread_tiles[handle % ThreadTileCount];
+    if (entry.CacheId != mId || entry.Handle != handle || entry.Image == nullptr) {
+        entry         = ThreadTile{};
+        entry.CacheId = mId;
+        entry.Handle  = handle;
+        entry.Image   = &image(handle); // Images are never removed, the pointer stays valid
+    }
+
+    const TiledImage& img = *entry.Image;
+    level                 = std::min(level, img.levelCount() - 1);
+
+    const TiledImage::Level& info = img.level(level);
+    x                             = std::min(x, info.Width - 1);
+    y                             = std::min(y, info.Height - 1);
+
+    const size_t tx    = x / TiledImage::TileSize;
+    const size_t ty    = y / TiledImage::TileSize;
+    const size_t pixel = (y % TiledImage::TileSize) * TiledImage::TileSize + (x % TiledImage::TileSize);
+    const uint64 key   = tileKey(handle, level, tx, ty);
+
+    if (entry.Data == nullptr || entry.Key != key) {
+        entry.Data = acquire(img, key, level, tx, ty);
+        entry.Key  = key;
+    }
+
+    TiledImage::decodeTexel(img.format(), entry.Data.get(), pixel, rgba);
+}
+
+TileCache::TileData TileCache::acquire(const TiledImage& img, uint64 key, size_t level, size_t tx, size_t ty)
+{
+    Shard& shard = this->shard(key);
+
+    {
+        std::lock_guard<std::mutex> guard(shard.Mutex);
+        auto it = shard.Map.find(key);
+        if (it != shard.Map.end()) {
+            // Mark as most recently used
+            shard.Tiles.splice(shard.Tiles.begin(), shard.Tiles, it->second);
+            return it->second->Data;
+        }
+    }
+
+    // Page in the tile without holding the lock, such that other lookups into the shard are not blocked
+    const size_t bytes = img.tileBytes();
+    std::shared_ptr<uint8[]> data(new uint8[bytes]);
+    std::memcpy(data.get(), img.tileData(level, tx, ty), bytes);
+
+    std::lock_guard<std::mutex> guard(shard.Mutex);
+    auto it = shard.Map.find(key);
+    if (it != shard.Map.end()) {
+        // Another thread paged in the same tile in the meantime
+        shard.Tiles.splice(shard.Tiles.begin(), shard.Tiles, it->second);
+        return it->second->Data;
+    }
+
+    shard.Tiles.push_front(Tile{ key, data, bytes });
+    shard.Map[key] = shard.Tiles.begin();
+    shard.Memory += bytes;
+
+    // Evict least recently used tiles. Threads still using an evicted tile keep it alive until they switch to another tile
+    while (shard.Memory > mShardMemory && shard.Tiles.size() > 1) {
+        shard.Memory -= shard.Tiles.back().Bytes;
+        shard.Map.erase(shard.Tiles.back().Key);
+        shard.Tiles.pop_back();
+    }
+
+    return data;
+}
+
+bool TileCache::isCached(uint32 handle, size_t level, size_t tx, size_t ty) const
+{
+    const uint64 key   = tileKey(handle, level, tx, ty);
+    const Shard& shard = this->shard(key);
+
+    std::lock_guard<std::mutex> guard(shard.Mutex);
+    return shard.Map.count(key) > 0;
+}
+
+size_t TileCache::memoryUsage() const
+{
+    size_t memory = 0;
+    for (const auto& shard : mShards) {
+        std::lock_guard<std::mutex> guard(shard.Mutex);
+        memory += shard.Memory;
+    }
+    return memory;
+}
+} // namespace IG
\ No newline at end of file
@@ -0,0 +1,136 @@
+#pragma once
+
+#include "Image.h"
+#include "MappedFile.h"
+
+#include <list>
+#include <mutex>
+#include <shared_mutex>
+
+namespace IG {
+/// Mip-mapped RGBA image stored as fixed size tiles in a file.
+/// Level 0 is the full resolution, every following level halves the resolution until a single pixel is left.
+/// Tiles are stored in linear RGBA, either as 8 bit per channel for low dynamic range sources or as 32 bit floats for high dynamic range sources.
+/// Tiles at the border are padded by clamping.
+class TiledImage {
+public:
+    static constexpr size_t TileSize = 64;
+
+    enum class Format : uint32 {
+        RGBA8   = 0, // Linear RGBA with 8 bits per channel, same as the packed image format
+        RGBA32F = 1  // Linear RGBA with 32 bit floats per channel
+    };
+
+    struct Level {
+        size_t Width;
+        size_t Height;
+        size_t TilesX;
+        size_t TilesY;
+        uint64 Offset; // Byte offset of the first tile in the file
+    };
+
+    /// Open a tiled image file. Throws ImageLoadException if the file is invalid
+    explicit TiledImage(const std::filesystem::path& path);
+
+    inline const std::filesystem::path& path() const { return mPath; }
+    inline Format format() const { return mFormat; }
+    inline size_t tileBytes() const { return tileBytes(mFormat); }
+    inline size_t levelCount() const { return mLevels.size(); }
+    inline const Level& level(size_t level) const { return mLevels.at(level); }
+
+    /// First level with a resolution not exceeding the given size in both dimensions. A size of 0 returns the full resolution
+    size_t levelForResolution(size_t maxResolution) const;
+
+    /// Raw data of a single tile with tileBytes() bytes in the format of the image. Thread safe
+    const uint8* tileData(size_t level, size_t tx, size_t ty) const;
+
+    /// Read a single tile with TileSize x TileSize x 4 floats into dst. Thread safe
+    void readTile(size_t level, size_t tx, size_t ty, float* dst) const;
+
+    /// Read a full level
+    Image readLevel(size_t level) const;
+
+    /// Convert the given image into a tiled image file. Throws ImageLoadException on error
+    static void convert(const std::filesystem::path& src, const std::filesystem::path& dst);
+
+    /// Key identifying the given source image and the tile format. Suitable for an on-disk cache
+    static std::string computeKey(const std::filesystem::path& src);
+
+    /// Size of a single tile in bytes
+    static inline size_t tileBytes(Format format) { return TileSize * TileSize * 4 * (format == Format::RGBA8 ? sizeof(uint8) : sizeof(float)); }
+
+    /// Decode the given pixel of raw tile data into linear RGBA
+    static inline void decodeTexel(Format format, const uint8* tile, size_t pixel, float* rgba)
+    {
+        if (format == Format::RGBA8) {
+            for (size_t c = 0; c < 4; ++c)
+                rgba[c] = tile[4 * pixel + c] / 255.0f;
+        } else {
+            std::memcpy(rgba, tile + 4 * pixel * sizeof(float), 4 * sizeof(float));
+        }
+    }
+
+private:
+    std::filesystem::path mPath;
+    Format mFormat;
+    std::vector<Level> mLevels;
+    MappedFile mFile;
+};
+
+/// Bounded memory cache for tiles of multiple tiled images.
+/// Tiles are paged in on demand and evicted in least recently used order
+class TileCache {
+public:
+    static constexpr size_t DefaultShardCount = 16;
+
+    explicit TileCache(size_t maxMemory, size_t shardCount = DefaultShardCount);
+
+    /// Register an image and return its handle
+    uint32 add(std::unique_ptr<TiledImage>&& image);
+    const TiledImage& image(uint32 handle) const;
+
+    /// Fetch a single texel in linear RGBA. Coordinates are clamped to the level. Thread safe
+    void fetch(uint32 handle, size_t level, size_t x, size_t y, float* rgba);
+
+    /// True if the given tile is currently held by the cache
+    bool isCached(uint32 handle, size_t level, size_t tx, size_t ty) const;
+
+    /// Memory used by all cached tiles in bytes
+    size_t memoryUsage() const;
+
+    inline size_t maxMemory() const { return mMaxMemory; }
+
+    /// Default size in bytes. Can be overridden with the IG_TEXTURE_CACHE_SIZE environment variable given in MiB
+    static size_t defaultSize();
+
+private:
+    using TileData = std::shared_ptr<const uint8[]>;
+
+    struct Tile {
+        uint64 Key;
+        TileData Data; // Shared, such that threads still using an evicted tile keep it alive
+        size_t Bytes;
+    };
+
+    struct Shard {
+        mutable std::mutex Mutex;
+        std::list<Tile> Tiles; // Most recently used first
+        std::unordered_map<uint64, std::list<Tile>::iterator> Map;
+        size_t Memory = 0;
+    };
+
+    static uint64 tileKey(uint32 handle, size_t level, size_t tx, size_t ty);
+    Shard& shard(uint64 key);
+    const Shard& shard(uint64 key) const;
+
+    /// Get the given tile from the cache or read it from the image
+    TileData acquire(const TiledImage& img, uint64 key, size_t level, size_t tx, size_t ty);
+
+    const uint64 mId; // Unique id of this cache, used to identify the tiles cached per thread
+    mutable std::shared_mutex mImageMutex;
+    std::vector<std::unique_ptr<TiledImage>> mImages;
+    std::vector<Shard> mShards;
+    size_t mMaxMemory;
+    size_t mShardMemory;
+};
+} // namespace IG
\ No newline at end of file
@@ -20,7 +20,9 @@ struct DriverSetupSettings {
     size_t framebuffer_height   = 0;
     IG::SceneDatabase* database = nullptr;
     bool acquire_stats          = false;
+    bool acquire_timeline       = false; // Record every shader launch with a timestamp. Requires acquire_stats
     size_t aov_count            = false;
+    const char* cache_dir       = nullptr; // Directory to store compiled shader modules in. No cache is used if null
 
     IG::Logger* logger = nullptr;
 };
@@ -29,6 +29,8 @@ bool Loader::load(const LoaderOptions& opts, LoaderResult& result)
     ctx.IsTracer            = opts.IsTracer;
     ctx.FilmWidth           = opts.FilmWidth;
     ctx.FilmHeight          = opts.FilmHeight;
+    ctx.MeshBuffers         = opts.MeshBuffers;
+    ctx.CacheDir            = opts.CacheDir;
     ctx.Lights              = std::make_unique<LoaderLight>();
 
     ctx.Lights->prepare(ctx);
@@ -136,6 +138,7 @@ bool Loader::load(const LoaderOptions& opts, LoaderResult& result)
     result.Database.SceneRadius = ctx.Environment.SceneDiameter / 2.0f;
     result.Database.SceneBBox   = ctx.Environment.SceneBBox;
     result.TechniqueInfo        = ctx.TechniqueInfo;
+    result.CacheKeys.insert(ctx.CacheKeys.begin(), ctx.CacheKeys.end());
 
     return !ctx.HasError;
 }
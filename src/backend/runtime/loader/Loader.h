@@ -1,11 +1,14 @@
 #pragma once
 
 #include "CameraOrientation.h"
+#include "LoaderContext.h"
 #include "Parser.h"
 #include "Target.h"
 #include "TechniqueInfo.h"
 #include "table/SceneDatabase.h"
 
+#include <unordered_set>
+
 namespace IG {
 constexpr size_t DefaultAlignment = sizeof(float) * 4;
 
@@ -20,6 +23,8 @@ struct LoaderOptions {
     size_t FilmHeight;
     size_t SamplesPerIteration; // Only a recommendation!
     bool IsTracer;
+    MeshBufferMap MeshBuffers;
+    std::filesystem::path CacheDir; // Root of the on-disk cache. Empty disables caching
 };
 
 struct LoaderResult {
@@ -27,6 +32,7 @@ struct LoaderResult {
     std::vector<TechniqueVariant> TechniqueVariants;
     IG::TechniqueInfo TechniqueInfo;
     IG::CameraOrientation CameraOrientation;
+    std::unordered_set<std::string> CacheKeys; // Entries of the on-disk cache used by the scene, which have to be protected from eviction
 };
 
 class Loader {
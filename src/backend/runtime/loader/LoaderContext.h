@@ -3,14 +3,19 @@
 #include "LoaderEnvironment.h"
 #include "Target.h"
 #include "TechniqueInfo.h"
+#include "mesh/TriMesh.h"
 
 #include <any>
 #include <filesystem>
+#include <unordered_set>
 
 namespace IG {
 
 struct SceneDatabase;
 
+/// Meshes given directly in memory instead of a file. Referenced by shapes of type 'buffer'
+using MeshBufferMap = std::unordered_map<std::string, std::shared_ptr<TriMesh>>;
+
 struct LoaderContext {
     Parser::Scene Scene;
 
@@ -21,6 +26,9 @@ struct LoaderContext {
     bool EnablePadding;
     size_t SamplesPerIteration;
     std::unordered_map<std::string, uint32> Images; // Image to Buffer
+    MeshBufferMap MeshBuffers;                      // In-memory meshes referenced by shapes of type 'buffer'
+    std::filesystem::path CacheDir;                 // Root of the on-disk cache. Empty disables caching
+    std::unordered_set<std::string> CacheKeys;      // Entries of the on-disk cache used by the scene, which have to be protected from eviction
 
     std::string CameraType;
     std::string TechniqueType;
@@ -11,6 +11,7 @@
 
 #include <algorithm>
 #include <chrono>
+#include <optional>
 
 // TODO: Make use of the ShadingTree!!
 namespace IG {
@@ -857,20 +858,8 @@ void LoaderLight::embedLights(LoaderContext& ctx)
         mSimpleAreaLightCounter = 0;
 }
 
-std::filesystem::path LoaderLight::generateLightSelectionCDF(LoaderContext& ctx)
+std::vector<float> LoaderLight::estimateLightPowers(const LoaderContext& ctx) const
 {
-    const std::string exported_id = "_light_cdf_";
-
-    const auto data = ctx.ExportedData.find(exported_id);
-    if (data != ctx.ExportedData.end())
-        return std::any_cast<std::string>(data->second);
-
-    if (mOrderedLights.empty())
-        return {}; // Fallback to null light selector
-
-    std::filesystem::create_directories("data/"); // Make sure this directory exists
-    std::string path = "data/light_cdf.bin";
-
     std::vector<float> estimated_powers;
     estimated_powers.reserve(mOrderedLights.size());
     for (const auto& pair : mOrderedLights) {
@@ -886,10 +875,200 @@ std::filesystem::path LoaderLight::generateLightSelectionCDF(LoaderContext& ctx)
         if (!found)
             estimated_powers.push_back(0);
     }
+    return estimated_powers;
+}
+
+std::filesystem::path LoaderLight::generateLightSelectionCDF(LoaderContext& ctx)
+{
+    const std::string exported_id = "_light_cdf_";
 
+    const auto data = ctx.ExportedData.find(exported_id);
+    if (data != ctx.ExportedData.end())
+        return std::any_cast<std::string>(data->second);
+
+    if (mOrderedLights.empty())
+        return {}; // Fallback to null light selector
+
+    std::filesystem::create_directories("data/"); // Make sure this directory exists
+    std::string path = "data/light_cdf.bin";
+
+    const std::vector<float> estimated_powers = estimateLightPowers(ctx);
     CDF::computeForArray(estimated_powers, path);
 
     ctx.ExportedData[exported_id] = path;
     return path;
 }
+
+/// Bounding box of the given light. Infinite lights have no bounds
+static std::optional<BoundingBox> light_bounds(const std::shared_ptr<Parser::Object>& light, const LoaderContext& ctx)
+{
+    const std::string type = light->pluginType();
+    if (type == "point" || type == "spot") {
+        return BoundingBox(light->property("position").getVector3());
+    } else if (type == "area") {
+        const std::string entityName = light->property("entity").getString();
+        if (!ctx.Environment.EmissiveEntities.count(entityName))
+            return BoundingBox(Vector3f::Zero()); // Error is reported by the light itself
+
+        const Entity& entity  = ctx.Environment.EmissiveEntities.at(entityName);
+        const uint32 shape_id = ctx.Environment.ShapeIDs.at(entity.Shape);
+        return ctx.Environment.Shapes[shape_id].BoundingBox.transformed(entity.Transform);
+    } else {
+        return std::nullopt;
+    }
+}
+
+namespace {
+struct LightTreeNode {
+    BoundingBox Bounds;
+    float Power;
+    int32 Child; // Index of the first child or -(light + 1) for leaves
+};
+
+struct LightTreeTrail {
+    int32 Root;
+    int32 Depth;
+    uint64 Path; // Bit k is set if the second child was taken on level k
+};
+
+class LightTreeBuilder {
+public:
+    LightTreeBuilder(const std::vector<float>& powers, const std::vector<std::optional<BoundingBox>>& bounds)
+        : mPowers(powers)
+        , mBounds(bounds)
+        , mTrails(powers.size(), LightTreeTrail{ -1, 0, 0 })
+    {
+    }
+
+    /// Build a subtree for the given lights and return the index of its root
+    int32 build(std::vector<size_t>& lights)
+    {
+        if (lights.empty())
+            return -1;
+
+        const int32 root = (int32)mNodes.size();
+        mNodes.emplace_back();
+        fill(root, root, lights.begin(), lights.end(), 0, 0);
+        return root;
+    }
+
+    inline const std::vector<LightTreeNode>& nodes() const { return mNodes; }
+    inline const std::vector<LightTreeTrail>& trails() const { return mTrails; }
+
+private:
+    using Iterator = std::vector<size_t>::iterator;
+
+    void fill(int32 root, int32 node, Iterator begin, Iterator end, int32 depth, uint64 path)
+    {
+        BoundingBox bounds = BoundingBox::Empty();
+        BoundingBox center = BoundingBox::Empty();
+        float power        = 0;
+        for (auto it = begin; it != end; ++it) {
+            power += mPowers[*it];
+            if (mBounds[*it].has_value()) {
+                bounds.extend(mBounds[*it].value());
+                center.extend(mBounds[*it].value().center());
+            }
+        }
+
+        mNodes[node].Bounds = bounds;
+        mNodes[node].Power  = power;
+
+        if (std::distance(begin, end) == 1) {
+            mNodes[node].Child = -(int32)(*begin + 1);
+            mTrails[*begin]    = LightTreeTrail{ root, depth, path };
+            return;
+        }
+
+        // Median split along the largest extent. Infinite lights have no position and are split in order
+        const auto middle = begin + std::distance(begin, end) / 2;
+        if (!center.isEmpty()) {
+            int axis;
+            center.diameter().maxCoeff(&axis);
+            std::nth_element(begin, middle, end, [&](size_t a, size_t b) { return mBounds[a].value().center()[axis] < mBounds[b].value().center()[axis]; });
+        }
+
+        IG_ASSERT(depth < 64, "Light tree is too deep");
+        const int32 child = (int32)mNodes.size();
+        mNodes.emplace_back();
+        mNodes.emplace_back();
+        mNodes[node].Child = child;
+
+        fill(root, child, begin, middle, depth + 1, path);
+        fill(root, child + 1, middle, end, depth + 1, path | (uint64(1) << depth));
+    }
+
+    const std::vector<float>& mPowers;
+    const std::vector<std::optional<BoundingBox>>& mBounds;
+    std::vector<LightTreeNode> mNodes;
+    std::vector<LightTreeTrail> mTrails;
+};
+} // namespace
+
+LightTreeInfo LoaderLight::generateLightTree(LoaderContext& ctx)
+{
+    const std::string exported_id = "_light_tree_";
+
+    const auto data = ctx.ExportedData.find(exported_id);
+    if (data != ctx.ExportedData.end())
+        return std::any_cast<LightTreeInfo>(data->second);
+
+    const std::vector<float> powers = estimateLightPowers(ctx);
+
+    std::vector<std::optional<BoundingBox>> bounds;
+    bounds.reserve(mOrderedLights.size());
+    for (const auto& pair : mOrderedLights)
+        bounds.push_back(light_bounds(pair.second, ctx));
+
+    std::vector<size_t> finite_lights;
+    std::vector<size_t> infinite_lights;
+    float finite_power   = 0;
+    float infinite_power = 0;
+    for (size_t id = 0; id < mOrderedLights.size(); ++id) {
+        if (bounds[id].has_value()) {
+            finite_lights.push_back(id);
+            finite_power += powers[id];
+        } else {
+            infinite_lights.push_back(id);
+            infinite_power += powers[id];
+        }
+    }
+
+    LightTreeBuilder builder(powers, bounds);
+
+    LightTreeInfo info;
+    info.FiniteRoot   = builder.build(finite_lights);
+    info.InfiniteRoot = builder.build(infinite_lights);
+    info.NodeCount    = builder.nodes().size();
+
+    if (info.FiniteRoot < 0)
+        info.InfiniteProbability = 1;
+    else if (info.InfiniteRoot < 0)
+        info.InfiniteProbability = 0;
+    else if (finite_power + infinite_power <= 0)
+        info.InfiniteProbability = 0.5f;
+    else
+        info.InfiniteProbability = infinite_power / (finite_power + infinite_power);
+
+    // Export to the database
+    auto& treeData = ctx.Database->CustomTables["LightTree"].addLookup(0, 0, 0); // We do not make use of the typeid
+    VectorSerializer treeSerializer(treeData, false);
+    for (const auto& node : builder.nodes()) {
+        treeSerializer.write(node.Bounds.min); // +3 = 3
+        treeSerializer.write(node.Power);      // +1 = 4
+        treeSerializer.write(node.Bounds.max); // +3 = 7
+        treeSerializer.write(node.Child);      // +1 = 8
+    }
+    for (const auto& trail : builder.trails()) {
+        treeSerializer.write(trail.Root);                        // +1 = 1
+        treeSerializer.write(trail.Depth);                       // +1 = 2
+        treeSerializer.write((uint32)(trail.Path & 0xFFFFFFFF)); // +1 = 3
+        treeSerializer.write((uint32)(trail.Path >> 32));        // +1 = 4
+    }
+
+    IG_LOG(L_DEBUG) << "Light tree has " << info.NodeCount << " nodes for " << finite_lights.size() << " finite and " << infinite_lights.size() << " infinite lights" << std::endl;
+
+    ctx.ExportedData[exported_id] = info;
+    return info;
+}
 } // namespace IG
\ No newline at end of file
@@ -5,11 +5,21 @@
 namespace IG {
 class ShadingTree;
 struct LoaderResult;
+
+/// Information necessary to access the light tree stored as custom table 'LightTree'
+struct LightTreeInfo {
+    size_t NodeCount          = 0;
+    int32 FiniteRoot          = -1; // Root of the subtree containing all finite lights, -1 if none exist
+    int32 InfiniteRoot        = -1; // Root of the subtree containing all infinite lights, -1 if none exist
+    float InfiniteProbability = 0;  // Probability to select the infinite subtree
+};
+
 class LoaderLight {
 public:
     void prepare(LoaderContext& ctx);
     std::string generate(ShadingTree& tree, bool skipArea);
     std::filesystem::path generateLightSelectionCDF(LoaderContext& ctx);
+    LightTreeInfo generateLightTree(LoaderContext& ctx);
 
     inline std::shared_ptr<Parser::Object> getByID(size_t id) const { return mOrderedLights.at(id).second; }
 
@@ -25,6 +35,7 @@ private:
     void sortLights(LoaderContext& ctx);
     void setupAreaLights();
     void embedLights(LoaderContext& ctx);
+    std::vector<float> estimateLightPowers(const LoaderContext& ctx) const;
 
     std::vector<std::pair<std::string, std::shared_ptr<Parser::Object>>> mOrderedLights;
     size_t mSimplePointLightCounter = 0;
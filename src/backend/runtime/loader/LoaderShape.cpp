@@ -1,17 +1,23 @@
 #include "LoaderShape.h"
 #include "Loader.h"
 
+#include "Hash.h"
 #include "Logger.h"
+#include "MappedFile.h"
 #include "bvh/TriBVHAdapter.h"
 #include "mesh/MtsSerializedFile.h"
 #include "mesh/ObjFile.h"
 #include "mesh/PlyFile.h"
 
 #include "serialization/VectorSerializer.h"
+#include "shader/ShaderCache.h"
 
 #include <algorithm>
+#include <atomic>
 #include <chrono>
+#include <fstream>
 #include <mutex>
+#include <random>
 #include <sstream>
 
 #include <tbb/parallel_for.h>
@@ -172,24 +178,148 @@ inline TriMesh setup_mesh_external(const std::string& name, const Object& elem,
     return {};
 }
 
+inline TriMesh setup_mesh_buffer(const std::string& name, const Object& elem, const LoaderContext& ctx)
+{
+    const std::string buffer = elem.property("buffer").getString(name);
+
+    const auto it = ctx.MeshBuffers.find(buffer);
+    if (it == ctx.MeshBuffers.end() || !it->second) {
+        IG_LOG(L_ERROR) << "Shape '" << name << "': No mesh buffer named '" << buffer << "' given" << std::endl;
+        return TriMesh();
+    }
+
+    // The buffer might be shared between multiple shapes and is modified afterwards, therefore copy it
+    return *it->second;
+}
+
+// Increase if the BVH builder or the node layout changes to invalidate all cached BVHs
+constexpr uint32 BvhCacheVersion         = 1;
+constexpr uint32 BvhCacheMagic           = 0x56424749; // IGBV
+constexpr const char* const BvhCacheFile = "bvh.bin";
+
+struct BvhCacheHeader {
+    uint32 Magic;
+    uint32 Version;
+    uint64 Size; // Size of the payload following the header
+};
+
 template <size_t N, size_t T>
 struct BvhTemporary {
     std::vector<typename BvhNTriM<N, T>::Node, tbb::scalable_allocator<typename BvhNTriM<N, T>::Node>> nodes;
     std::vector<typename BvhNTriM<N, T>::Tri, tbb::scalable_allocator<typename BvhNTriM<N, T>::Tri>> tris;
+
+    std::filesystem::path cache_file;
+    MappedFile cached; // Serialized BVH if available in the cache
 };
 
 template <size_t N, size_t T>
-static void setup_bvhs(const std::vector<TriMesh>& meshes, LoaderResult& result)
+static std::string compute_bvh_key(const TriMesh& mesh)
+{
+    // The BVH only depends on the triangles, the arity and the builder itself
+    Hasher hasher;
+    hasher.add(mesh.vertices.data(), mesh.vertices.size() * sizeof(StVector3f));
+    hasher.add(mesh.indices);
+    hasher.add((uint64)N);
+    hasher.add((uint64)T);
+    hasher.add((uint64)sizeof(typename BvhNTriM<N, T>::Node));
+    hasher.add((uint64)sizeof(typename BvhNTriM<N, T>::Tri));
+    hasher.add(BvhCacheVersion);
+    return "bvh_" + hasher.hex();
+}
+
+static bool load_cached_bvh(const std::filesystem::path& file, MappedFile& mapped)
+{
+    std::error_code ec;
+    if (!std::filesystem::is_regular_file(file, ec))
+        return false;
+
+    try {
+        mapped = MappedFile(file);
+    } catch (const std::exception& e) {
+        IG_LOG(L_WARNING) << "Could not load cached BVH " << file << ": " << e.what() << std::endl;
+        return false;
+    }
+
+    BvhCacheHeader header;
+    if (mapped.size() >= sizeof(header))
+        std::memcpy(&header, mapped.data(), sizeof(header));
+
+    if (mapped.size() < sizeof(header) || header.Magic != BvhCacheMagic || header.Version != BvhCacheVersion || header.Size != mapped.size() - sizeof(header)) {
+        IG_LOG(L_WARNING) << "Ignoring invalid cached BVH " << file << std::endl;
+        mapped.unmap();
+        return false;
+    }
+
+    return true;
+}
+
+static void store_cached_bvh(const std::filesystem::path& file, const uint8* data, size_t size)
+{
+    BvhCacheHeader header{ BvhCacheMagic, BvhCacheVersion, (uint64)size };
+
+    // Write into a temporary file first, such that concurrent runs never see partial files
+    std::filesystem::path tmp = file;
+    tmp += ".tmp" + std::to_string(std::random_device{}());
+
+    {
+        std::ofstream stream(tmp, std::ios::binary);
+        stream.write(reinterpret_cast<const char*>(&header), sizeof(header));
+        stream.write(reinterpret_cast<const char*>(data), size);
+        if (!stream) {
+            IG_LOG(L_WARNING) << "Could not write BVH to cache " << tmp << std::endl;
+            return;
+        }
+    }
+
+    std::error_code ec;
+    std::filesystem::rename(tmp, file, ec);
+    if (ec) {
+        IG_LOG(L_WARNING) << "Could not write BVH to cache " << file << ": " << ec.message() << std::endl;
+        std::filesystem::remove(tmp, ec);
+    }
+}
+
+template <size_t N, size_t T>
+static void setup_bvhs(const std::vector<TriMesh>& meshes, LoaderResult& result, const std::filesystem::path& cacheDir)
 {
     // Preload map entries
     std::vector<BvhTemporary<N, T>> bvhs;
     bvhs.resize(meshes.size());
 
+    // Only used to manage the entry directories, eviction is handled by the shader cache of the runtime. Used keys are protected via the result
+    std::unique_ptr<ShaderCache> cache;
+    if (!cacheDir.empty())
+        cache = std::make_unique<ShaderCache>(cacheDir, std::numeric_limits<size_t>::max());
+
+    std::mutex cache_mutex;
+    std::atomic<size_t> cached_count = 0;
+
     const auto build_mesh = [&](size_t id) {
         BvhTemporary<N, T>& tmp = bvhs[id];
         const TriMesh& mesh     = meshes.at(id);
-        if (mesh.faceCount() > 0)
-            build_bvh<N, T>(mesh, tmp.nodes, tmp.tris);
+        if (mesh.faceCount() == 0)
+            return;
+
+        if (cache) {
+            const std::string key = compute_bvh_key<N, T>(mesh);
+
+            std::filesystem::path dir;
+            {
+                std::lock_guard<std::mutex> guard(cache_mutex);
+                dir = cache->acquire(key);
+                result.CacheKeys.insert(key);
+            }
+
+            if (!dir.empty()) {
+                tmp.cache_file = dir / BvhCacheFile;
+                if (load_cached_bvh(tmp.cache_file, tmp.cached)) {
+                    ++cached_count;
+                    return;
+                }
+            }
+        }
+
+        build_bvh<N, T>(mesh, tmp.nodes, tmp.tris);
     };
 
     // Start building!
@@ -206,12 +336,22 @@ static void setup_bvhs(const std::vector<TriMesh>& meshes, LoaderResult& result)
         build_mesh(i);
 #endif
     IG_LOG(L_DEBUG) << "Building BVHs took " << std::chrono::duration_cast<std::chrono::milliseconds>(std::chrono::high_resolution_clock::now() - start1).count() / 1000.0f << " seconds" << std::endl;
+    if (cache)
+        IG_LOG(L_DEBUG) << "Loaded " << cached_count << " of " << meshes.size() << " BVHs from cache" << std::endl;
 
     // Write non-parallel
     IG_LOG(L_DEBUG) << "Storing BVHs ..." << std::endl;
     const auto start2 = std::chrono::high_resolution_clock::now();
     for (const auto& bvh : bvhs) {
-        auto& bvhData = result.Database.BVHTable.addLookup(0, 0, DefaultAlignment);
+        auto& bvhData     = result.Database.BVHTable.addLookup(0, 0, DefaultAlignment);
+        const size_t base = bvhData.size();
+
+        if (bvh.cached) {
+            const uint8* payload = bvh.cached.data() + sizeof(BvhCacheHeader);
+            bvhData.insert(bvhData.end(), payload, payload + bvh.cached.size() - sizeof(BvhCacheHeader));
+            continue;
+        }
+
         VectorSerializer serializer(bvhData, false);
         serializer.write((uint32)bvh.nodes.size());
         serializer.write((uint32)bvh.tris.size()); // Not really needed, but just dump it out
@@ -219,10 +359,82 @@ static void setup_bvhs(const std::vector<TriMesh>& meshes, LoaderResult& result)
         serializer.write((uint32)0);               // Padding
         serializer.write(bvh.nodes, true);
         serializer.write(bvh.tris, true);
+
+        if (!bvh.cache_file.empty())
+            store_cached_bvh(bvh.cache_file, bvhData.data() + base, bvhData.size() - base);
     }
     IG_LOG(L_DEBUG) << "Storing BVHs took " << std::chrono::duration_cast<std::chrono::milliseconds>(std::chrono::high_resolution_clock::now() - start2).count() / 1000.0f << " seconds" << std::endl;
 }
 
+/// Hash of all data stored for a mesh. The derived face data is not included
+static uint64 compute_mesh_hash(const TriMesh& mesh)
+{
+    Hasher hasher;
+    hasher.add(mesh.vertices.data(), mesh.vertices.size() * sizeof(StVector3f));
+    hasher.add(mesh.normals.data(), mesh.normals.size() * sizeof(StVector3f));
+    hasher.add(mesh.texcoords.data(), mesh.texcoords.size() * sizeof(StVector2f));
+    hasher.add(mesh.indices);
+    return hasher.value();
+}
+
+template <typename T>
+static inline bool is_same_data(const std::vector<T>& a, const std::vector<T>& b)
+{
+    return a.size() == b.size() && std::memcmp(a.data(), b.data(), a.size() * sizeof(T)) == 0;
+}
+
+static inline bool is_same_mesh(const TriMesh& a, const TriMesh& b)
+{
+    return is_same_data(a.indices, b.indices)
+           && is_same_data(a.vertices, b.vertices)
+           && is_same_data(a.normals, b.normals)
+           && is_same_data(a.texcoords, b.texcoords);
+}
+
+static inline size_t mesh_memory(const TriMesh& mesh)
+{
+    return mesh.vertices.size() * sizeof(StVector3f)
+           + mesh.normals.size() * sizeof(StVector3f)
+           + mesh.face_normals.size() * sizeof(StVector3f)
+           + mesh.indices.size() * sizeof(uint32)
+           + mesh.texcoords.size() * sizeof(StVector2f)
+           + mesh.face_inv_area.size() * sizeof(float);
+}
+
+/// Map each mesh to the first mesh with exactly the same data. Returns the number of duplicates found
+static size_t find_shared_meshes(const std::vector<TriMesh>& meshes, std::vector<size_t>& representatives)
+{
+    std::vector<uint64> hashes(meshes.size());
+    tbb::parallel_for(tbb::blocked_range<size_t>(0, meshes.size()),
+                      [&](const tbb::blocked_range<size_t>& range) {
+                          for (size_t i = range.begin(); i != range.end(); ++i)
+                              hashes[i] = compute_mesh_hash(meshes[i]);
+                      });
+
+    size_t duplicates = 0;
+    std::unordered_map<uint64, std::vector<size_t>> buckets;
+    representatives.resize(meshes.size());
+    for (size_t i = 0; i < meshes.size(); ++i) {
+        representatives[i] = i;
+        if (meshes[i].vertices.empty())
+            continue;
+
+        auto& bucket = buckets[hashes[i]];
+        for (size_t candidate : bucket) {
+            if (is_same_mesh(meshes[candidate], meshes[i])) {
+                representatives[i] = candidate;
+                ++duplicates;
+                break;
+            }
+        }
+
+        if (representatives[i] == i)
+            bucket.push_back(i);
+    }
+
+    return duplicates;
+}
+
 bool LoaderShape::load(LoaderContext& ctx, LoaderResult& result)
 {
     // To make use of parallelization and workaround the map restrictions
@@ -272,6 +484,8 @@ bool LoaderShape::load(LoaderContext& ctx, LoaderResult& result)
             mesh = setup_mesh_mitsuba(name, *child, ctx);
         } else if (child->pluginType() == "external") {
             mesh = setup_mesh_external(name, *child, ctx);
+        } else if (child->pluginType() == "buffer") {
+            mesh = setup_mesh_buffer(name, *child, ctx);
         } else {
             IG_LOG(L_ERROR) << "Shape '" << name << "': Can not load shape type '" << child->pluginType() << "'" << std::endl;
             return;
@@ -327,14 +541,33 @@ bool LoaderShape::load(LoaderContext& ctx, LoaderResult& result)
 #endif
     IG_LOG(L_DEBUG) << "Loading of shapes took " << std::chrono::duration_cast<std::chrono::milliseconds>(std::chrono::high_resolution_clock::now() - start1).count() / 1000.0f << " seconds" << std::endl;
 
+    // Identical meshes are stored only once and shared by all their shapes
+    std::vector<size_t> representatives;
+    const size_t duplicates = find_shared_meshes(meshes, representatives);
+    if (duplicates > 0) {
+        size_t saved = 0;
+        for (size_t i = 0; i < meshes.size(); ++i) {
+            if (representatives[i] != i)
+                saved += mesh_memory(meshes[i]);
+        }
+        IG_LOG(L_INFO) << "Sharing " << duplicates << " duplicated meshes, saving " << saved / (1024.0f * 1024.0f) << " MiB of mesh data" << std::endl;
+    }
+
     // Write non-parallel
     IG_LOG(L_DEBUG) << "Storing triangle meshes..." << std::endl;
     size_t counter    = 0;
     const auto start2 = std::chrono::high_resolution_clock::now();
+    std::vector<uint32> shapeIDs(meshes.size());
     for (const auto& pair : ctx.Scene.shapes()) {
         const size_t id     = counter++;
         const TriMesh& mesh = meshes.at(id);
 
+        if (representatives[id] != id) {
+            shapeIDs[id]                         = shapeIDs[representatives[id]];
+            ctx.Environment.ShapeIDs[pair.first] = shapeIDs[id];
+            continue;
+        }
+
         // Register shape into environment
         Shape shape;
         shape.VertexCount = mesh.vertices.size();
@@ -345,6 +578,7 @@ bool LoaderShape::load(LoaderContext& ctx, LoaderResult& result)
         shape.BoundingBox = boxes.at(id);
 
         const uint32 shapeID = (uint32)ctx.Environment.Shapes.size();
+        shapeIDs[id]         = shapeID;
         ctx.Environment.Shapes.push_back(shape);
         ctx.Environment.ShapeIDs[pair.first] = shapeID;
 
@@ -369,12 +603,33 @@ bool LoaderShape::load(LoaderContext& ctx, LoaderResult& result)
     }
     IG_LOG(L_DEBUG) << "Storing of shapes took " << std::chrono::duration_cast<std::chrono::milliseconds>(std::chrono::high_resolution_clock::now() - start2).count() / 1000.0f << " seconds" << std::endl;
 
+    if (duplicates > 0) {
+        // Plane shapes were registered with the mesh index, not the shape id
+        std::unordered_map<uint32, PlaneShape> planes;
+        for (const auto& pair : ctx.Environment.PlaneShapes) {
+            if (representatives[pair.first] == pair.first)
+                planes[shapeIDs[pair.first]] = pair.second;
+        }
+        ctx.Environment.PlaneShapes = std::move(planes);
+
+        // Only unique meshes get a BVH
+        size_t unique = 0;
+        for (size_t i = 0; i < meshes.size(); ++i) {
+            if (representatives[i] != i)
+                continue;
+            if (unique != i)
+                meshes[unique] = std::move(meshes[i]);
+            ++unique;
+        }
+        meshes.resize(unique);
+    }
+
     if (ctx.Target == Target::NVVM || ctx.Target == Target::AMDGPU) {
-        setup_bvhs<2, 1>(meshes, result);
+        setup_bvhs<2, 1>(meshes, result, ctx.CacheDir);
     } else if (ctx.Target == Target::GENERIC || ctx.Target == Target::SINGLE || ctx.Target == Target::ASIMD || ctx.Target == Target::SSE42) {
-        setup_bvhs<4, 4>(meshes, result);
+        setup_bvhs<4, 4>(meshes, result, ctx.CacheDir);
     } else {
-        setup_bvhs<8, 4>(meshes, result);
+        setup_bvhs<8, 4>(meshes, result, ctx.CacheDir);
     }
 
     return true;
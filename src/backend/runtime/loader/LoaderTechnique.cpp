@@ -23,6 +23,37 @@ static TechniqueInfo technique_empty_get_info(const std::string&, const std::sha
 
 /////////////////////////
 
+/// Generate the light selector requested by the technique. Fallbacks to the uniform selector if only one light is present
+static void light_selector_loader(std::ostream& stream, const std::shared_ptr<Parser::Object>& technique, LoaderContext& ctx)
+{
+    std::string type = technique ? technique->property("light_selector").getString("power") : "power";
+    if (technique && technique->property("use_uniform_light_selector").getBool(false))
+        type = "uniform"; // Backward compatibility
+
+    if (type != "uniform" && type != "power" && type != "tree") {
+        IG_LOG(L_WARNING) << "Unknown light selector '" << type << "'. Using 'power' instead" << std::endl;
+        type = "power";
+    }
+
+    if (type == "uniform" || ctx.Scene.lights().size() <= 1) {
+        stream << "  let light_selector = make_uniform_light_selector(num_lights);" << std::endl;
+    } else if (type == "tree") {
+        const LightTreeInfo info = ctx.Lights->generateLightTree(ctx);
+        stream << "  let light_selector = make_light_tree_selector(num_lights, " << info.NodeCount
+               << ", " << info.FiniteRoot << ", " << info.InfiniteRoot << ", " << info.InfiniteProbability << ", device);" << std::endl;
+    } else {
+        auto light_cdf = ctx.Lights->generateLightSelectionCDF(ctx);
+        if (light_cdf.empty()) {
+            stream << "  let light_selector = make_null_light_selector();" << std::endl;
+        } else {
+            stream << "  let light_cdf = cdf::make_cdf_1d_from_buffer(device.load_buffer(\"" << light_cdf.u8string() << "\"), num_lights, 0);" << std::endl
+                   << "  let light_selector = make_cdf_light_selector(light_cdf);" << std::endl;
+        }
+    }
+}
+
+/////////////////////////
+
 static std::string restir_resampling_generator(LoaderContext& ctx)
 {
     std::stringstream stream;
@@ -72,7 +103,6 @@ static void restir_body_loader(std::ostream& stream, const std::string&, const s
 {
     const int max_depth     = technique ? technique->property("max_depth").getInteger(4) : 4;
     const float clamp_value = technique ? technique->property("clamp").getNumber(0) : 0; // Allow clamping of contributions
-    const bool useUniformLS = technique ? technique->property("use_uniform_light_selector").getBool(false) : false;
     const bool hasNormalAOV = technique ? technique->property("aov_normals").getBool(false) : false;
     const bool hasMISAOV    = technique ? technique->property("aov_mis").getBool(false) : false;
     //const bool hasRadianceAOV = technique ? technique->property("aov_sample_point_radiance").getBool(true) : true;
@@ -111,18 +141,7 @@ static void restir_body_loader(std::ostream& stream, const std::string&, const s
            << "    }" << std::endl
            << "  };" << std::endl;
 
-           
-    if (useUniformLS || ctx.Scene.lights().size() <= 1) {
-        stream << "  let light_selector = make_uniform_light_selector(num_lights);" << std::endl;
-    } else {
-        auto light_cdf = ctx.Lights->generateLightSelectionCDF(ctx);
-        if (light_cdf.empty()) {
-            stream << "  let light_selector = make_null_light_selector();" << std::endl;
-        } else {
-            stream << "  let light_cdf = cdf::make_cdf_1d_from_buffer(device.load_buffer(\"" << light_cdf.u8string() << "\"), num_lights, 0);" << std::endl
-                   << "  let light_selector = make_cdf_light_selector(light_cdf);" << std::endl;
-        }
-    }
+    light_selector_loader(stream, technique, ctx);
 
     stream << "  let technique = make_restir_renderer(device," << max_depth << ", num_lights, lights, light_selector, aovs, " << clamp_value << ");" << std::endl;
 }
@@ -208,7 +227,6 @@ static void path_body_loader(std::ostream& stream, const std::string&, const std
 {
     const int max_depth     = technique ? technique->property("max_depth").getInteger(64) : 64;
     const float clamp_value = technique ? technique->property("clamp").getNumber(0) : 0; // Allow clamping of contributions
-    const bool useUniformLS = technique ? technique->property("use_uniform_light_selector").getBool(false) : false;
     const bool hasNormalAOV = technique ? technique->property("aov_normals").getBool(false) : false;
     const bool hasMISAOV    = technique ? technique->property("aov_mis").getBool(false) : false;
 
@@ -238,17 +256,7 @@ static void path_body_loader(std::ostream& stream, const std::string&, const std
            << "    }" << std::endl
            << "  };" << std::endl;
 
-    if (useUniformLS || ctx.Scene.lights().size() <= 1) {
-        stream << "  let light_selector = make_uniform_light_selector(num_lights);" << std::endl;
-    } else {
-        auto light_cdf = ctx.Lights->generateLightSelectionCDF(ctx);
-        if (light_cdf.empty()) {
-            stream << "  let light_selector = make_null_light_selector();" << std::endl;
-        } else {
-            stream << "  let light_cdf = cdf::make_cdf_1d_from_buffer(device.load_buffer(\"" << light_cdf.u8string() << "\"), num_lights, 0);" << std::endl
-                   << "  let light_selector = make_cdf_light_selector(light_cdf);" << std::endl;
-        }
-    }
+    light_selector_loader(stream, technique, ctx);
 
     stream << "  let technique = make_path_renderer(" << 2 << ", num_lights, lights, light_selector, aovs, " << clamp_value << ");" << std::endl;
 }
@@ -275,19 +283,8 @@ static void volpath_body_loader(std::ostream& stream, const std::string&, const
 {
     const int max_depth     = technique ? technique->property("max_depth").getInteger(64) : 64;
     const float clamp_value = technique ? technique->property("clamp").getNumber(0) : 0; // Allow clamping of contributions
-    const bool useUniformLS = technique ? technique->property("use_uniform_light_selector").getBool(false) : false;
 
-    if (useUniformLS || ctx.Scene.lights().size() <= 1) {
-        stream << "  let light_selector = make_uniform_light_selector(num_lights);" << std::endl;
-    } else {
-        auto light_cdf = ctx.Lights->generateLightSelectionCDF(ctx);
-        if (light_cdf.empty()) {
-            stream << "  let light_selector = make_null_light_selector();" << std::endl;
-        } else {
-            stream << "  let light_cdf = cdf::make_cdf_1d_from_buffer(device.load_buffer(\"" << light_cdf.u8string() << "\"), num_lights, 0);" << std::endl
-                   << "  let light_selector = make_cdf_light_selector(light_cdf);" << std::endl;
-        }
-    }
+    light_selector_loader(stream, technique, ctx);
 
     stream << "  let aovs = @|_id:i32| make_empty_aov_image();" << std::endl;
     stream << "  let technique = make_volume_path_renderer(" << max_depth << ", num_lights, lights, light_selector, media, aovs, " << clamp_value << ");" << std::endl;
@@ -314,7 +311,7 @@ static std::string ppm_light_camera_generator(LoaderContext& ctx)
     stream << ctx.Lights->generate(tree, false) << std::endl;
 
     stream << "  let spi = " << ShaderUtils::inlineSPI(ctx) << ";" << std::endl;
-    stream << "  let emitter = make_ppm_light_emitter(num_lights, lights, iter);" << std::endl;
+    stream << "  let emitter = make_ppm_light_emitter(num_lights, lights, iter + " << ShaderUtils::inlineSeed() << ");" << std::endl;
 
     stream << RayGenerationShader::end();
 
@@ -402,7 +399,7 @@ static void ppm_body_loader(std::ostream& stream, const std::string&, const std:
                << "    }" << std::endl
                << "  };" << std::endl;
 
-        stream << "  let ppm_radius = ppm_compute_radius(" << radius * ctx.Environment.SceneDiameter << ", settings.iter);" << std::endl;
+        stream << "  let ppm_radius = ppm_compute_radius(" << radius * ctx.Environment.SceneDiameter << ", settings.iter + " << ShaderUtils::inlineSeed() << ");" << std::endl;
     }
 
     stream << "  let scene_bbox  = " << LoaderUtils::inlineSceneBBox(ctx) << ";" << std::endl
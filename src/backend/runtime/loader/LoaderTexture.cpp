@@ -4,9 +4,65 @@
 #include "LoaderUtils.h"
 #include "Logger.h"
 #include "ShadingTree.h"
+#include "TiledImage.h"
 #include "Transpiler.h"
+#include "shader/ShaderCache.h"
 
 namespace IG {
+constexpr const char* const TiledCacheFile = "texture.igt";
+
+/// Convert the image to the tiled format if necessary and return the path to the converted file. Returns an empty path on error
+static std::filesystem::path setup_tiled_image(LoaderContext& ctx, const std::filesystem::path& filename)
+{
+    const std::string exported_id = "_tiled_" + filename.generic_u8string();
+
+    const auto data = ctx.ExportedData.find(exported_id);
+    if (data != ctx.ExportedData.end())
+        return std::any_cast<std::filesystem::path>(data->second);
+
+    // The key changes with the path and the modification of the source image
+    const std::string key = TiledImage::computeKey(filename);
+
+    std::filesystem::path path;
+    if (!ctx.CacheDir.empty()) {
+        // Only used to manage the entry directories, eviction is handled by the shader cache of the runtime. The file is read lazily while rendering, therefore the key is protected
+        ShaderCache cache(ctx.CacheDir, std::numeric_limits<size_t>::max());
+        const auto dir = cache.acquire(key);
+        if (!dir.empty()) {
+            path = dir / TiledCacheFile;
+            ctx.CacheKeys.insert(key);
+        }
+    }
+
+    if (path.empty()) {
+        std::filesystem::create_directories("data/"); // Make sure this directory exists
+        path = "data/tiled_" + LoaderUtils::escapeIdentifier(filename.stem().generic_u8string()) + "_" + key + ".igt";
+    }
+
+    try {
+        bool valid = false;
+        if (std::filesystem::exists(path)) {
+            try {
+                TiledImage img(path);
+                valid = true;
+            } catch (const ImageLoadException&) {
+                // Convert again
+            }
+        }
+
+        if (!valid) {
+            IG_LOG(L_DEBUG) << "Converting " << filename << " to tiled image " << path << std::endl;
+            TiledImage::convert(filename, path);
+        }
+    } catch (const ImageLoadException& e) {
+        IG_LOG(L_ERROR) << e.what() << std::endl;
+        path.clear();
+    }
+
+    ctx.ExportedData[exported_id] = path;
+    return path;
+}
+
 static void tex_image(std::ostream& stream, const std::string& name, const Parser::Object& tex, ShadingTree& tree)
 {
     if (!tree.beginClosure(name))
@@ -16,6 +72,8 @@ static void tex_image(std::ostream& stream, const std::string& name, const Parse
     const std::string filter_type = tex.property("filter_type").getString("bilinear");
     const Transformf transform    = tex.property("transform").getTransform();
     const bool force_unpacked     = tex.property("force_unpacked").getBool(false); // Force the use of unpacked (float) images
+    const bool tiled              = tex.property("tiled").getBool(false);          // Use the tiled and mip-mapped representation
+    const int max_resolution      = tex.property("max_resolution").getInteger(0);  // Select the mip level not exceeding the given resolution
 
     std::string filter = "make_bilinear_filter()";
     if (filter_type == "nearest")
@@ -42,7 +100,19 @@ static void tex_image(std::ostream& stream, const std::string& name, const Parse
         wrap = getWrapMode(tex.property("wrap_mode").getString("repeat"));
     }
 
-    if (!force_unpacked && Image::isPacked(filename))
+    std::filesystem::path tiled_path;
+    if (tiled)
+        tiled_path = setup_tiled_image(tree.context(), filename);
+
+    if (!tiled_path.empty()) {
+        size_t level = 0;
+        try {
+            level = TiledImage(tiled_path).levelForResolution((size_t)std::max(0, max_resolution));
+        } catch (const ImageLoadException& e) {
+            IG_LOG(L_ERROR) << e.what() << std::endl;
+        }
+        stream << "  let img_" << LoaderUtils::escapeIdentifier(name) << " = device.load_tiled_image(\"" << tiled_path.generic_u8string() << "\", " << level << ");" << std::endl;
+    } else if (!force_unpacked && Image::isPacked(filename))
         stream << "  let img_" << LoaderUtils::escapeIdentifier(name) << " = device.load_packed_image(\"" << filename << "\", " << (Image::hasAlphaChannel(filename) ? "false" : "true") << ");" << std::endl;
     else
         stream << "  let img_" << LoaderUtils::escapeIdentifier(name) << " = device.load_image(\"" << filename << "\");" << std::endl;
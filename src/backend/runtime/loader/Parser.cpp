@@ -2,8 +2,10 @@
 #include "Logger.h"
 #include "math/Tangent.h"
 
+#include <algorithm>
 #include <cmath>
 #include <fstream>
+#include <mutex>
 #include <optional>
 #include <sstream>
 
@@ -11,6 +13,8 @@
 #include <rapidjson/error/en.h>
 #include <rapidjson/istreamwrapper.h>
 
+#include <tbb/parallel_for.h>
+
 #include "glTFParser.h"
 
 namespace IG::Parser {
@@ -334,7 +338,44 @@ static void handleNamedObject(Scene& scene, ObjectType type, const std::filesyst
     }
 }
 
-static void handleExternalObject(SceneParser& loader, Scene& scene, const std::filesystem::path& baseDir, const rapidjson::Value& obj)
+// ------------- Externals
+struct FileStamp {
+    std::filesystem::path Path;
+    std::filesystem::file_time_type LastWrite;
+    uintmax_t Size;
+};
+
+static inline FileStamp stampFile(const std::filesystem::path& path)
+{
+    std::error_code ec;
+    FileStamp stamp;
+    stamp.Path      = path;
+    stamp.LastWrite = std::filesystem::last_write_time(path, ec);
+    stamp.Size      = std::filesystem::file_size(path, ec);
+    return stamp;
+}
+
+static inline bool isUnchanged(const FileStamp& stamp)
+{
+    const FileStamp current = stampFile(stamp.Path);
+    return current.LastWrite == stamp.LastWrite && current.Size == stamp.Size;
+}
+
+struct ExternalEntry {
+    std::filesystem::path Path;
+    std::string Type;
+};
+
+struct ParsedExternal {
+    IG::Parser::Scene Scene;
+    std::vector<FileStamp> Dependencies; // All files the scene was parsed from, including nested externals
+};
+
+// Parsed ignis externals are kept for the whole process and only parsed again if one of the files changed
+static std::mutex sExternalCacheMutex;
+static std::unordered_map<std::string, ParsedExternal> sExternalCache;
+
+static ExternalEntry resolveExternalObject(const SceneParser& loader, const std::filesystem::path& baseDir, const rapidjson::Value& obj)
 {
     if (obj.HasMember("type") && !obj["type"].IsString())
         throw std::runtime_error("Expected type to be a string");
@@ -358,26 +399,93 @@ static void handleExternalObject(SceneParser& loader, Scene& scene, const std::f
             throw std::runtime_error("Could not determine external type by filename '" + path.u8string() + "'");
     }
 
-    if (pluginType == "ignis") {
-        // Include ignis file
-        bool ok           = false;
-        Scene local_scene = loader.loadFromFile(path, ok);
+    if (pluginType != "ignis" && pluginType != "gltf")
+        throw std::runtime_error("Unknown external type '" + pluginType + "' given");
+
+    return ExternalEntry{ path, pluginType };
+}
 
-        if (!ok)
-            throw std::runtime_error("Could not load '" + path.generic_u8string() + "'");
+static Scene parseJSONFile(SceneParser& loader, const std::filesystem::path& path, bool& ok, std::vector<FileStamp>* dependencies);
 
-        scene.addFrom(local_scene);
-    } else if (pluginType == "gltf") {
+static ParsedExternal loadExternal(SceneParser& loader, const ExternalEntry& external)
+{
+    if (external.Type == "gltf") {
         // Include and map gltf stuff
-        bool ok           = false;
-        Scene local_scene = glTFSceneParser::loadFromFile(path, ok);
+        ParsedExternal parsed;
+        parsed.Dependencies.push_back(stampFile(external.Path));
 
+        bool ok      = false;
+        parsed.Scene = glTFSceneParser::loadFromFile(external.Path, ok);
         if (!ok)
-            throw std::runtime_error("Could not load '" + path.generic_u8string() + "'");
+            throw std::runtime_error("Could not load '" + external.Path.generic_u8string() + "'");
+        return parsed;
+    }
 
-        scene.addFrom(local_scene);
-    } else {
-        throw std::runtime_error("Unknown external type '" + pluginType + "' given");
+    // Lookup paths change how nested externals are resolved
+    std::string key = external.Path.generic_u8string();
+    for (const auto& dir : loader.lookupPaths())
+        key += "|" + dir.generic_u8string();
+
+    {
+        std::lock_guard<std::mutex> guard(sExternalCacheMutex);
+        const auto it = sExternalCache.find(key);
+        if (it != sExternalCache.end() && std::all_of(it->second.Dependencies.begin(), it->second.Dependencies.end(), isUnchanged)) {
+            IG_LOG(L_DEBUG) << "Using already parsed external " << external.Path << std::endl;
+            return it->second;
+        }
+    }
+
+    // Include ignis file
+    ParsedExternal parsed;
+    parsed.Dependencies.push_back(stampFile(external.Path));
+
+    bool ok      = false;
+    parsed.Scene = parseJSONFile(loader, external.Path, ok, &parsed.Dependencies);
+    if (!ok)
+        throw std::runtime_error("Could not load '" + external.Path.generic_u8string() + "'");
+
+    std::lock_guard<std::mutex> guard(sExternalCacheMutex);
+    sExternalCache[key] = parsed;
+    return parsed;
+}
+
+static void handleExternalObjects(SceneParser& loader, Scene& scene, const std::filesystem::path& baseDir, const rapidjson::Value& objs, std::vector<FileStamp>* dependencies)
+{
+    std::vector<ExternalEntry> externals;
+    for (const auto& obj : objs.GetArray()) {
+        if (!obj.IsObject())
+            throw std::runtime_error("Expected external element to be an object");
+        externals.push_back(resolveExternalObject(loader, baseDir, obj));
+    }
+
+    // The same file might be included multiple times, only parse it once
+    std::vector<size_t> sources(externals.size());
+    for (size_t i = 0; i < externals.size(); ++i) {
+        sources[i] = i;
+        for (size_t j = 0; j < i; ++j) {
+            if (externals[j].Path == externals[i].Path && externals[j].Type == externals[i].Type) {
+                sources[i] = j;
+                break;
+            }
+        }
+    }
+
+    // Externals are independent of each other and can be parsed in parallel
+    std::vector<ParsedExternal> parsed(externals.size());
+    tbb::parallel_for(tbb::blocked_range<size_t>(0, externals.size(), 1),
+                      [&](const tbb::blocked_range<size_t>& range) {
+                          for (size_t i = range.begin(); i != range.end(); ++i) {
+                              if (sources[i] == i)
+                                  parsed[i] = loadExternal(loader, externals[i]);
+                          }
+                      });
+
+    // Merge in the given order, such that later externals still override earlier ones
+    for (size_t i = 0; i < externals.size(); ++i) {
+        const auto& external = parsed[sources[i]];
+        scene.addFrom(external.Scene);
+        if (dependencies)
+            dependencies->insert(dependencies->end(), external.Dependencies.begin(), external.Dependencies.end());
     }
 }
 
@@ -418,7 +526,7 @@ void Scene::addConstantEnvLight()
 
 class InternalSceneParser {
 public:
-    static Scene loadFromJSON(SceneParser& loader, const std::filesystem::path& baseDir, const rapidjson::Document& doc)
+    static Scene loadFromJSON(SceneParser& loader, const std::filesystem::path& baseDir, const rapidjson::Document& doc, std::vector<FileStamp>* dependencies = nullptr)
     {
         if (!doc.IsObject())
             throw std::runtime_error("Expected root element to be an object");
@@ -437,12 +545,7 @@ public:
         if (doc.HasMember("externals")) {
             if (!doc["externals"].IsArray())
                 throw std::runtime_error("Expected external elements to be an array");
-            for (const auto& exts : doc["externals"].GetArray()) {
-                if (!exts.IsObject())
-                    throw std::runtime_error("Expected external element to be an object");
-
-                handleExternalObject(loader, scene, baseDir, exts);
-            }
+            handleExternalObjects(loader, scene, baseDir, doc["externals"], dependencies);
         }
 
         if (doc.HasMember("shapes")) {
@@ -511,6 +614,29 @@ public:
 
 constexpr auto JsonFlags = rapidjson::kParseDefaultFlags | rapidjson::kParseCommentsFlag | rapidjson::kParseTrailingCommasFlag | rapidjson::kParseNanAndInfFlag | rapidjson::kParseEscapedApostropheFlag;
 
+static Scene parseJSONFile(SceneParser& loader, const std::filesystem::path& path, bool& ok, std::vector<FileStamp>* dependencies)
+{
+    std::ifstream ifs(path.generic_u8string());
+    if (!ifs.good()) {
+        ok = false;
+        IG_LOG(L_ERROR) << "Could not open file '" << path << "'" << std::endl;
+        return Scene();
+    }
+
+    rapidjson::IStreamWrapper isw(ifs);
+
+    ok = true;
+    rapidjson::Document doc;
+    if (doc.ParseStream<JsonFlags>(isw).HasParseError()) {
+        ok = false;
+        IG_LOG(L_ERROR) << "JSON[" << doc.GetErrorOffset() << "]: " << rapidjson::GetParseError_En(doc.GetParseError()) << std::endl;
+        return Scene();
+    }
+
+    const std::filesystem::path parent = path.has_parent_path() ? std::filesystem::canonical(path.parent_path()) : std::filesystem::path{};
+    return InternalSceneParser::loadFromJSON(loader, parent, doc, dependencies);
+}
+
 Scene SceneParser::loadFromFile(const std::filesystem::path& path, bool& ok)
 {
     if (path.extension() == ".gltf" || path.extension() == ".glb") {
@@ -531,25 +657,7 @@ Scene SceneParser::loadFromFile(const std::filesystem::path& path, bool& ok)
         return scene;
     }
 
-    std::ifstream ifs(path.generic_u8string());
-    if (!ifs.good()) {
-        ok = false;
-        IG_LOG(L_ERROR) << "Could not open file '" << path << "'" << std::endl;
-        return Scene();
-    }
-
-    rapidjson::IStreamWrapper isw(ifs);
-
-    ok = true;
-    rapidjson::Document doc;
-    if (doc.ParseStream<JsonFlags>(isw).HasParseError()) {
-        ok = false;
-        IG_LOG(L_ERROR) << "JSON[" << doc.GetErrorOffset() << "]: " << rapidjson::GetParseError_En(doc.GetParseError()) << std::endl;
-        return Scene();
-    }
-
-    const std::filesystem::path parent = path.has_parent_path() ? std::filesystem::canonical(path.parent_path()) : std::filesystem::path{};
-    return InternalSceneParser::loadFromJSON(*this, parent, doc);
+    return parseJSONFile(*this, path, ok, nullptr);
 }
 
 Scene SceneParser::loadFromString(const char* str, bool& ok)
@@ -792,6 +792,20 @@ public:
                     return call;
             }
 
+            if (name == "param") {
+                switch (argumentTypes[1]) {
+                default:
+                case PExprType::Integer:
+                    return "registry::get_parameter_i32(" + argumentPayloads[0] + ", " + argumentPayloads[1] + ")";
+                case PExprType::Number:
+                    return "registry::get_parameter_f32(" + argumentPayloads[0] + ", " + argumentPayloads[1] + ")";
+                case PExprType::Vec3:
+                    return "registry::get_parameter_vec3(" + argumentPayloads[0] + ", " + argumentPayloads[1] + ")";
+                case PExprType::Vec4:
+                    return "color_to_vec4(registry::get_parameter_color(" + argumentPayloads[0] + ", vec4_to_color(" + argumentPayloads[1] + ")))";
+                }
+            }
+
             if (name == "vec2") {
                 if (argumentPayloads[0] == argumentPayloads[1])
                     return "vec2_expand(" + argumentPayloads[0] + ")";
@@ -1068,6 +1082,25 @@ public:
                 return var;
         }
 
+        // Parameter from the runtime registry with a default value
+        if (lkp.name() == "param" && lkp.parameters().size() == 2) {
+            auto var = matchFuncRet(lkp, PExprType::Integer, { PExprType::String, PExprType::Integer });
+            if (var.has_value())
+                return var;
+
+            var = matchFuncRet(lkp, PExprType::Number, { PExprType::String, PExprType::Number });
+            if (var.has_value())
+                return var;
+
+            var = matchFuncRet(lkp, PExprType::Vec3, { PExprType::String, PExprType::Vec3 });
+            if (var.has_value())
+                return var;
+
+            var = matchFuncRet(lkp, PExprType::Vec4, { PExprType::String, PExprType::Vec4 });
+            if (var.has_value())
+                return var;
+        }
+
         // Select function
         if (lkp.name() == "select" && lkp.parameters().size() == 3) {
             auto var = matchFuncRet(lkp, PExprType::Boolean, { PExprType::Boolean, PExprType::Boolean, PExprType::Boolean });
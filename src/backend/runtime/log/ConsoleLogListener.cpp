@@ -23,41 +23,42 @@ namespace IG {
 ConsoleLogListener::ConsoleLogListener(bool useAnsi)
     : LogListener()
     , mUseAnsi(useAnsi)
+    , mStream(&std::cout)
 {
 }
 
 void ConsoleLogListener::startEntry(LogLevel level)
 {
-    std::cout << "[";
+    *mStream << "[";
     if (mUseAnsi) {
         switch (level) {
         case L_DEBUG:
-            std::cout << ANSI_DARK_GRAY;
+            *mStream << ANSI_DARK_GRAY;
             break;
         case L_INFO:
             break;
         case L_WARNING:
-            std::cout << ANSI_YELLOW;
+            *mStream << ANSI_YELLOW;
             break;
         case L_ERROR:
-            std::cout << ANSI_LIGHT_RED;
+            *mStream << ANSI_LIGHT_RED;
             break;
         case L_FATAL:
-            std::cout << ANSI_RED;
+            *mStream << ANSI_RED;
             break;
         }
     }
 
-    std::cout << Logger::levelString(level);
+    *mStream << Logger::levelString(level);
 
     if (mUseAnsi)
-        std::cout << ANSI_RESET;
+        *mStream << ANSI_RESET;
 
-    std::cout << "] ";
+    *mStream << "] ";
 }
 
 void ConsoleLogListener::writeEntry(char c)
 {
-    std::cout.put(c);
+    mStream->put(c);
 }
 } // namespace IG
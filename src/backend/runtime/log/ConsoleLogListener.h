@@ -15,7 +15,12 @@ public:
     inline void enableAnsi(bool b = true) { mUseAnsi = b; }
     inline bool isUsingAnsi() const { return mUseAnsi; }
 
+    /// Write entries to the standard error stream instead of the standard output stream
+    inline void useStdErr(bool b = true) { mStream = b ? &std::cerr : &std::cout; }
+    inline bool isUsingStdErr() const { return mStream == &std::cerr; }
+
 private:
     bool mUseAnsi;
+    std::ostream* mStream;
 };
 } // namespace IG
@@ -1,12 +1,20 @@
 #include "ObjFile.h"
 #include "Logger.h"
+#include "MappedFile.h"
+#include "Triangulation.h"
 
 #define TINYOBJLOADER_IMPLEMENTATION
 #include "tiny_obj_loader.h"
 
+#include <atomic>
+#include <cstring>
 #include <functional>
+#include <numeric>
 #include <tuple>
 
+#include <tbb/parallel_for.h>
+#include <tbb/parallel_sort.h>
+
 namespace IG::obj {
 
 using ObjIndex = std::tuple<uint32, uint32, uint32>;
@@ -21,7 +29,444 @@ struct ObjIndexHash {
     }
 };
 
+/// Compute missing attributes and release unused memory
+static void finalize(const std::filesystem::path& path, TriMesh& tri_mesh, bool has_norms, bool has_tex)
+{
+    // Cleanup
+    // TODO: This does not work due to fp precision problems
+    // const size_t removedBadAreas = tri_mesh.removeZeroAreaTriangles();
+    // if (removedBadAreas != 0)
+    //     IG_LOG(L_WARNING) << "ObjFile " << path << ": Removed " << removedBadAreas << " triangles with zero area" << std::endl;
+
+    // Normals
+    bool hasBadAreas = false;
+    tri_mesh.computeFaceNormals(&hasBadAreas);
+    // if (hasBadAreas)
+    //     IG_LOG(L_WARNING) << "ObjFile " << path << ": Triangle mesh contains triangles with zero area" << std::endl;
+
+    if (!has_norms) {
+        IG_LOG(L_INFO) << "ObjFile " << path << ": No valid normals given. Recalculating " << std::endl;
+        tri_mesh.computeVertexNormals();
+    }
+
+    // Texcoords
+    if (!has_tex) {
+        IG_LOG(L_INFO) << "ObjFile " << path << ": No texture coordinates are present, using default value." << std::endl;
+        tri_mesh.makeTexCoordsZero();
+    }
+
+    tri_mesh.vertices.shrink_to_fit();
+    tri_mesh.normals.shrink_to_fit();
+    tri_mesh.texcoords.shrink_to_fit();
+    tri_mesh.indices.shrink_to_fit();
+}
+
+// Files larger than this are parsed in parallel chunks
+constexpr size_t ParallelThreshold = 64 * 1024 * 1024;
+
+namespace {
+/// Parsed content of a chunk of lines. Indices are absolute and zero based
+struct ObjChunk {
+    std::vector<StVector3f> Vertices;
+    std::vector<StVector3f> Normals;
+    std::vector<StVector2f> TexCoords;
+    std::vector<uint32> FaceSizes;
+    std::vector<ObjIndex> Corners; // [Vertex, Normal, TexCoord] with InvalidIndex if not given
+    bool HasNormals   = false;
+    bool HasTexCoords = false;
+    bool Unsupported  = false; // Contains features only supported by the sequential loader
+
+    size_t TriangleCount = 0;
+};
+
+constexpr uint32 InvalidIndex = std::numeric_limits<uint32>::max();
+
+inline bool is_space(char c) { return c == ' ' || c == '\t'; }
+inline bool is_line_end(char c) { return c == '\n' || c == '\r' || c == '\0'; }
+
+/// Parse up to N floats. Missing values are set to zero. The line has to be terminated by a line end character
+template <size_t N>
+inline const char* parse_floats(const char* ptr, float* values)
+{
+    for (size_t i = 0; i < N; ++i) {
+        while (is_space(*ptr))
+            ++ptr;
+
+        values[i] = 0;
+        if (is_line_end(*ptr))
+            continue;
+
+        char* next = nullptr;
+        values[i]  = std::strtof(ptr, &next);
+        ptr        = next;
+    }
+    return ptr;
+}
+
+/// Parse a single index of a face corner. Returns false for relative or invalid indices
+inline bool parse_index(const char*& ptr, uint32& index)
+{
+    if (*ptr < '0' || *ptr > '9')
+        return false;
+
+    uint64 value = 0;
+    while (*ptr >= '0' && *ptr <= '9') {
+        value = value * 10 + (uint64)(*ptr - '0');
+        ++ptr;
+    }
+
+    if (value == 0 || value > InvalidIndex)
+        return false;
+
+    index = (uint32)(value - 1);
+    return true;
+}
+
+inline bool parse_face(const char* ptr, ObjChunk& chunk)
+{
+    uint32 count = 0;
+    while (true) {
+        while (is_space(*ptr))
+            ++ptr;
+        if (is_line_end(*ptr) || *ptr == '#')
+            break;
+
+        uint32 v = InvalidIndex, t = InvalidIndex, n = InvalidIndex;
+        if (!parse_index(ptr, v))
+            return false;
+
+        if (*ptr == '/') {
+            ++ptr;
+            if (*ptr != '/') {
+                if (!parse_index(ptr, t))
+                    return false;
+                chunk.HasTexCoords = true;
+            }
+
+            if (*ptr == '/') {
+                ++ptr;
+                if (!parse_index(ptr, n))
+                    return false;
+                chunk.HasNormals = true;
+            }
+        }
+
+        if (!is_space(*ptr) && !is_line_end(*ptr))
+            return false;
+
+        chunk.Corners.emplace_back(v, n, t);
+        ++count;
+    }
+
+    if (count < 3) {
+        chunk.Corners.resize(chunk.Corners.size() - count); // Ignore degenerated faces
+    } else {
+        chunk.FaceSizes.push_back(count);
+        chunk.TriangleCount += count - 2;
+    }
+    return true;
+}
+
+/// Parse a single line. The line has to be terminated by a line end character
+inline bool parse_line(const char* ptr, ObjChunk& chunk)
+{
+    while (is_space(*ptr))
+        ++ptr;
+
+    if (ptr[0] == 'v' && is_space(ptr[1])) {
+        float values[3];
+        parse_floats<3>(ptr + 2, values);
+        chunk.Vertices.emplace_back(values[0], values[1], values[2]);
+    } else if (ptr[0] == 'v' && ptr[1] == 'n' && is_space(ptr[2])) {
+        float values[3];
+        parse_floats<3>(ptr + 3, values);
+        chunk.Normals.emplace_back(values[0], values[1], values[2]);
+    } else if (ptr[0] == 'v' && ptr[1] == 't' && is_space(ptr[2])) {
+        float values[2];
+        parse_floats<2>(ptr + 3, values);
+        chunk.TexCoords.emplace_back(values[0], values[1]);
+    } else if (ptr[0] == 'f' && is_space(ptr[1])) {
+        return parse_face(ptr + 2, chunk);
+    }
+
+    // Everything else (comments, groups, materials, lines and points) is ignored
+    return true;
+}
+
+void parse_chunk(const char* begin, const char* end, ObjChunk& chunk)
+{
+    // Rough estimate of the amount of data
+    const size_t estimate = (size_t)(end - begin) / 40;
+    chunk.Vertices.reserve(estimate / 2);
+    chunk.Corners.reserve(estimate * 2);
+
+    const char* line = begin;
+    while (line < end) {
+        const char* line_end = static_cast<const char*>(std::memchr(line, '\n', (size_t)(end - line)));
+        if (line_end != nullptr && line_end > line && (line_end[-1] == '\\' || (line_end[-1] == '\r' && line_end - 1 > line && line_end[-2] == '\\'))) {
+            chunk.Unsupported = true; // Line continuation
+            return;
+        }
+
+        bool ok;
+        if (line_end == nullptr) {
+            // Last line without a line end. Copy it to make sure it is terminated
+            const std::string last(line, end);
+            ok       = parse_line(last.c_str(), chunk);
+            line_end = end;
+        } else {
+            ok = parse_line(line, chunk);
+        }
+
+        if (!ok) {
+            chunk.Unsupported = true;
+            return;
+        }
+
+        line = line_end + 1;
+    }
+}
+} // namespace
+
+std::optional<TriMesh> load_parallel(const std::filesystem::path& path, size_t chunk_size)
+{
+    MappedFile file;
+    try {
+        file = MappedFile(path);
+    } catch (const std::runtime_error& e) {
+        IG_LOG(L_ERROR) << "ObjFile " << path << ": " << e.what() << std::endl;
+        return TriMesh{};
+    }
+
+    const char* data  = reinterpret_cast<const char*>(file.data());
+    const size_t size = file.size();
+
+    // Split at line boundaries
+    std::vector<size_t> bounds = { 0 };
+    while (bounds.back() < size) {
+        size_t next = std::min(size, bounds.back() + std::max<size_t>(1, chunk_size));
+        if (next < size) {
+            const void* line_end = std::memchr(data + next, '\n', size - next);
+            next                 = line_end ? (size_t)(static_cast<const char*>(line_end) - data) + 1 : size;
+        }
+        bounds.push_back(next);
+    }
+
+    const size_t chunk_count = bounds.size() - 1;
+    std::vector<ObjChunk> chunks(chunk_count);
+    tbb::parallel_for(size_t(0), chunk_count, [&](size_t i) {
+        parse_chunk(data + bounds[i], data + bounds[i + 1], chunks[i]);
+    });
+
+    file.unmap();
+
+    // Prefix sums used to rebase the chunks
+    size_t vertex_count = 0, normal_count = 0, texcoord_count = 0, corner_count = 0, face_count = 0, triangle_count = 0;
+    bool has_norms = false, has_tex = false;
+    std::vector<size_t> vertex_offsets(chunk_count), normal_offsets(chunk_count), texcoord_offsets(chunk_count);
+    std::vector<size_t> corner_offsets(chunk_count), face_offsets(chunk_count), triangle_offsets(chunk_count);
+    for (size_t i = 0; i < chunk_count; ++i) {
+        const auto& chunk = chunks[i];
+        if (chunk.Unsupported)
+            return std::nullopt;
+
+        vertex_offsets[i]   = vertex_count;
+        normal_offsets[i]   = normal_count;
+        texcoord_offsets[i] = texcoord_count;
+        corner_offsets[i]   = corner_count;
+        face_offsets[i]     = face_count;
+        triangle_offsets[i] = triangle_count;
+
+        vertex_count += chunk.Vertices.size();
+        normal_count += chunk.Normals.size();
+        texcoord_count += chunk.TexCoords.size();
+        corner_count += chunk.Corners.size();
+        face_count += chunk.FaceSizes.size();
+        triangle_count += chunk.TriangleCount;
+        has_norms |= chunk.HasNormals;
+        has_tex |= chunk.HasTexCoords;
+    }
+
+    if (vertex_count == 0) {
+        IG_LOG(L_ERROR) << "ObjFile " << path << ": No vertices given!" << std::endl;
+        return TriMesh{};
+    }
+
+    if (vertex_count >= InvalidIndex || corner_count >= InvalidIndex) {
+        IG_LOG(L_ERROR) << "ObjFile " << path << ": Too many vertices" << std::endl;
+        return TriMesh{};
+    }
+
+    // Merge attributes and corners
+    std::vector<StVector3f> vertices(vertex_count);
+    std::vector<StVector3f> normals(normal_count);
+    std::vector<StVector2f> texcoords(texcoord_count);
+    std::vector<ObjIndex> corners(corner_count);
+    std::vector<uint32> face_sizes(face_count);
+    std::atomic<bool> out_of_bounds = false;
+    tbb::parallel_for(size_t(0), chunk_count, [&](size_t i) {
+        auto& chunk = chunks[i];
+        std::copy(chunk.Vertices.begin(), chunk.Vertices.end(), vertices.begin() + vertex_offsets[i]);
+        std::copy(chunk.Normals.begin(), chunk.Normals.end(), normals.begin() + normal_offsets[i]);
+        std::copy(chunk.TexCoords.begin(), chunk.TexCoords.end(), texcoords.begin() + texcoord_offsets[i]);
+        std::copy(chunk.FaceSizes.begin(), chunk.FaceSizes.end(), face_sizes.begin() + face_offsets[i]);
+
+        for (size_t k = 0; k < chunk.Corners.size(); ++k) {
+            const auto& c = chunk.Corners[k];
+            if (std::get<0>(c) >= vertex_count
+                || (std::get<1>(c) != InvalidIndex && std::get<1>(c) >= normal_count)
+                || (std::get<2>(c) != InvalidIndex && std::get<2>(c) >= texcoord_count))
+                out_of_bounds = true;
+
+            // Only keep attributes used in the file to reduce the number of unique corners
+            corners[corner_offsets[i] + k] = ObjIndex{ std::get<0>(c), has_norms ? std::get<1>(c) : 0, has_tex ? std::get<2>(c) : 0 };
+        }
+
+        // Release memory early
+        chunk.Vertices  = {};
+        chunk.Normals   = {};
+        chunk.TexCoords = {};
+        chunk.FaceSizes = {};
+        chunk.Corners   = {};
+    });
+
+    if (out_of_bounds) {
+        IG_LOG(L_ERROR) << "ObjFile " << path << ": Face index out of bounds" << std::endl;
+        return TriMesh{};
+    }
+
+    // Deduplicate corners with the same attributes
+    TriMesh tri_mesh;
+    std::vector<uint32> corner_map(corner_count);
+    if (!has_norms && !has_tex) {
+        // Only positions, which can be used directly after removing unreferenced vertices
+        std::unique_ptr<std::atomic<uint32>[]> vertex_map(new std::atomic<uint32>[vertex_count]);
+        tbb::parallel_for(size_t(0), vertex_count, [&](size_t v) { vertex_map[v].store(0, std::memory_order_relaxed); });
+        tbb::parallel_for(size_t(0), corner_count, [&](size_t k) { vertex_map[std::get<0>(corners[k])].store(1, std::memory_order_relaxed); });
+
+        for (size_t v = 0; v < vertex_count; ++v) {
+            if (vertex_map[v].load(std::memory_order_relaxed) != 0) {
+                vertex_map[v].store((uint32)tri_mesh.vertices.size(), std::memory_order_relaxed);
+                tri_mesh.vertices.push_back(vertices[v]);
+            }
+        }
+
+        tbb::parallel_for(size_t(0), corner_count, [&](size_t k) { corner_map[k] = vertex_map[std::get<0>(corners[k])].load(std::memory_order_relaxed); });
+    } else {
+        std::vector<uint32> order(corner_count);
+        std::iota(order.begin(), order.end(), 0);
+        tbb::parallel_sort(order.begin(), order.end(), [&](uint32 a, uint32 b) { return corners[a] < corners[b]; });
+
+        std::vector<uint32> representatives;
+        for (size_t k = 0; k < corner_count; ++k) {
+            if (k == 0 || corners[order[k]] != corners[order[k - 1]])
+                representatives.push_back(order[k]);
+            corner_map[order[k]] = (uint32)(representatives.size() - 1);
+        }
+
+        tri_mesh.vertices.resize(representatives.size());
+        if (has_norms)
+            tri_mesh.normals.resize(representatives.size());
+        if (has_tex)
+            tri_mesh.texcoords.resize(representatives.size());
+
+        tbb::parallel_for(size_t(0), representatives.size(), [&](size_t id) {
+            const auto& c = corners[representatives[id]];
+
+            tri_mesh.vertices[id] = vertices[std::get<0>(c)];
+
+            if (has_norms) {
+                if (IG_LIKELY(std::get<1>(c) != InvalidIndex))
+                    tri_mesh.normals[id] = normals[std::get<1>(c)];
+                else
+                    tri_mesh.normals[id] = StVector3f(0.0f, 0.0f, 1.0f);
+            }
+
+            if (has_tex) {
+                if (IG_LIKELY(std::get<2>(c) != InvalidIndex))
+                    tri_mesh.texcoords[id] = texcoords[std::get<2>(c)];
+                else
+                    tri_mesh.texcoords[id] = StVector2f(0.0f, 0.0f);
+            }
+        });
+    }
+
+    // Triangulate
+    tri_mesh.indices.resize(triangle_count * 4);
+    std::atomic<bool> malformed = false;
+    tbb::parallel_for(size_t(0), chunk_count, [&](size_t i) {
+        const size_t face_end = i + 1 < chunk_count ? face_offsets[i + 1] : face_count;
+
+        size_t corner   = corner_offsets[i];
+        uint32* indices = tri_mesh.indices.data() + triangle_offsets[i] * 4;
+        std::vector<Vector3f> polygon;
+        for (size_t f = face_offsets[i]; f < face_end; ++f) {
+            const uint32 n = face_sizes[f];
+            const auto add = [&](uint32 a, uint32 b, uint32 c) {
+                indices[0] = corner_map[corner + a];
+                indices[1] = corner_map[corner + b];
+                indices[2] = corner_map[corner + c];
+                indices[3] = 0;
+                indices += 4;
+            };
+
+            if (n == 3) {
+                add(0, 1, 2);
+            } else if (n == 4) {
+                // Split along the shortest diagonal, as done by the sequential loader
+                const float e02 = (vertices[std::get<0>(corners[corner + 2])] - vertices[std::get<0>(corners[corner + 0])]).squaredNorm();
+                const float e13 = (vertices[std::get<0>(corners[corner + 3])] - vertices[std::get<0>(corners[corner + 1])]).squaredNorm();
+                if (e02 < e13) {
+                    add(0, 1, 2);
+                    add(0, 2, 3);
+                } else {
+                    add(0, 1, 3);
+                    add(1, 2, 3);
+                }
+            } else {
+                polygon.resize(n);
+                for (uint32 k = 0; k < n; ++k)
+                    polygon[k] = vertices[std::get<0>(corners[corner + k])];
+
+                const std::vector<int> inds = Triangulation::triangulate(polygon);
+                if (inds.size() == 3 * (n - 2)) {
+                    for (size_t k = 0; k < inds.size(); k += 3)
+                        add(inds[k], inds[k + 1], inds[k + 2]);
+                } else {
+                    // Could not triangulate, approximate with convex triangulation
+                    malformed = true;
+                    for (uint32 k = 2; k < n; ++k)
+                        add(0, k - 1, k);
+                }
+            }
+
+            corner += n;
+        }
+    });
+
+    if (malformed)
+        IG_LOG(L_WARNING) << "ObjFile " << path << ": Given polygonal face is malformed, approximating with convex triangulation" << std::endl;
+
+    finalize(path, tri_mesh, has_norms, has_tex);
+    return tri_mesh;
+}
+
 TriMesh load(const std::filesystem::path& path, const std::optional<size_t>& shape_index)
+{
+    // Large files are parsed in parallel. Selecting a specific shape is only supported by the sequential loader
+    std::error_code ec;
+    const auto file_size = std::filesystem::file_size(path, ec);
+    if (!shape_index.has_value() && !ec && file_size >= ParallelThreshold) {
+        auto mesh = load_parallel(path);
+        if (mesh.has_value())
+            return std::move(mesh.value());
+        IG_LOG(L_DEBUG) << "ObjFile " << path << ": Contains features not supported by the parallel loader. Falling back to sequential loading" << std::endl;
+    }
+
+    return load_sequential(path, shape_index);
+}
+
+TriMesh load_sequential(const std::filesystem::path& path, const std::optional<size_t>& shape_index)
 {
     tinyobj::attrib_t attrib;
     std::vector<tinyobj::shape_t> shapes;
@@ -182,34 +627,7 @@ TriMesh load(const std::filesystem::path& path, const std::optional<size_t>& sha
             add_shape(shape);
     }
 
-    // Cleanup
-    // TODO: This does not work due to fp precision problems
-    // const size_t removedBadAreas = tri_mesh.removeZeroAreaTriangles();
-    // if (removedBadAreas != 0)
-    //     IG_LOG(L_WARNING) << "ObjFile " << path << ": Removed " << removedBadAreas << " triangles with zero area" << std::endl;
-
-    // Normals
-    bool hasBadAreas = false;
-    tri_mesh.computeFaceNormals(&hasBadAreas);
-    // if (hasBadAreas)
-    //     IG_LOG(L_WARNING) << "ObjFile " << path << ": Triangle mesh contains triangles with zero area" << std::endl;
-
-    if (!has_norms) {
-        IG_LOG(L_INFO) << "ObjFile " << path << ": No valid normals given. Recalculating " << std::endl;
-        tri_mesh.computeVertexNormals();
-    }
-
-    // Texcoords
-    if (!has_tex) {
-        IG_LOG(L_INFO) << "ObjFile " << path << ": No texture coordinates are present, using default value." << std::endl;
-        tri_mesh.makeTexCoordsZero();
-    }
-
-    tri_mesh.vertices.shrink_to_fit();
-    tri_mesh.normals.shrink_to_fit();
-    tri_mesh.texcoords.shrink_to_fit();
-    tri_mesh.indices.shrink_to_fit();
-
+    finalize(path, tri_mesh, has_norms, has_tex);
     return tri_mesh;
 }
 } // namespace IG::obj
@@ -3,5 +3,13 @@
 #include "TriMesh.h"
 
 namespace IG::obj {
+/// Load the given file. Large files are parsed in parallel if possible
 TriMesh load(const std::filesystem::path& path, const std::optional<size_t>& shape_index = {});
-}
+
+/// Load the given file with the sequential loader, which supports all features of the obj format
+TriMesh load_sequential(const std::filesystem::path& path, const std::optional<size_t>& shape_index = {});
+
+/// Load all shapes of the given file by parsing chunks of lines of roughly the given size in parallel.
+/// Returns nothing if the file makes use of features not supported by this function
+std::optional<TriMesh> load_parallel(const std::filesystem::path& path, size_t chunk_size = 16 * 1024 * 1024);
+} // namespace IG::obj
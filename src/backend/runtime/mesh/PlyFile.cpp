@@ -1,11 +1,15 @@
 #include "PlyFile.h"
 #include "Logger.h"
+#include "MappedFile.h"
 #include "Triangulation.h"
 
+#include <atomic>
 #include <climits>
 #include <fstream>
 #include <sstream>
 
+#include <tbb/parallel_for.h>
+
 namespace IG {
 // https://stackoverflow.com/questions/105252/how-do-i-convert-between-big-endian-and-little-endian-values-in-c
 template <typename T>
@@ -81,6 +85,7 @@ struct Header {
     int VertexPropCount   = 0;
     int IndElem           = -1;
     bool SwitchEndianness = false;
+    bool FixedLayout      = true; // Only float vertex properties followed by a single 'uchar int' face list. Allows the memory-mapped fast path
 
     [[nodiscard]] inline bool hasVertices() const { return XElem >= 0 && YElem >= 0 && ZElem >= 0; }
     [[nodiscard]] inline bool hasNormals() const { return NXElem >= 0 && NYElem >= 0 && NZElem >= 0; }
@@ -252,6 +257,164 @@ static TriMesh read(const std::filesystem::path& path, std::istream& stream, con
     return trimesh;
 }
 
+// Memory-mapped fast path for binary little endian files with a fixed layout
+static TriMesh readMapped(const std::filesystem::path& path, size_t offset, const Header& header)
+{
+    MappedFile file(path);
+
+    const size_t vertexSize = header.VertexPropCount * sizeof(float);
+    const size_t vertexEnd  = offset + header.VertexCount * vertexSize;
+    if (vertexEnd > file.size()) {
+        IG_LOG(L_ERROR) << "PlyFile " << path << ": Not enough vertices given" << std::endl;
+        return TriMesh{}; // Failed
+    }
+
+    const uint8* vertexData = file.data() + offset;
+    const uint8* faceData   = file.data() + vertexEnd;
+    const uint8* end        = file.data() + file.size();
+
+    TriMesh trimesh;
+    trimesh.vertices.resize(header.VertexCount);
+    if (header.hasNormals())
+        trimesh.normals.resize(header.VertexCount);
+    if (header.hasUVs())
+        trimesh.texcoords.resize(header.VertexCount);
+
+    if (header.VertexPropCount == 3 && header.XElem == 0 && header.YElem == 1 && header.ZElem == 2) {
+        // Positions only, the block can be copied as is
+        std::memcpy(trimesh.vertices.data(), vertexData, header.VertexCount * vertexSize);
+    } else {
+        tbb::parallel_for(
+            tbb::blocked_range<size_t>(0, header.VertexCount),
+            [&](const tbb::blocked_range<size_t>& range) {
+                for (size_t i = range.begin(); i != range.end(); ++i) {
+                    const uint8* row = vertexData + i * vertexSize;
+                    const auto get   = [&](int elem) {
+                        float val;
+                        std::memcpy(&val, row + elem * sizeof(float), sizeof(float));
+                        return val;
+                    };
+
+                    trimesh.vertices[i] = StVector3f(get(header.XElem), get(header.YElem), get(header.ZElem));
+
+                    if (header.hasNormals()) {
+                        const float nx = get(header.NXElem);
+                        const float ny = get(header.NYElem);
+                        const float nz = get(header.NZElem);
+
+                        float norm = std::sqrt(nx * nx + ny * ny + nz * nz);
+                        if (norm == 0.0f)
+                            norm = 1.0f;
+                        trimesh.normals[i] = StVector3f(nx / norm, ny / norm, nz / norm);
+                    }
+
+                    if (header.hasUVs())
+                        trimesh.texcoords[i] = StVector2f(get(header.UElem), get(header.VElem));
+                }
+            });
+    }
+
+    // Check face block and if all faces share the same number of vertices
+    uint8 uniformCount = faceData < end ? *faceData : 0;
+    bool isUniform     = true;
+    size_t polyCount   = 0;
+    const uint8* it    = faceData;
+    for (int i = 0; i < header.FaceCount; ++i) {
+        if (it >= end) {
+            IG_LOG(L_ERROR) << "PlyFile " << path << ": Not enough indices given" << std::endl;
+            return TriMesh{}; // Failed
+        }
+
+        const uint8 elems = *it;
+        isUniform         = isUniform && elems == uniformCount;
+        polyCount += elems >= 3 ? elems - 2 : 0;
+        it += 1 + elems * sizeof(uint32);
+    }
+
+    if (it > end) {
+        IG_LOG(L_ERROR) << "PlyFile " << path << ": Not enough indices given" << std::endl;
+        return TriMesh{}; // Failed
+    }
+
+    std::atomic<bool> outOfBounds = false;
+    const uint32 vertexCount      = (uint32)header.VertexCount;
+    if (isUniform && (uniformCount == 3 || uniformCount == 4)) {
+        // Triangles or quads only, every face can be handled independently
+        const size_t stride = 1 + uniformCount * sizeof(uint32);
+        trimesh.indices.resize(polyCount * 4);
+
+        tbb::parallel_for(
+            tbb::blocked_range<size_t>(0, header.FaceCount),
+            [&](const tbb::blocked_range<size_t>& range) {
+                for (size_t i = range.begin(); i != range.end(); ++i) {
+                    uint32 inds[4] = { 0, 0, 0, 0 };
+                    std::memcpy(inds, faceData + i * stride + 1, uniformCount * sizeof(uint32));
+
+                    if (inds[0] >= vertexCount || inds[1] >= vertexCount || inds[2] >= vertexCount || inds[3] >= vertexCount)
+                        outOfBounds = true;
+
+                    if (uniformCount == 3) {
+                        uint32* out = &trimesh.indices[i * 4];
+                        out[0]      = inds[0];
+                        out[1]      = inds[1];
+                        out[2]      = inds[2];
+                        out[3]      = 0;
+                    } else {
+                        uint32* out = &trimesh.indices[i * 8];
+                        out[0]      = inds[0];
+                        out[1]      = inds[1];
+                        out[2]      = inds[2];
+                        out[3]      = 0;
+                        out[4]      = inds[0];
+                        out[5]      = inds[2];
+                        out[6]      = inds[3];
+                        out[7]      = 0;
+                    }
+                }
+            });
+    } else {
+        trimesh.indices.reserve(polyCount * 4);
+
+        std::vector<uint32_t> tmp_indices;
+        std::vector<Vector3f> tmp_vertices;
+
+        bool warned = false;
+        it          = faceData;
+        for (int i = 0; i < header.FaceCount && !outOfBounds; ++i) {
+            const uint8 elems = *it;
+            tmp_indices.resize(elems);
+            tmp_vertices.resize(elems);
+
+            std::memcpy(tmp_indices.data(), it + 1, elems * sizeof(uint32));
+            it += 1 + elems * sizeof(uint32);
+
+            for (uint32 elem = 0; elem < elems; ++elem) {
+                if (tmp_indices[elem] >= vertexCount) {
+                    outOfBounds = true;
+                    break;
+                }
+                tmp_vertices[elem] = trimesh.vertices[tmp_indices[elem]];
+            }
+
+            if (outOfBounds)
+                break;
+
+            std::vector<uint32_t> inds = triangulatePly(path, tmp_vertices, tmp_indices, warned);
+
+            for (size_t f = 0; f < inds.size() / 3; ++f) {
+                trimesh.indices.insert(trimesh.indices.end(), { inds[f * 3 + 0], inds[f * 3 + 1], inds[f * 3 + 2], 0 });
+            }
+        }
+    }
+
+    if (outOfBounds) {
+        IG_LOG(L_ERROR) << "PlyFile " << path << ": Face references a vertex out of bounds" << std::endl;
+        return TriMesh{}; // Failed
+    }
+
+    return trimesh;
+}
+
 static inline bool isAllowedVertIndType(const std::string& str)
 {
     return str == "uchar"
@@ -280,6 +443,7 @@ TriMesh load(const std::filesystem::path& path)
     Header header;
 
     int facePropCounter = 0;
+    std::string element;
     for (std::string line; std::getline(stream, line);) {
         std::stringstream sstream(line);
 
@@ -296,10 +460,18 @@ TriMesh load(const std::filesystem::path& path)
                 sstream >> header.VertexCount;
             else if (type == "face")
                 sstream >> header.FaceCount;
+
+            // The fast path expects the vertex element to be followed by the face element only
+            if (!(type == "vertex" && element.empty()) && !(type == "face" && element == "vertex"))
+                header.FixedLayout = false;
+            element = type;
         } else if (action == "property") {
             std::string type;
             sstream >> type;
             if (type == "float") {
+                if (element != "vertex")
+                    header.FixedLayout = false;
+
                 std::string name;
                 sstream >> name;
                 if (name == "x")
@@ -330,6 +502,9 @@ TriMesh load(const std::filesystem::path& path)
 
                 std::string name;
                 sstream >> name;
+                if (element != "face" || facePropCounter > 1 || (countType != "uchar" && countType != "uint8_t") || (indType != "int" && indType != "uint"))
+                    header.FixedLayout = false;
+
                 if (!isAllowedVertIndType(countType)) {
                     IG_LOG(L_WARNING) << "PlyFile " << path << ": Only 'property list uchar int' is supported" << std::endl;
                     continue;
@@ -340,6 +515,7 @@ TriMesh load(const std::filesystem::path& path)
             } else {
                 IG_LOG(L_WARNING) << "PlyFile " << path << ": Only float or list properties allowed. Ignoring..." << std::endl;
                 ++header.VertexPropCount;
+                header.FixedLayout = false;
             }
         } else if (action == "end_header")
             break;
@@ -352,7 +528,22 @@ TriMesh load(const std::filesystem::path& path)
     }
 
     header.SwitchEndianness = (method == "binary_big_endian");
-    TriMesh trimesh         = read(path, stream, header, (method == "ascii"));
+
+    TriMesh trimesh;
+    if (method == "binary_little_endian" && header.FixedLayout) {
+        const size_t offset = (size_t)stream.tellg();
+        stream.close();
+
+        try {
+            trimesh = readMapped(path, offset, header);
+        } catch (const std::exception& e) {
+            IG_LOG(L_ERROR) << "PlyFile " << path << ": " << e.what() << std::endl;
+            return TriMesh{};
+        }
+    } else {
+        trimesh = read(path, stream, header, (method == "ascii"));
+    }
+
     if (trimesh.vertices.empty())
         return trimesh;
 
@@ -42,10 +42,11 @@ std::string RayGenerationShader::setup(LoaderContext& ctx)
 
     stream << begin(ctx) << std::endl
            << std::endl
-           << "  let spi = " << ShaderUtils::inlineSPI(ctx) << ";" << std::endl;
+           << "  let spi = " << ShaderUtils::inlineSPI(ctx) << ";" << std::endl
+           << "  let seed = " << ShaderUtils::inlineSeed() << ";" << std::endl;
 
     if (ctx.IsTracer) {
-        stream << "  let emitter = make_list_emitter(device.load_rays(), iter, init_raypayload);" << std::endl;
+        stream << "  let emitter = make_list_emitter(device.load_rays(), iter + seed, init_raypayload);" << std::endl;
     } else {
         stream << LoaderCamera::generate(ctx) << std::endl; // Will set `camera`
 
@@ -57,7 +58,7 @@ std::string RayGenerationShader::setup(LoaderContext& ctx)
             pixel_sampler = "make_mjitt_pixel_sampler(4, 4)";
         }
 
-        stream << "  let emitter = make_camera_emitter(camera, iter, spi, " << pixel_sampler << ", init_raypayload);" << std::endl;
+        stream << "  let emitter = make_camera_emitter(camera, iter + seed, spi, " << pixel_sampler << ", init_raypayload);" << std::endl;
     }
 
     stream << end();
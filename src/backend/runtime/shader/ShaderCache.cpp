@@ -0,0 +1,120 @@
+#include "ShaderCache.h"
+#include "Hash.h"
+#include "Logger.h"
+#include "config/Build.h"
+
+#include <algorithm>
+
+namespace IG {
+constexpr const char* const CACHE_ENV_PATH_NAME = "IG_CACHE_DIR";
+
+ShaderCache::ShaderCache(const std::filesystem::path& root, size_t maxSize)
+    : mRoot(root)
+    , mMaxSize(maxSize)
+{
+}
+
+std::filesystem::path ShaderCache::acquire(const std::string& key)
+{
+    const std::filesystem::path dir = mRoot / key;
+
+    std::error_code ec;
+    std::filesystem::create_directories(dir, ec);
+    if (ec) {
+        IG_LOG(L_WARNING) << "Could not create shader cache directory " << dir << ": " << ec.message() << std::endl;
+        return {};
+    }
+
+    // Mark entry as recently used
+    std::filesystem::last_write_time(dir, std::filesystem::file_time_type::clock::now(), ec);
+    return dir;
+}
+
+void ShaderCache::evict(const std::unordered_set<std::string>& active_keys)
+{
+    struct Entry {
+        std::filesystem::path Path;
+        std::filesystem::file_time_type LastUsed;
+        size_t Size;
+    };
+
+    std::error_code ec;
+    if (!std::filesystem::is_directory(mRoot, ec))
+        return;
+
+    std::vector<Entry> entries;
+    size_t total_size = 0;
+    for (const auto& dir : std::filesystem::directory_iterator(mRoot, ec)) {
+        if (!dir.is_directory(ec))
+            continue;
+
+        size_t size = 0;
+        for (const auto& file : std::filesystem::recursive_directory_iterator(dir.path(), ec)) {
+            if (file.is_regular_file(ec))
+                size += (size_t)file.file_size(ec);
+        }
+
+        total_size += size;
+        if (active_keys.count(dir.path().filename().generic_u8string()) == 0)
+            entries.push_back(Entry{ dir.path(), dir.last_write_time(ec), size });
+    }
+
+    if (total_size <= mMaxSize)
+        return;
+
+    std::sort(entries.begin(), entries.end(), [](const Entry& a, const Entry& b) { return a.LastUsed < b.LastUsed; });
+
+    for (const auto& entry : entries) {
+        if (total_size <= mMaxSize)
+            break;
+
+        IG_LOG(L_DEBUG) << "Evicting shader cache entry " << entry.Path << std::endl;
+        std::filesystem::remove_all(entry.Path, ec);
+        if (!ec)
+            total_size -= entry.Size;
+    }
+}
+
+std::string ShaderCache::computeKey(const std::vector<std::string>& sources, Target target, size_t device, const std::filesystem::path& driver)
+{
+    Hasher hasher;
+    for (const auto& src : sources)
+        hasher.add(src);
+
+    hasher.add(target);
+    hasher.add(device);
+
+    // Driver build
+    hasher.add(Build::getBuildString());
+    hasher.add(driver.generic_u8string());
+
+    std::error_code ec;
+    const auto driver_size = std::filesystem::file_size(driver, ec);
+    if (!ec)
+        hasher.add((uint64)driver_size);
+    const auto driver_time = std::filesystem::last_write_time(driver, ec);
+    if (!ec)
+        hasher.add((int64)driver_time.time_since_epoch().count());
+
+    return hasher.hex();
+}
+
+std::filesystem::path ShaderCache::defaultDirectory()
+{
+    if (const char* env = std::getenv(CACHE_ENV_PATH_NAME); env != nullptr && env[0] != '\0')
+        return std::filesystem::path(env);
+
+#ifdef IG_OS_WINDOWS
+    if (const char* local = std::getenv("LOCALAPPDATA"); local != nullptr && local[0] != '\0')
+        return std::filesystem::path(local) / "ignis" / "cache";
+#else
+    if (const char* xdg = std::getenv("XDG_CACHE_HOME"); xdg != nullptr && xdg[0] != '\0')
+        return std::filesystem::path(xdg) / "ignis";
+    if (const char* home = std::getenv("HOME"); home != nullptr && home[0] != '\0')
+        return std::filesystem::path(home) / ".cache" / "ignis";
+#endif
+
+    std::error_code ec;
+    return std::filesystem::temp_directory_path(ec) / "ignis_cache";
+}
+} // namespace IG
\ No newline at end of file
@@ -0,0 +1,33 @@
+#pragma once
+
+#include "Target.h"
+
+#include <unordered_set>
+
+namespace IG {
+/// On-disk cache for compiled shader modules.
+/// Every combination of shader sources, target, device and driver build gets its own entry directory inside the cache root.
+/// Entries are evicted in least recently used order if the cache exceeds the given size
+class ShaderCache {
+public:
+    ShaderCache(const std::filesystem::path& root, size_t maxSize);
+
+    /// Returns the directory the entry with the given key is stored in. The directory will be created and marked as used
+    std::filesystem::path acquire(const std::string& key);
+
+    /// Remove least recently used entries until the cache fits into the size limit. Entries with the given keys will not be removed
+    void evict(const std::unordered_set<std::string>& active_keys = {});
+
+    inline const std::filesystem::path& root() const { return mRoot; }
+
+    /// Compose the key for a set of shaders compiled by the given driver
+    static std::string computeKey(const std::vector<std::string>& sources, Target target, size_t device, const std::filesystem::path& driver);
+
+    /// Default cache location of the current user. Can be overridden with the IG_CACHE_DIR environment variable
+    static std::filesystem::path defaultDirectory();
+
+private:
+    std::filesystem::path mRoot;
+    size_t mMaxSize;
+};
+} // namespace IG
\ No newline at end of file
@@ -107,4 +107,10 @@ std::string ShaderUtils::inlineSPI(const LoaderContext& ctx)
     // We do not hardcode the spi as default to prevent recompilations if spi != 1
     return stream.str();
 }
+
+std::string ShaderUtils::inlineSeed()
+{
+    // Offset added to the iteration of all ray emitters. See RuntimeOptions::Seed
+    return "registry::get_parameter_i32(\"__seed\", 0)";
+}
 } // namespace IG
\ No newline at end of file
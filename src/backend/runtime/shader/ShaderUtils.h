@@ -15,5 +15,6 @@ public:
     static std::string endCallback();
 
     static std::string inlineSPI(const LoaderContext& ctx);
+    static std::string inlineSeed();
 };
 } // namespace IG
\ No newline at end of file
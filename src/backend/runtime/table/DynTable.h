@@ -1,6 +1,6 @@
 #pragma once
 
-#include "IG_Config.h"
+#include "serialization/Serializer.h"
 
 namespace IG {
 struct LookupEntry {
@@ -9,7 +9,7 @@ struct LookupEntry {
     uint64 Offset;
 };
 
-class DynTable {
+class DynTable : public ISerializable {
 public:
     DynTable() = default;
 
@@ -29,6 +29,11 @@ public:
     inline const std::vector<LookupEntry>& lookups() const { return mLookups; }
     inline const std::vector<uint8>& data() const { return mData; }
 
+    inline void serialize(Serializer& serializer) override
+    {
+        serializer | mLookups | mData;
+    }
+
 private:
     std::vector<LookupEntry> mLookups;
     std::vector<uint8> mData;
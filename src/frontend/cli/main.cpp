@@ -7,6 +7,12 @@
 #include "Timer.h"
 #include "config/Build.h"
 
+#include <thread>
+
+#ifndef IG_OS_WINDOWS
+#include <sys/wait.h>
+#endif
+
 using namespace IG;
 
 struct SectionTimer {
@@ -48,6 +54,146 @@ static std::string beautiful_time(uint64 ms)
     return stream.str();
 }
 
+// Quote a single argument for the system shell
+static std::string quote_argument(const std::string& arg)
+{
+#ifdef IG_OS_WINDOWS
+    std::string quoted = "\"";
+    for (char c : arg) {
+        if (c == '"')
+            quoted += "\\\"";
+        else
+            quoted += c;
+    }
+    return quoted + "\"";
+#else
+    std::string quoted = "'";
+    for (char c : arg) {
+        if (c == '\'')
+            quoted += "'\\''";
+        else
+            quoted += c;
+    }
+    return quoted + "'";
+#endif
+}
+
+// Check if the given argument is the given option, either followed by its value or in the form 'option=value'
+static bool is_option(const std::string& arg, const std::string& option, bool& has_value)
+{
+    has_value = arg.size() > option.size() && arg.compare(0, option.size(), option) == 0 && arg[option.size()] == '=';
+    return arg == option || has_value;
+}
+
+// Convert the status returned by std::system to the exit code of the process
+static int exit_code(int status)
+{
+#ifdef IG_OS_WINDOWS
+    return status;
+#else
+    if (WIFEXITED(status))
+        return WEXITSTATUS(status);
+    return status != 0 ? EXIT_FAILURE : EXIT_SUCCESS;
+#endif
+}
+
+// Run the same command line in multiple worker processes, each rendering a share of the samples, and merge the results
+static int run_workers(const ProgramOptions& cmd, int argc, char** argv)
+{
+    const size_t count = (size_t)cmd.Workers;
+
+    // Outputs written by every process are handled separately to prevent the workers from writing the same file
+    std::vector<std::string> arguments;
+    for (int j = 0; j < argc; ++j) {
+        const std::string arg = argv[j];
+
+        bool has_value = false;
+        if (is_option(arg, "--save-snapshot", has_value) || is_option(arg, "--timeline", has_value)) {
+            if (!has_value)
+                ++j;
+            continue;
+        }
+
+        arguments.push_back(arg);
+    }
+
+    std::vector<std::filesystem::path> outputs(count);
+    std::vector<std::string> commands(count);
+    for (size_t i = 0; i < count; ++i) {
+        outputs[i] = cmd.Output;
+        outputs[i].replace_extension(".worker" + std::to_string(i) + ".exr");
+
+        std::string prefix = cmd.WorkerPrefix;
+        for (size_t pos = prefix.find("{}"); pos != std::string::npos; pos = prefix.find("{}", pos))
+            prefix.replace(pos, 2, std::to_string(i));
+
+        std::stringstream stream;
+        if (!prefix.empty())
+            stream << prefix << " ";
+        for (const auto& arg : arguments)
+            stream << quote_argument(arg) << " ";
+        stream << "--no-progress --worker-index " << i << " -o " << quote_argument(outputs[i].generic_u8string());
+
+        // The scene is the same for all workers, therefore only the first one saves the snapshot
+        if (i == 0 && !cmd.SnapshotFile.empty())
+            stream << " --save-snapshot " << quote_argument(cmd.SnapshotFile.generic_u8string());
+
+        if (!cmd.TimelineFile.empty()) {
+            std::filesystem::path timeline = cmd.TimelineFile;
+            timeline.replace_extension(".worker" + std::to_string(i) + cmd.TimelineFile.extension().generic_u8string());
+            stream << " --timeline " << quote_argument(timeline.generic_u8string());
+        }
+
+#ifdef IG_OS_WINDOWS
+        // The shell strips the outermost quotes
+        commands[i] = "\"" + stream.str() + "\"";
+#else
+        commands[i] = stream.str();
+#endif
+    }
+
+    SectionTimer timer;
+    timer.start();
+
+    IG_LOG(L_INFO) << "Started rendering with " << count << " workers..." << std::endl;
+    if (!cmd.TimelineFile.empty())
+        IG_LOG(L_INFO) << "Each worker writes its own timeline next to " << cmd.TimelineFile << std::endl;
+
+    std::vector<int> results(count, 0);
+    std::vector<std::thread> threads;
+    threads.reserve(count);
+    for (size_t i = 0; i < count; ++i)
+        threads.emplace_back([&, i]() { results[i] = exit_code(std::system(commands[i].c_str())); });
+    for (auto& thread : threads)
+        thread.join();
+
+    bool success = true;
+    for (size_t i = 0; i < count; ++i) {
+        if (results[i] != 0) {
+            IG_LOG(L_ERROR) << "Worker " << i << " failed with exit code " << results[i] << std::endl;
+            success = false;
+        }
+    }
+
+    if (success) {
+        success = mergeImageOutputs(cmd.Output, outputs);
+        if (!success)
+            IG_LOG(L_ERROR) << "Failed to merge the results of the workers into " << cmd.Output << std::endl;
+        else
+            IG_LOG(L_INFO) << "Result saved to " << cmd.Output << std::endl;
+    }
+
+    for (const auto& output : outputs) {
+        std::error_code ec;
+        std::filesystem::remove(output, ec);
+    }
+
+    timer.stop();
+    IG_LOG(L_INFO) << "Rendering took " << beautiful_time(timer.duration_ms) << std::endl;
+
+    return success ? EXIT_SUCCESS : EXIT_FAILURE;
+}
+
 int main(int argc, char** argv)
 {
     ProgramOptions cmd(argc, argv, ApplicationType::CLI, "Command Line Interface");
@@ -75,6 +221,9 @@ int main(int argc, char** argv)
         return EXIT_FAILURE;
     }
 
+    if (cmd.Workers > 1 && !cmd.WorkerIndex.has_value())
+        return run_workers(cmd, argc, argv);
+
     SectionTimer timer_all;
     SectionTimer timer_loading;
     timer_all.start();
@@ -93,19 +242,42 @@ int main(int argc, char** argv)
         return EXIT_FAILURE;
     }
 
+    if (!cmd.SnapshotFile.empty()) {
+        if (runtime->saveSnapshot(cmd.SnapshotFile))
+            IG_LOG(L_INFO) << "Snapshot saved to " << cmd.SnapshotFile << std::endl;
+    }
+
     timer_loading.stop();
 
+    if (cmd.WorkerIndex.has_value() && runtime->technique() == "restir") {
+        // The temporal reservoirs depend on all previous iterations, which are rendered by other workers
+        IG_LOG(L_ERROR) << "Technique 'restir' can not be split over multiple workers" << std::endl;
+        return EXIT_FAILURE;
+    }
+
     const auto def = runtime->initialCameraOrientation();
     runtime->setParameter("__camera_eye", cmd.EyeVector().value_or(def.Eye));
     runtime->setParameter("__camera_dir", cmd.DirVector().value_or(def.Dir));
     runtime->setParameter("__camera_up", cmd.UpVector().value_or(def.Up));
 
-    const size_t SPI          = runtime->samplesPerIteration();
-    const size_t desired_iter = static_cast<size_t>(std::ceil(cmd.SPP.value_or(0) / (float)SPI));
+    const size_t SPI    = runtime->samplesPerIteration();
+    size_t desired_iter = static_cast<size_t>(std::ceil(cmd.SPP.value_or(0) / (float)SPI));
 
     if (cmd.SPP.has_value() && (cmd.SPP.value() % SPI) != 0)
         IG_LOG(L_WARNING) << "Given spp " << cmd.SPP.value() << " is not a multiple of the spi " << SPI << ". Using spp " << desired_iter * SPI << " instead" << std::endl;
 
+    if (cmd.WorkerIndex.has_value()) {
+        // Render a contiguous block of iterations. The seed continues the random sequence where the previous worker stopped,
+        // such that all workers together render exactly the samples of a single process
+        const size_t index = (size_t)cmd.WorkerIndex.value();
+        const size_t count = (size_t)cmd.Workers;
+        const size_t begin = desired_iter * index / count;
+        const size_t end   = desired_iter * (index + 1) / count;
+
+        runtime->setParameter("__seed", (int)(cmd.Seed + begin));
+        desired_iter = end - begin;
+    }
+
     StatusObserver observer(!cmd.NoColor, 2, desired_iter * SPI /* Approx */);
     observer.begin();
 
@@ -114,7 +286,7 @@ int main(int argc, char** argv)
     std::vector<double> samples_sec;
 
     SectionTimer timer_render;
-    while (true) {
+    while (samples_sec.size() < desired_iter) {
         if (!cmd.NoProgress)
             observer.update(runtime->currentSampleCount());
 
@@ -127,8 +299,6 @@ int main(int argc, char** argv)
         auto elapsed_ms = std::chrono::duration_cast<std::chrono::milliseconds>(std::chrono::high_resolution_clock::now() - ticks).count();
 
         samples_sec.emplace_back(1000.0 * double(SPI * runtime->framebufferWidth() * runtime->framebufferHeight()) / double(elapsed_ms));
-        if (samples_sec.size() == desired_iter)
-            break;
     }
 
     if (!cmd.NoProgress)
@@ -157,6 +327,11 @@ int main(int argc, char** argv)
             << "    Saving>  " << beautiful_time(timer_saving.duration_ms) << std::endl;
     }
 
+    if (!cmd.TimelineFile.empty()) {
+        if (runtime->saveTimeline(cmd.TimelineFile))
+            IG_LOG(L_INFO) << "Timeline saved to " << cmd.TimelineFile << std::endl;
+    }
+
     runtime.reset();
 
     IG_LOG(L_INFO) << "Rendering took " << beautiful_time(timer_all.duration_ms) << std::endl;
@@ -1,6 +1,7 @@
 #include "IO.h"
 #include "Image.h"
 #include "ImageIO.h"
+#include "Logger.h"
 #include "Runtime.h"
 
 IG_BEGIN_IGNORE_WARNINGS
@@ -142,4 +143,76 @@ bool saveImageOutput(const std::filesystem::path& path, const Runtime& runtime,
 
     return ImageIO::save(path, width, height, image_ptrs, image_names, metaData);
 }
+
+bool mergeImageOutputs(const std::filesystem::path& path, const std::vector<std::filesystem::path>& inputs)
+{
+    size_t width  = 0;
+    size_t height = 0;
+    std::vector<std::vector<float>> result;
+    std::vector<std::string> result_names;
+    ImageMetaData result_meta;
+    size_t total_spp = 0;
+
+    for (const auto& input : inputs) {
+        size_t w = 0;
+        size_t h = 0;
+        std::vector<std::vector<float>> layers;
+        std::vector<std::string> layer_names;
+        ImageMetaData meta;
+        try {
+            ImageIO::load(input, w, h, layers, layer_names, &meta);
+        } catch (const ImageLoadException& e) {
+            IG_LOG(L_ERROR) << e.what() << std::endl;
+            return false;
+        }
+
+        const size_t spp = meta.SamplePerPixel.value_or(0);
+        if (spp == 0) // Nothing rendered in this image
+            continue;
+
+        if (result.empty()) {
+            width        = w;
+            height       = h;
+            result_names = layer_names;
+            result_meta  = meta;
+            result.resize(layers.size(), std::vector<float>(width * height, 0.0f));
+        } else if (w != width || h != height || layer_names != result_names) {
+            IG_LOG(L_ERROR) << "Image " << input << " does not match the resolution or the channels of the other images" << std::endl;
+            return false;
+        }
+
+        // Images are normalized already, therefore accumulate the sum of all samples first
+        for (size_t c = 0; c < layers.size(); ++c) {
+            const float* src = layers[c].data();
+            float* dst       = result[c].data();
+            tbb::parallel_for(tbb::blocked_range<size_t>(0, width * height),
+                              [&](tbb::blocked_range<size_t> r) {
+                                  for (size_t i = r.begin(); i < r.end(); ++i)
+                                      dst[i] += src[i] * spp;
+                              });
+        }
+
+        total_spp += spp;
+    }
+
+    if (total_spp == 0) {
+        IG_LOG(L_ERROR) << "No samples available to merge" << std::endl;
+        return false;
+    }
+
+    const float scale = 1.0f / total_spp;
+    std::vector<const float*> image_ptrs(result.size());
+    for (size_t c = 0; c < result.size(); ++c) {
+        float* data = result[c].data();
+        tbb::parallel_for(tbb::blocked_range<size_t>(0, width * height),
+                          [&](tbb::blocked_range<size_t> r) {
+                              for (size_t i = r.begin(); i < r.end(); ++i)
+                                  data[i] *= scale;
+                          });
+        image_ptrs[c] = data;
+    }
+
+    result_meta.SamplePerPixel = total_spp;
+    return ImageIO::save(path, width, height, image_ptrs, result_names, result_meta);
+}
 } // namespace IG
\ No newline at end of file
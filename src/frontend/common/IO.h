@@ -9,4 +9,7 @@ bool saveImageRGBA(const std::filesystem::path& path, const float* rgba, size_t
 struct CameraOrientation;
 class Runtime;
 bool saveImageOutput(const std::filesystem::path& path, const Runtime& runtime, const CameraOrientation* currentOrientation);
+
+/// Merge images written by saveImageOutput with disjoint samples into a single image. All channels are weighted by the sample count of the respective image
+bool mergeImageOutputs(const std::filesystem::path& path, const std::vector<std::filesystem::path>& inputs);
 } // namespace IG
\ No newline at end of file
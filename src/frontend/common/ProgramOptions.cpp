@@ -86,7 +86,7 @@ ProgramOptions::ProgramOptions(int argc, char** argv, ApplicationType type, cons
     app.set_version_flag("--version", Build::getBuildString());
     app.set_help_flag("-h,--help", "Shows help message and exit");
 
-    app.add_option("scene", InputScene, "Scene file to load. Can be a Ignis scene file or a glTF file.")->required()->check(CLI::ExistingFile);
+    app.add_option("scene", InputScene, "Scene file to load. Can be a Ignis scene file, a glTF file or a snapshot with the '.igs' extension.")->required()->check(CLI::ExistingFile);
     app.add_flag("-q,--quiet", Quiet, "Do not print messages into console");
     app.add_flag_callback(
         "-v,--verbose", [&]() { VerbosityLevel = L_DEBUG; }, "Set the verbosity level to 'debug'. Shortcut for --log-level debug");
@@ -125,22 +125,38 @@ ProgramOptions::ProgramOptions(int argc, char** argv, ApplicationType type, cons
     app.add_option("--spi", SPI, "Number of samples per iteration. This is only considered a hint for the underlying technique");
     if (type == ApplicationType::View)
         app.add_option("--spp-mode", SPPMode, "Sets the current spp mode")->transform(MyTransformer(SPPModeMap, CLI::ignore_case))->default_str("fixed");
+    app.add_option("--seed", Seed, "Offset of the random sequence given in iterations. Renderings with distinct seeds contain distinct samples")->default_val(0);
+
+    if (type == ApplicationType::CLI) {
+        app.add_option("--workers", Workers, "Split the samples over the given number of worker processes and merge their results into a single image")->default_val(1)->check(CLI::PositiveNumber);
+        app.add_option("--worker-prefix", WorkerPrefix, "Command prepended to each worker process, e.g., 'numactl --cpunodebind={}'. The string '{}' is replaced by the index of the worker");
+        // Internal option used by the worker processes to select their share of the samples
+        app.add_option("--worker-index", WorkerIndex)->group("");
+    }
 
     app.add_flag("--stats", AcquireStats, "Acquire useful stats alongside rendering. Will be dumped at the end of the rendering session");
     app.add_flag("--stats-full", AcquireFullStats, "Acquire all stats alongside rendering. Will be dumped at the end of the rendering session");
+    app.add_option("--timeline", TimelineFile, "Record all shader launches and write them as a Chrome trace event file at the end of the rendering session");
+
+    app.add_option("--save-snapshot", SnapshotFile, "Write the loaded scene into a snapshot file. Snapshots with the '.igs' extension can be given as scene to skip loading entirely");
 
     app.add_flag("--dump-shader", DumpShader, "Dump produced shaders to files in the current working directory");
     app.add_flag("--dump-shader-full", DumpFullShader, "Dump produced shaders with standard library to files in the current working directory");
 
     app.add_option("--script-dir", ScriptDir, "Override internal script standard library by '.art' files from the given directory");
 
+    app.add_option("--cache-dir", CacheDir, "Set the directory used to cache compiled shaders between runs");
+    app.add_flag("--no-cache", NoCache, "Do not use the shader cache. Every shader will be compiled from scratch");
+
     app.add_flag("--add-env-light", AddExtraEnvLight, "Add additional constant environment light. This is automatically done for glTF scenes without any lights");
 
     if (type == ApplicationType::Trace) {
-        app.add_option("-i,--input", InputRay, "Read list of rays from file instead of the standard input");
-        app.add_option("-o,--output", Output, "Write radiance for each ray into file instead of standard output");
+        app.add_option("-i,--input", InputRay, "Read list of rays from file instead of the standard input. Files with the '.npy' extension are read as NumPy arrays of shape (N, 6) or (N, 8)");
+        app.add_option("-o,--output", Output, "Write radiance for each ray into file instead of standard output. Files with the '.npy' extension are written as NumPy arrays");
+        app.add_flag("--binary", BinaryRays, "Use the binary float32 protocol on standard input and output instead of text");
     } else {
-        app.add_option("-o,--output", Output, "Writes the output image to a file");
+        // The last output is taken, such that worker processes can redirect the output of an otherwise identical command line
+        app.add_option("-o,--output", Output, "Writes the output image to a file")->multi_option_policy(CLI::MultiOptionPolicy::TakeLast);
     }
 
     try {
@@ -160,14 +176,16 @@ void ProgramOptions::populate(RuntimeOptions& options) const
     options.IsTracer      = Type == ApplicationType::Trace;
     options.IsInteractive = Type == ApplicationType::View;
 
-    options.DesiredTarget  = Target;
-    options.RecommendCPU   = AutodetectCPU;
-    options.RecommendGPU   = AutodetectGPU;
-    options.Device         = Device;
-    options.AcquireStats   = AcquireStats || AcquireFullStats;
-    options.DumpShader     = DumpShader;
-    options.DumpShaderFull = DumpFullShader;
-    options.SPI            = SPI.value_or(0);
+    options.DesiredTarget   = Target;
+    options.RecommendCPU    = AutodetectCPU;
+    options.RecommendGPU    = AutodetectGPU;
+    options.Device          = Device;
+    options.AcquireStats    = AcquireStats || AcquireFullStats;
+    options.AcquireTimeline = !TimelineFile.empty();
+    options.DumpShader      = DumpShader;
+    options.DumpShaderFull  = DumpFullShader;
+    options.SPI             = SPI.value_or(0);
+    options.Seed            = Seed;
 
     options.OverrideTechnique = TechniqueType;
     options.OverrideCamera    = CameraType;
@@ -177,6 +195,9 @@ void ProgramOptions::populate(RuntimeOptions& options) const
     options.AddExtraEnvLight = AddExtraEnvLight;
 
     options.ScriptDir = ScriptDir;
+
+    options.EnableCache = !NoCache;
+    options.CacheDir    = CacheDir;
 }
 
 } // namespace IG
\ No newline at end of file
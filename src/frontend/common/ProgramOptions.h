@@ -56,9 +56,16 @@ public:
     std::optional<int> SPP;
     std::optional<int> SPI;
     IG::SPPMode SPPMode = SPPMode::Fixed;
+    uint32 Seed         = 0;
+
+    int Workers = 1;
+    std::optional<int> WorkerIndex;
+    std::string WorkerPrefix;
 
     bool AcquireStats     = false;
     bool AcquireFullStats = false;
+    std::filesystem::path TimelineFile;
+    std::filesystem::path SnapshotFile;
 
     bool DumpShader     = false;
     bool DumpFullShader = false;
@@ -68,9 +75,13 @@ public:
     std::filesystem::path Output;
     std::filesystem::path InputScene;
     std::filesystem::path InputRay;
+    bool BinaryRays = false;
 
     std::filesystem::path ScriptDir;
 
+    bool NoCache = false;
+    std::filesystem::path CacheDir;
+
     void populate(RuntimeOptions& options) const;
 };
 } // namespace IG
\ No newline at end of file
@@ -3,6 +3,7 @@
 #include <pybind11/pybind11.h>
 #include <pybind11/stl.h>
 
+#include "ImageIO.h"
 #include "Runtime.h"
 
 #define STRINGIFY(x) #x
@@ -17,18 +18,398 @@ static void flush_io()
     std::cerr.flush();
 }
 
+using RayArray = py::array_t<float, py::array::c_style | py::array::forcecast>;
+
+// Convert a (N, 6) or (N, 8) array of rays without creating intermediate python objects
+static std::vector<Ray> convert_ray_array(const RayArray& array)
+{
+    if (array.ndim() != 2 || (array.shape(1) != 6 && array.shape(1) != 8))
+        throw py::value_error("Expected ray array of shape (N, 6) or (N, 8)");
+
+    const size_t count      = (size_t)array.shape(0);
+    const size_t components = (size_t)array.shape(1);
+    const float* data       = array.data();
+
+    std::vector<Ray> rays;
+    rays.reserve(count);
+    for (size_t i = 0; i < count; ++i) {
+        const float* ptr = data + i * components;
+
+        Ray ray;
+        ray.Origin    = Vector3f(ptr[0], ptr[1], ptr[2]);
+        ray.Direction = Vector3f(ptr[3], ptr[4], ptr[5]);
+        ray.Range     = components == 8 ? Vector2f(ptr[6], ptr[7]) : Vector2f(0, 0);
+
+        if (ray.Range(1) <= ray.Range(0))
+            ray.Range(1) = std::numeric_limits<float>::max();
+
+        rays.push_back(ray);
+    }
+
+    return rays;
+}
+
+// Set parameter in the registry matching the python type. The implicit conversions of overloads would put numpy floats into the int registry or ints into the float registry
+static void set_parameter(Runtime& r, const std::string& name, const py::object& value)
+{
+    py::object v = value;
+    if (py::isinstance<py::array>(v) && py::reinterpret_borrow<py::array>(v).ndim() == 0)
+        v = v.attr("item")(); // Unpack zero dimensional arrays
+
+    if (!py::isinstance<py::str>(v) && py::hasattr(v, "__len__")) {
+        const size_t size = py::len(v);
+        if (size == 3) {
+            r.setParameter(name, v.cast<Vector3f>());
+            return;
+        } else if (size == 4) {
+            r.setParameter(name, v.cast<Vector4f>());
+            return;
+        }
+    } else if (PyIndex_Check(v.ptr())) {
+        r.setParameter(name, v.cast<int>()); // int, bool and numpy integers
+        return;
+    } else if (py::hasattr(v, "__float__")) {
+        r.setParameter(name, v.cast<float>()); // float and numpy floats
+        return;
+    }
+
+    throw py::type_error("Expected parameter '" + name + "' to be an int, a float or a vector with three or four entries");
+}
+
+// Lookup parameter in all registries. Returns None if not available
+static py::object get_parameter(const Runtime& r, const std::string& name)
+{
+    const auto& params = r.parameters();
+    if (params.IntParameters.count(name) > 0)
+        return py::cast(params.IntParameters.at(name));
+    if (params.FloatParameters.count(name) > 0)
+        return py::cast(params.FloatParameters.at(name));
+    if (params.VectorParameters.count(name) > 0)
+        return py::cast(params.VectorParameters.at(name));
+    if (params.ColorParameters.count(name) > 0)
+        return py::cast(params.ColorParameters.at(name));
+    return py::none();
+}
+
+// Convert gathered statistics to a dict of numpy arrays per shader type. Returns None if statistics are not acquired
+static py::object get_statistics(const Runtime& r)
+{
+    const Statistics* stats = r.getStatistics();
+    if (!stats)
+        return py::none();
+
+    std::map<ShaderType, std::vector<Statistics::ShaderEntry>> types;
+    for (const auto& entry : stats->entries())
+        types[entry.Type].push_back(entry);
+
+    py::dict shaders;
+    for (const auto& pair : types) {
+        const size_t count = pair.second.size();
+
+        py::array_t<uint64> ids(count);
+        py::array_t<uint64> launches(count);
+        py::array_t<uint64> workloads(count);
+        py::array_t<uint64> min_workloads(count);
+        py::array_t<uint64> max_workloads(count);
+        py::array_t<uint64> elapsed(count);
+
+        auto ids_view           = ids.mutable_unchecked<1>();
+        auto launches_view      = launches.mutable_unchecked<1>();
+        auto workloads_view     = workloads.mutable_unchecked<1>();
+        auto min_workloads_view = min_workloads.mutable_unchecked<1>();
+        auto max_workloads_view = max_workloads.mutable_unchecked<1>();
+        auto elapsed_view       = elapsed.mutable_unchecked<1>();
+        for (size_t i = 0; i < count; ++i) {
+            const auto* shader    = pair.second[i].Stats;
+            ids_view(i)           = pair.second[i].ID;
+            launches_view(i)      = shader->count;
+            workloads_view(i)     = shader->workload;
+            min_workloads_view(i) = shader->min_workload;
+            max_workloads_view(i) = shader->max_workload;
+            elapsed_view(i)       = shader->elapsedMS;
+        }
+
+        py::dict entry;
+        entry["id"]                                       = ids;
+        entry["count"]                                    = launches;
+        entry["workload"]                                 = workloads;
+        entry["min_workload"]                             = min_workloads;
+        entry["max_workload"]                             = max_workloads;
+        entry["elapsed_ms"]                               = elapsed;
+        shaders[Statistics::shaderTypeString(pair.first)] = entry;
+    }
+
+    py::dict quantities;
+    for (size_t i = 0; i < (size_t)Quantity::_COUNT; ++i)
+        quantities[Statistics::quantityString((Quantity)i)] = stats->quantity((Quantity)i);
+
+    py::dict result;
+    result["shaders"]    = shaders;
+    result["quantities"] = quantities;
+    result["iterations"] = r.currentIterationCount();
+    result["samples"]    = r.currentSampleCount();
+    return result;
+}
+
+// Tonemap the given aov on the device and return a (H, W, 4) RGBA8 array
+static py::array_t<uint8> tonemap(Runtime& r, size_t aov, size_t method, bool use_gamma, float exposure_factor, float exposure_offset)
+{
+    const size_t width  = r.framebufferWidth();
+    const size_t height = r.framebufferHeight();
+    const size_t iter   = r.currentIterationCount();
+
+    py::array_t<uint8> image({ height, width, (size_t)4 });
+    uint8* data = image.mutable_data();
+
+    {
+        py::gil_scoped_release release;
+        r.tonemap(reinterpret_cast<uint32*>(data), TonemapSettings{ aov, method, use_gamma, iter == 0 ? 0.0f : 1.0f / iter, exposure_factor, exposure_offset });
+
+        // The device produces packed ARGB values, unpack them in place to RGBA bytes
+        for (size_t i = 0; i < width * height; ++i) {
+            uint32 packed;
+            std::memcpy(&packed, data + 4 * i, sizeof(packed));
+            data[4 * i + 0] = (uint8)((packed >> 16) & 0xFF);
+            data[4 * i + 1] = (uint8)((packed >> 8) & 0xFF);
+            data[4 * i + 2] = (uint8)(packed & 0xFF);
+            data[4 * i + 3] = (uint8)((packed >> 24) & 0xFF);
+        }
+    }
+
+    return image;
+}
+
+// Compute luminance statistics of the given aov on the device
+static py::dict imageinfo(Runtime& r, size_t aov, size_t bins)
+{
+    const size_t iter = r.currentIterationCount();
+
+    py::array_t<int> histogram(bins);
+    std::fill_n(histogram.mutable_data(), bins, 0);
+
+    ImageInfoOutput output{};
+    {
+        py::gil_scoped_release release;
+        r.imageinfo(ImageInfoSettings{ aov, histogram.mutable_data(), bins, iter == 0 ? 0.0f : 1.0f / iter }, output);
+    }
+
+    py::dict result;
+    result["min"]       = output.Min;
+    result["max"]       = output.Max;
+    result["average"]   = output.Average;
+    result["soft_min"]  = output.SoftMin;
+    result["soft_max"]  = output.SoftMax;
+    result["median"]    = output.Median;
+    result["histogram"] = histogram;
+    return result;
+}
+
+// Names of all framebuffers in the same order as used by getFramebuffer. The first entry is the actual image
+static std::vector<std::string> framebuffer_names(const Runtime& r)
+{
+    std::vector<std::string> names;
+    names.reserve(r.aovs().size() + 1);
+    names.emplace_back("Default");
+    names.insert(names.end(), r.aovs().begin(), r.aovs().end());
+    return names;
+}
+
+// Return all framebuffers by name. Without normalization the arrays are views into the framebuffers and only valid until the next call modifying them.
+// With normalization the framebuffers are copied and divided by the iteration count.
+// If stacked is true a single (A, H, W, 3) array is returned instead. As the framebuffers are separate allocations, the stacked array is always a copy
+static py::object framebuffers(const py::object& self, bool normalized, bool stacked)
+{
+    const auto& r       = self.cast<const Runtime&>();
+    const size_t width  = r.framebufferWidth();
+    const size_t height = r.framebufferHeight();
+    const size_t iter   = r.currentIterationCount();
+    const size_t size   = width * height * 3;
+    const auto names    = framebuffer_names(r);
+
+    const float scale = !normalized ? 1.0f : (iter == 0 ? 0.0f : 1.0f / iter);
+
+    const auto copy = [&](size_t aov, float* dst) {
+        const float* src = r.getFramebuffer(aov);
+        for (size_t i = 0; i < size; ++i)
+            dst[i] = src[i] * scale;
+    };
+
+    if (stacked) {
+        py::array_t<float> array({ names.size(), height, width, (size_t)3 });
+        float* data = array.mutable_data();
+        {
+            py::gil_scoped_release release;
+            for (size_t aov = 0; aov < names.size(); ++aov)
+                copy(aov, data + aov * size);
+        }
+        return array;
+    }
+
+    py::dict result;
+    for (size_t aov = 0; aov < names.size(); ++aov) {
+        if (normalized) {
+            py::array_t<float> array({ height, width, (size_t)3 });
+            float* data = array.mutable_data();
+            {
+                py::gil_scoped_release release;
+                copy(aov, data);
+            }
+            result[py::str(names[aov])] = array;
+        } else {
+            result[py::str(names[aov])] = py::array_t<float>(
+                std::vector<size_t>{ height, width, 3ul },                                          // shape (rows, cols, channels)
+                std::vector<size_t>{ sizeof(float) * width * 3, sizeof(float) * 3, sizeof(float) }, // strides in bytes
+                r.getFramebuffer(aov),                                                              // buffer pointer
+                self);                                                                              // keep runtime referenced
+        }
+    }
+    return result;
+}
+
+using ImageArray = py::array_t<float, py::array::c_style | py::array::forcecast>;
+
+// Save a dict of (H, W, 3) arrays as layers of a single EXR file. The first entry is stored as the main image, similar to the frontends
+static bool save_exr(const std::string& path, const py::dict& images, size_t spp)
+{
+    if (images.empty())
+        throw py::value_error("Expected at least one image");
+
+    size_t width  = 0;
+    size_t height = 0;
+    std::vector<ImageArray> arrays;
+    std::vector<std::string> names;
+    for (const auto& pair : images) {
+        auto array = pair.second.cast<ImageArray>();
+        if (array.ndim() != 3 || array.shape(2) != 3)
+            throw py::value_error("Expected images of shape (H, W, 3)");
+
+        if (arrays.empty()) {
+            height = (size_t)array.shape(0);
+            width  = (size_t)array.shape(1);
+        } else if ((size_t)array.shape(0) != height || (size_t)array.shape(1) != width) {
+            throw py::value_error("Expected all images to have the same size");
+        }
+
+        names.emplace_back(pair.first.cast<std::string>());
+        arrays.emplace_back(std::move(array));
+    }
+
+    // Split interleaved RGB into separate channels, swizzled to BGR as some viewers expect it per default
+    const size_t pixels = width * height;
+    std::vector<float> channels(pixels * 3 * arrays.size());
+    std::vector<const float*> channel_ptrs(3 * arrays.size());
+    std::vector<std::string> channel_names(3 * arrays.size());
+    for (size_t k = 0; k < arrays.size(); ++k) {
+        const float* src = arrays[k].data();
+        for (size_t c = 0; c < 3; ++c) {
+            float* dst = &channels[pixels * (3 * k + c)];
+            for (size_t i = 0; i < pixels; ++i)
+                dst[i] = src[3 * i + (2 - c)];
+            channel_ptrs[3 * k + c] = dst;
+        }
+
+        const std::string prefix = arrays.size() == 1 ? std::string() : ((k == 0 ? std::string("Default") : names[k]) + ".");
+        channel_names[3 * k + 0] = prefix + "B";
+        channel_names[3 * k + 1] = prefix + "G";
+        channel_names[3 * k + 2] = prefix + "R";
+    }
+
+    ImageMetaData metaData;
+    if (spp > 0)
+        metaData.SamplePerPixel = spp;
+
+    py::gil_scoped_release release;
+    return ImageIO::save(path, width, height, channel_ptrs, channel_names, metaData);
+}
+
+using VertexArray = py::array_t<float, py::array::c_style | py::array::forcecast>;
+using IndexArray  = py::array_t<uint32, py::array::c_style | py::array::forcecast>;
+
+// Convert a tuple (vertices, indices, normals, uvs) to a triangle mesh. Normals and uvs are optional and might be None
+static std::shared_ptr<TriMesh> convert_mesh(const std::string& name, const py::tuple& tuple)
+{
+    if (tuple.size() < 2 || tuple.size() > 4)
+        throw py::value_error("Mesh '" + name + "': Expected tuple (vertices, indices, normals, uvs)");
+
+    const auto vertices = tuple[0].cast<VertexArray>();
+    const auto indices  = tuple[1].cast<IndexArray>();
+    if (vertices.ndim() != 2 || vertices.shape(1) != 3)
+        throw py::value_error("Mesh '" + name + "': Expected vertices of shape (N, 3)");
+    if (indices.ndim() != 2 || indices.shape(1) != 3)
+        throw py::value_error("Mesh '" + name + "': Expected indices of shape (M, 3)");
+
+    const size_t vertex_count = (size_t)vertices.shape(0);
+    const size_t face_count   = (size_t)indices.shape(0);
+
+    auto mesh = std::make_shared<TriMesh>();
+    mesh->vertices.resize(vertex_count);
+    std::memcpy(mesh->vertices.data(), vertices.data(), sizeof(float) * 3 * vertex_count);
+
+    const uint32* index_data = indices.data();
+    mesh->indices.resize(face_count * 4);
+    for (size_t f = 0; f < face_count; ++f) {
+        for (size_t k = 0; k < 3; ++k) {
+            const uint32 ind = index_data[f * 3 + k];
+            if (ind >= vertex_count)
+                throw py::value_error("Mesh '" + name + "': Index " + std::to_string(ind) + " is out of bounds");
+            mesh->indices[f * 4 + k] = ind;
+        }
+        mesh->indices[f * 4 + 3] = 0;
+    }
+
+    if (tuple.size() > 2 && !tuple[2].is_none()) {
+        const auto normals = tuple[2].cast<VertexArray>();
+        if (normals.ndim() != 2 || normals.shape(1) != 3 || (size_t)normals.shape(0) != vertex_count)
+            throw py::value_error("Mesh '" + name + "': Expected normals of shape (N, 3)");
+        mesh->normals.resize(vertex_count);
+        std::memcpy(mesh->normals.data(), normals.data(), sizeof(float) * 3 * vertex_count);
+    }
+
+    if (tuple.size() > 3 && !tuple[3].is_none()) {
+        const auto uvs = tuple[3].cast<VertexArray>();
+        if (uvs.ndim() != 2 || uvs.shape(1) != 2 || (size_t)uvs.shape(0) != vertex_count)
+            throw py::value_error("Mesh '" + name + "': Expected uvs of shape (N, 2)");
+        mesh->texcoords.resize(vertex_count);
+        std::memcpy(mesh->texcoords.data(), uvs.data(), sizeof(float) * 2 * vertex_count);
+    }
+
+    // Same post-processing as done for mesh files
+    mesh->computeFaceNormals();
+    if (mesh->normals.empty())
+        mesh->computeVertexNormals();
+    else
+        mesh->fixNormals();
+
+    if (mesh->texcoords.empty())
+        mesh->makeTexCoordsZero();
+
+    return mesh;
+}
+
+static MeshBufferMap convert_meshes(const py::dict& meshes)
+{
+    MeshBufferMap map;
+    for (const auto& pair : meshes) {
+        const auto name = pair.first.cast<std::string>();
+        map[name]       = convert_mesh(name, pair.second.cast<py::tuple>());
+    }
+    return map;
+}
+
 class RuntimeWrap {
     std::unique_ptr<Runtime> mInstance;
 
     RuntimeOptions mOptions;
     std::string mSource;
     std::string mPath;
+    MeshBufferMap mMeshes;
 
 public:
-    RuntimeWrap(const RuntimeOptions& opts, const std::string& source, const std::string& path)
+    RuntimeWrap(const RuntimeOptions& opts, const std::string& source, const std::string& path, MeshBufferMap&& meshes = {})
         : mOptions(opts)
         , mSource(source)
         , mPath(path)
+        , mMeshes(std::move(meshes))
     {
         IG_ASSERT(source.empty() ^ path.empty(), "Only source or a path is allowed");
     }
@@ -41,7 +422,7 @@ public:
             if (!mInstance->loadFromFile(mPath))
                 return nullptr;
         } else {
-            if (!mInstance->loadFromString(mSource))
+            if (!mInstance->loadFromString(mSource, mMeshes))
                 return nullptr;
         }
 
@@ -79,11 +460,18 @@ PYBIND11_MODULE(pyignis, m)
         .def_readwrite("DumpShader", &RuntimeOptions::DumpShader)
         .def_readwrite("DumpShaderFull", &RuntimeOptions::DumpShaderFull)
         .def_readwrite("AcquireStats", &RuntimeOptions::AcquireStats)
+        .def_readwrite("AcquireTimeline", &RuntimeOptions::AcquireTimeline)
         .def_readwrite("Device", &RuntimeOptions::Device)
+        .def_readwrite("SPI", &RuntimeOptions::SPI)
+        .def_readwrite("Seed", &RuntimeOptions::Seed)
         .def_readwrite("OverrideCamera", &RuntimeOptions::OverrideCamera)
         .def_readwrite("OverrideTechnique", &RuntimeOptions::OverrideTechnique)
+        .def_readwrite("EnableCache", &RuntimeOptions::EnableCache)
+        .def_readwrite("CacheMaxSize", &RuntimeOptions::CacheMaxSize)
         .def_property(
-            "ModulePath", [](const RuntimeOptions& opts) { return opts.ModulePath.generic_u8string(); }, [](RuntimeOptions& opts, const std::string& val) { opts.ModulePath = val; });
+            "ModulePath", [](const RuntimeOptions& opts) { return opts.ModulePath.generic_u8string(); }, [](RuntimeOptions& opts, const std::string& val) { opts.ModulePath = val; })
+        .def_property(
+            "CacheDir", [](const RuntimeOptions& opts) { return opts.CacheDir.generic_u8string(); }, [](RuntimeOptions& opts, const std::string& val) { opts.CacheDir = val; });
 
     py::class_<RuntimeRenderSettings>(m, "RuntimeRenderSettings")
         .def(py::init([]() { return RuntimeRenderSettings(); }))
@@ -109,11 +497,28 @@ PYBIND11_MODULE(pyignis, m)
         .value("AMDGPU", Target::AMDGPU);
 
     py::class_<Runtime>(m, "Runtime")
-        .def("step", &Runtime::step)
-        .def("trace", [](Runtime& r, const std::vector<Ray>& rays) {
-            std::vector<float> data;
-            r.trace(rays, data);
-            return data;
+        .def("step", &Runtime::step, py::call_guard<py::gil_scoped_release>())
+        .def(
+            "trace", [](Runtime& r, const std::vector<Ray>& rays) {
+                std::vector<float> data;
+                r.trace(rays, data);
+                return data;
+            },
+            py::call_guard<py::gil_scoped_release>())
+        .def("trace_array", [](const py::object& self, const RayArray& array) {
+            auto& r         = self.cast<Runtime&>();
+            const auto rays = convert_ray_array(array);
+            {
+                py::gil_scoped_release release;
+                r.trace(rays);
+            }
+
+            // The returned array is a view into the framebuffer and only valid until the next call modifying it
+            return py::array_t<float>(
+                std::vector<size_t>{ rays.size(), 3ul },                 // shape (rays, channels)
+                std::vector<size_t>{ sizeof(float) * 3, sizeof(float) }, // strides in bytes
+                r.getFramebuffer(0),                                     // buffer pointer
+                self);                                                   // keep runtime referenced
         })
         .def("reset", &Runtime::reset)
         .def("getFramebuffer", [](const Runtime& r, uint32 aov) {
@@ -125,10 +530,21 @@ PYBIND11_MODULE(pyignis, m)
                 std::vector<size_t>{ sizeof(float) * width * 3, sizeof(float) * 3, sizeof(float) } // strides in bytes
             );
         })
+        .def("framebuffers", &framebuffers, py::arg("normalized") = false, py::arg("stacked") = false)
+        .def_property_readonly("aovs", &Runtime::aovs)
+        .def("setParameter", &set_parameter)
+        .def("getParameter", &get_parameter)
+        .def("getStatistics", &get_statistics)
+        .def("saveTimeline", [](const Runtime& r, const std::string& path) { return r.saveTimeline(path); })
+        .def("saveSnapshot", [](const Runtime& r, const std::string& path) { return r.saveSnapshot(path); })
+        .def("tonemap", &tonemap, py::arg("aov") = 0, py::arg("method") = 0, py::arg("use_gamma") = true, py::arg("exposure_factor") = 1.0f, py::arg("exposure_offset") = 0.0f)
+        .def("imageinfo", &imageinfo, py::arg("aov") = 0, py::arg("bins") = 100)
         .def("clearFramebuffer", py::overload_cast<>(&Runtime::clearFramebuffer))
         .def("clearFramebuffer", py::overload_cast<size_t>(&Runtime::clearFramebuffer))
         .def_property_readonly("iterationCount", &Runtime::currentIterationCount)
         .def_property_readonly("sampleCount", &Runtime::currentSampleCount)
+        .def_property_readonly("samplesPerIteration", &Runtime::samplesPerIteration)
+        .def_property_readonly("technique", &Runtime::technique)
         .def_property_readonly("framebufferWidth", &Runtime::framebufferWidth)
         .def_property_readonly("framebufferHeight", &Runtime::framebufferHeight);
 
@@ -136,8 +552,17 @@ PYBIND11_MODULE(pyignis, m)
         .def("__enter__", &RuntimeWrap::enter, py::return_value_policy::reference)
         .def("__exit__", &RuntimeWrap::exit);
 
+    m.def("saveExr", &save_exr, py::arg("path"), py::arg("images"), py::arg("spp") = 0);
+
     m.def("loadFromFile", [](const std::string& path) { return std::make_unique<RuntimeWrap>(RuntimeOptions(), std::string{}, path); });
     m.def("loadFromFile", [](const std::string& path, const RuntimeOptions& opts) { return std::make_unique<RuntimeWrap>(opts, std::string{}, path); });
     m.def("loadFromString", [](const std::string& str) { return std::make_unique<RuntimeWrap>(RuntimeOptions(), str, std::string{}); });
     m.def("loadFromString", [](const std::string& str, const RuntimeOptions& opts) { return std::make_unique<RuntimeWrap>(opts, str, std::string{}); });
+    m.def(
+        "loadFromDict", [](const py::dict& scene, const py::dict& meshes, const RuntimeOptions& opts) {
+            // The scene description is small compared to the mesh data, which is passed directly
+            const auto str = py::module_::import("json").attr("dumps")(scene).cast<std::string>();
+            return std::make_unique<RuntimeWrap>(opts, str, std::string{}, convert_meshes(meshes));
+        },
+        py::arg("scene"), py::arg("meshes") = py::dict(), py::arg("opts") = RuntimeOptions());
 }
\ No newline at end of file
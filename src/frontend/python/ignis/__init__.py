@@ -1 +1,106 @@
+import asyncio
+import math
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import numpy as np
+
 from .pyignis import *
+from .pyignis import Runtime, RuntimeOptions, loadFromFile, saveExr
+
+# The driver only supports a single active runtime, therefore all asynchronous work is serialized on one worker
+_worker = None
+
+
+def _get_worker():
+    global _worker
+    if _worker is None:
+        _worker = ThreadPoolExecutor(max_workers=1, thread_name_prefix="ignis-worker")
+    return _worker
+
+
+async def _step_async(self):
+    """Awaitable variant of step(). The iteration is rendered on the ignis worker thread without holding the GIL"""
+    loop = asyncio.get_running_loop()
+    await loop.run_in_executor(_get_worker(), self.step)
+
+
+async def _trace_async(self, rays):
+    """Awaitable variant of trace_array(). The rays are traced on the ignis worker thread without holding the GIL"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_get_worker(), self.trace_array, rays)
+
+
+def _sweep(self, name, values, iterations, aov=0):
+    """Render the given number of iterations for each value of the registered parameter.
+    Yields the value together with a copy of the framebuffer normalized by the iteration count.
+    No reload or recompilation of the scene is necessary, as long as the scene accesses the parameter via param(name, default)"""
+    for value in values:
+        self.setParameter(name, value)
+        self.reset()
+        for _ in range(iterations):
+            self.step()
+        yield value, np.array(self.getFramebuffer(aov)) / max(1, self.iterationCount)
+
+
+Runtime.sweep = _sweep
+Runtime.step_async = _step_async
+Runtime.trace_async = _trace_async
+
+
+def _render_share(path, spp, index, count, options):
+    """Render a contiguous block of the iterations necessary for the given spp in a worker process.
+    Returns the iteration and sample count together with the unnormalized framebuffers"""
+    opts = RuntimeOptions()
+    for key, value in options.items():
+        setattr(opts, key, value)
+
+    with loadFromFile(path, opts) as runtime:
+        if runtime is None:
+            raise RuntimeError(f"Could not load {path}")
+
+        if runtime.technique == "restir":
+            # The temporal reservoirs depend on all previous iterations, which are rendered by other workers
+            raise RuntimeError("Technique 'restir' can not be split over multiple workers")
+
+        iterations = math.ceil(spp / runtime.samplesPerIteration)
+        begin = iterations * index // count
+        end = iterations * (index + 1) // count
+
+        # Continue the random sequence where the previous worker stopped
+        runtime.setParameter("__seed", opts.Seed + begin)
+        for _ in range(end - begin):
+            runtime.step()
+
+        framebuffers = {name: np.array(fb) for name, fb in runtime.framebuffers().items()}
+        return runtime.iterationCount, runtime.sampleCount, framebuffers
+
+
+def render_split(path, spp, workers, output=None, **options):
+    """Render the scene file with the given spp split over multiple worker processes, each with its own runtime.
+    All workers together render exactly the samples of a single runtime, therefore the result is deterministic.
+    This does not hold for the restir technique, as its temporal resampling depends on all previous iterations. A RuntimeError is raised for it.
+    The keyword arguments are set as attributes of the RuntimeOptions used by each worker.
+    Returns a dict with all framebuffers normalized by the total iteration count. If output is given, the result is also written as EXR file"""
+    ctx = multiprocessing.get_context("spawn")  # Fork would share the driver state of the parent
+    with ProcessPoolExecutor(max_workers=workers, mp_context=ctx) as executor:
+        futures = [executor.submit(_render_share, path, spp, i, workers, options) for i in range(workers)]
+        results = [future.result() for future in futures]
+
+    iterations = sum(r[0] for r in results)
+    samples = sum(r[1] for r in results)
+
+    images = {}
+    for _, _, framebuffers in results:
+        for name, fb in framebuffers.items():
+            if name in images:
+                images[name] += fb
+            else:
+                images[name] = fb
+
+    for name in images:
+        images[name] /= max(1, iterations)
+
+    if output is not None:
+        saveExr(output, images, samples)
+    return images
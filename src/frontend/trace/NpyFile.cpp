@@ -0,0 +1,148 @@
+#include "NpyFile.h"
+#include "Logger.h"
+
+#include <algorithm>
+#include <cstring>
+#include <fstream>
+#include <regex>
+#include <sstream>
+
+namespace IG {
+namespace npy {
+static const char MAGIC[]   = "\x93NUMPY";
+constexpr size_t MAGIC_SIZE = 6;
+
+static bool parseShape(const std::string& shape, size_t& rows, size_t& cols)
+{
+    std::vector<size_t> dims;
+    std::stringstream stream(shape);
+    std::string item;
+    while (std::getline(stream, item, ',')) {
+        item.erase(std::remove_if(item.begin(), item.end(), [](char c) { return std::isspace(c) || c == 'L'; }), item.end());
+        if (item.empty())
+            continue;
+        try {
+            dims.push_back(std::stoull(item));
+        } catch (...) {
+            return false;
+        }
+    }
+
+    if (dims.empty() || dims.size() > 2)
+        return false;
+
+    rows = dims[0];
+    cols = dims.size() > 1 ? dims[1] : 1;
+    return true;
+}
+
+bool load(const std::filesystem::path& path, std::vector<float>& data, size_t& rows, size_t& cols)
+{
+    std::ifstream stream(path, std::ios::binary);
+    if (!stream) {
+        IG_LOG(L_ERROR) << "Could not open " << path << std::endl;
+        return false;
+    }
+
+    char magic[MAGIC_SIZE];
+    uint8 version[2];
+    stream.read(magic, MAGIC_SIZE);
+    stream.read(reinterpret_cast<char*>(version), 2);
+    if (!stream || std::memcmp(magic, MAGIC, MAGIC_SIZE) != 0) {
+        IG_LOG(L_ERROR) << path << " is not a valid npy file" << std::endl;
+        return false;
+    }
+
+    size_t header_size = 0;
+    if (version[0] == 1) {
+        uint8 len[2];
+        stream.read(reinterpret_cast<char*>(len), 2);
+        header_size = (size_t)len[0] | ((size_t)len[1] << 8);
+    } else {
+        uint8 len[4];
+        stream.read(reinterpret_cast<char*>(len), 4);
+        header_size = (size_t)len[0] | ((size_t)len[1] << 8) | ((size_t)len[2] << 16) | ((size_t)len[3] << 24);
+    }
+
+    std::string header(header_size, '\0');
+    stream.read(header.data(), header_size);
+    if (!stream) {
+        IG_LOG(L_ERROR) << "Could not read header of npy file " << path << std::endl;
+        return false;
+    }
+
+    static const std::regex descr_regex("'descr'\\s*:\\s*'([^']*)'");
+    static const std::regex order_regex("'fortran_order'\\s*:\\s*(True|False)");
+    static const std::regex shape_regex("'shape'\\s*:\\s*\\(([^)]*)\\)");
+
+    std::smatch descr_match, order_match, shape_match;
+    if (!std::regex_search(header, descr_match, descr_regex)
+        || !std::regex_search(header, order_match, order_regex)
+        || !std::regex_search(header, shape_match, shape_regex)) {
+        IG_LOG(L_ERROR) << "Invalid header in npy file " << path << std::endl;
+        return false;
+    }
+
+    const std::string descr = descr_match[1].str();
+    if (descr != "<f4" && descr != "<f8") {
+        IG_LOG(L_ERROR) << "Unsupported data type '" << descr << "' in npy file " << path << ". Only little endian float32 and float64 are supported" << std::endl;
+        return false;
+    }
+
+    if (order_match[1].str() == "True") {
+        IG_LOG(L_ERROR) << "Fortran ordered arrays in npy file " << path << " are not supported" << std::endl;
+        return false;
+    }
+
+    if (!parseShape(shape_match[1].str(), rows, cols)) {
+        IG_LOG(L_ERROR) << "Unsupported shape (" << shape_match[1].str() << ") in npy file " << path << ". Expected a two dimensional array" << std::endl;
+        return false;
+    }
+
+    const size_t count = rows * cols;
+    data.resize(count);
+    if (descr == "<f4") {
+        stream.read(reinterpret_cast<char*>(data.data()), count * sizeof(float));
+    } else {
+        std::vector<double> tmp(count);
+        stream.read(reinterpret_cast<char*>(tmp.data()), count * sizeof(double));
+        std::transform(tmp.begin(), tmp.end(), data.begin(), [](double v) { return (float)v; });
+    }
+
+    if (!stream) {
+        IG_LOG(L_ERROR) << "Unexpected end of npy file " << path << std::endl;
+        return false;
+    }
+
+    return true;
+}
+
+bool save(const std::filesystem::path& path, const float* data, size_t rows, size_t cols)
+{
+    std::ofstream stream(path, std::ios::binary);
+    if (!stream) {
+        IG_LOG(L_ERROR) << "Could not open " << path << " for writing" << std::endl;
+        return false;
+    }
+
+    std::string header = "{'descr': '<f4', 'fortran_order': False, 'shape': (" + std::to_string(rows) + ", " + std::to_string(cols) + "), }";
+
+    // Pad header with spaces such that the data is aligned to 64 bytes
+    const size_t preamble = MAGIC_SIZE + 2 + 2;
+    const size_t total    = preamble + header.size() + 1;
+    header.append((64 - total % 64) % 64, ' ');
+    header.push_back('\n');
+
+    const uint8 version[2] = { 1, 0 };
+    const uint8 len[2]     = { (uint8)(header.size() & 0xFF), (uint8)((header.size() >> 8) & 0xFF) };
+
+    stream.write(MAGIC, MAGIC_SIZE);
+    stream.write(reinterpret_cast<const char*>(version), 2);
+    stream.write(reinterpret_cast<const char*>(len), 2);
+    stream.write(header.data(), header.size());
+    stream.write(reinterpret_cast<const char*>(data), rows * cols * sizeof(float));
+
+    return (bool)stream;
+}
+} // namespace npy
+} // namespace IG
\ No newline at end of file
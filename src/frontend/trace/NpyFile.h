@@ -0,0 +1,14 @@
+#pragma once
+
+#include "IG_Config.h"
+
+namespace IG {
+namespace npy {
+/// Load a two dimensional array of little endian 32bit or 64bit floats stored in C order.
+/// The data is always returned as 32bit floats. Returns false if the file could not be read or has an unsupported layout
+bool load(const std::filesystem::path& path, std::vector<float>& data, size_t& rows, size_t& cols);
+
+/// Save a two dimensional array of 32bit floats stored in C order
+bool save(const std::filesystem::path& path, const float* data, size_t rows, size_t cols);
+} // namespace npy
+} // namespace IG
\ No newline at end of file
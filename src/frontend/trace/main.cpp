@@ -1,4 +1,5 @@
 #include "Logger.h"
+#include "NpyFile.h"
 #include "ProgramOptions.h"
 #include "Runtime.h"
 #include "config/Build.h"
@@ -9,10 +10,32 @@
 
 #ifndef IG_OS_WINDOWS
 #include <unistd.h>
+#else
+#include <fcntl.h>
+#include <io.h>
 #endif
 
 using namespace IG;
 
+static inline Ray make_ray(const float* data, size_t components)
+{
+    Ray ray;
+    ray.Origin(0)    = data[0];
+    ray.Origin(1)    = data[1];
+    ray.Origin(2)    = data[2];
+    ray.Direction(0) = data[3];
+    ray.Direction(1) = data[4];
+    ray.Direction(2) = data[5];
+
+    ray.Range(0) = components > 6 ? data[6] : 0;
+    ray.Range(1) = components > 7 ? data[7] : 0;
+
+    if (ray.Range(1) <= ray.Range(0))
+        ray.Range(1) = std::numeric_limits<float>::max();
+
+    return ray;
+}
+
 static std::vector<Ray> read_input(std::istream& is, bool print_prefix)
 {
     std::vector<Ray> rays;
@@ -37,26 +60,61 @@ static std::vector<Ray> read_input(std::istream& is, bool print_prefix)
             continue; // Ignore
         }
 
-        Ray ray;
-        ray.Origin(0)    = data[0];
-        ray.Origin(1)    = data[1];
-        ray.Origin(2)    = data[2];
-        ray.Direction(0) = data[3];
-        ray.Direction(1) = data[4];
-        ray.Direction(2) = data[5];
+        rays.push_back(make_ray(data.data(), data.size()));
 
-        ray.Range(0) = data.size() > 6 ? data[6] : 0;
-        ray.Range(1) = data.size() > 7 ? data[7] : 0;
+        if (is.eof())
+            break;
+    }
 
-        if (ray.Range(1) <= ray.Range(0))
-            ray.Range(1) = std::numeric_limits<float>::max();
+    return rays;
+}
 
-        rays.push_back(ray);
+/// Read a single binary frame. A frame consists of two uint32 values, the number of rays N and the number of components C (6 or 8) per ray,
+/// followed by N * C float32 values. All values are in native byte order. An empty frame or the end of the stream ends the session
+static std::vector<Ray> read_binary_input(std::istream& is)
+{
+    uint32 header[2] = { 0, 0 };
+    if (!is.read(reinterpret_cast<char*>(header), sizeof(header)))
+        return {};
+
+    const size_t count      = header[0];
+    const size_t components = header[1];
+    if (count == 0)
+        return {};
+
+    if (components != 6 && components != 8) {
+        IG_LOG(L_ERROR) << "Invalid number of components " << components << " per ray. Expected 6 or 8" << std::endl;
+        return {};
+    }
 
-        if (is.eof())
-            break;
+    std::vector<float> data(count * components);
+    if (!is.read(reinterpret_cast<char*>(data.data()), data.size() * sizeof(float))) {
+        IG_LOG(L_ERROR) << "Unexpected end of input. Expected " << count << " rays" << std::endl;
+        return {};
     }
 
+    std::vector<Ray> rays(count);
+    for (size_t i = 0; i < count; ++i)
+        rays[i] = make_ray(&data[i * components], components);
+    return rays;
+}
+
+static std::vector<Ray> read_npy_input(const std::filesystem::path& path)
+{
+    std::vector<float> data;
+    size_t count      = 0;
+    size_t components = 0;
+    if (!npy::load(path, data, count, components))
+        return {};
+
+    if (components != 6 && components != 8) {
+        IG_LOG(L_ERROR) << "Expected array of shape (N, 6) or (N, 8) in " << path << " but got (" << count << ", " << components << ")" << std::endl;
+        return {};
+    }
+
+    std::vector<Ray> rays(count);
+    for (size_t i = 0; i < count; ++i)
+        rays[i] = make_ray(&data[i * components], components);
     return rays;
 }
 
@@ -66,6 +124,35 @@ static void write_output(std::ostream& is, const float* data, size_t count, size
         is << std::scientific << data[3 * i + 0] / spp << "\t" << data[3 * i + 1] / spp << "\t" << data[3 * i + 2] / spp << std::endl;
 }
 
+/// Write a single binary frame. A frame consists of the uint32 number of rays N, followed by N * 3 float32 values in native byte order
+static void write_binary_output(std::ostream& os, const float* data, size_t count, size_t spp)
+{
+    std::vector<float> output(count * 3);
+    const float scale = 1.0f / spp;
+    for (size_t i = 0; i < output.size(); ++i)
+        output[i] = data[i] * scale;
+
+    const uint32 header = (uint32)count;
+    os.write(reinterpret_cast<const char*>(&header), sizeof(header));
+    os.write(reinterpret_cast<const char*>(output.data()), output.size() * sizeof(float));
+    os.flush();
+}
+
+static bool write_npy_output(const std::filesystem::path& path, const float* data, size_t count, size_t spp)
+{
+    std::vector<float> output(count * 3);
+    const float scale = 1.0f / spp;
+    for (size_t i = 0; i < output.size(); ++i)
+        output[i] = data[i] * scale;
+
+    return npy::save(path, output.data(), count, 3);
+}
+
+static inline bool is_npy_file(const std::filesystem::path& path)
+{
+    return to_lowercase(path.extension().generic_u8string()) == ".npy";
+}
+
 int main(int argc, char** argv)
 {
     ProgramOptions cmd(argc, argv, ApplicationType::Trace, "Command Line Tracer");
@@ -79,80 +166,125 @@ int main(int argc, char** argv)
     opts.SPI      = 1;
     opts.IsTracer = true;
 
+    const bool isInteractive = cmd.InputRay.empty();
+    const bool binaryInput   = isInteractive && cmd.BinaryRays;
+    const bool binaryOutput  = cmd.Output.empty() && cmd.BinaryRays;
+    const bool npyInput      = !isInteractive && is_npy_file(cmd.InputRay);
+    const bool npyOutput     = !cmd.Output.empty() && is_npy_file(cmd.Output);
+
+    // Keep the standard output clean for the binary protocol
+    if (binaryOutput)
+        IG_LOGGER.useStdErr(true);
+
+#ifdef IG_OS_WINDOWS
+    if (binaryInput)
+        _setmode(_fileno(stdin), _O_BINARY);
+    if (binaryOutput)
+        _setmode(_fileno(stdout), _O_BINARY);
+#endif
+
     if (!cmd.Quiet)
-        std::cout << Build::getCopyrightString() << std::endl;
+        (binaryOutput ? std::cerr : std::cout) << Build::getCopyrightString() << std::endl;
 
 #ifndef IG_OS_WINDOWS
     const bool isAtty = isatty(fileno(stdin));
 #else
     const bool isAtty = true; // Just assume it
 #endif
-    const bool isInteractive = cmd.InputRay.empty();
-    bool firstRound          = true;
+    const bool printPrefix = isAtty && !binaryInput;
+    const bool keepAlive   = isInteractive && (isAtty || binaryInput);
+
+    // The runtime is kept alive for the whole session, only the framebuffer is resized to the number of rays in each batch
+    std::unique_ptr<Runtime> runtime;
+    size_t desired_iter = 1;
+    bool firstRound     = true;
 
     while (true) {
         std::vector<Ray> rays;
-        if (isInteractive) {
-            rays = read_input(std::cin, isAtty);
+        if (binaryInput) {
+            rays = read_binary_input(std::cin);
+        } else if (isInteractive) {
+            rays = read_input(std::cin, printPrefix);
+        } else if (npyInput) {
+            rays = read_npy_input(cmd.InputRay);
         } else {
             std::ifstream stream(cmd.InputRay);
             rays = read_input(stream, false);
         }
 
         if (rays.empty()) {
-            if (firstRound || !isInteractive)
+            if (firstRound || !isInteractive) {
                 IG_LOG(L_ERROR) << "No rays given" << std::endl;
-            return EXIT_FAILURE;
-        }
-
-        opts.OverrideFilmSize = { (uint32)rays.size(), 1 };
-        std::unique_ptr<Runtime> runtime;
-        try {
-            runtime = std::make_unique<Runtime>(opts);
-        } catch (const std::exception& e) {
-            IG_LOG(L_ERROR) << e.what() << std::endl;
-            return EXIT_FAILURE;
+                return EXIT_FAILURE;
+            }
+            break;
         }
 
-        if (!runtime->loadFromFile(cmd.InputScene)) {
-            IG_LOG(L_ERROR) << "Could not load " << cmd.InputScene << std::endl;
-            return EXIT_FAILURE;
+        if (!runtime) {
+            opts.OverrideFilmSize = { (uint32)rays.size(), 1 };
+            try {
+                runtime = std::make_unique<Runtime>(opts);
+            } catch (const std::exception& e) {
+                IG_LOG(L_ERROR) << e.what() << std::endl;
+                return EXIT_FAILURE;
+            }
+
+            if (!runtime->loadFromFile(cmd.InputScene)) {
+                IG_LOG(L_ERROR) << "Could not load " << cmd.InputScene << std::endl;
+                return EXIT_FAILURE;
+            }
+
+            if (!cmd.SnapshotFile.empty()) {
+                if (runtime->saveSnapshot(cmd.SnapshotFile))
+                    IG_LOG(L_INFO) << "Snapshot saved to " << cmd.SnapshotFile << std::endl;
+            }
+
+            const size_t SPI = runtime->samplesPerIteration();
+            desired_iter     = std::max<size_t>(1, static_cast<size_t>(std::ceil(cmd.SPP.value_or(1) / (float)SPI)));
+
+            if (cmd.SPP.has_value() && (cmd.SPP.value() % SPI) != 0)
+                IG_LOG(L_WARNING) << "Given spp " << cmd.SPP.value() << " is not a multiple of the spi " << SPI << ". Using spp " << desired_iter * SPI << " instead" << std::endl;
+        } else {
+            // Resizing the framebuffer resets the runtime as well
+            if (runtime->framebufferWidth() != rays.size())
+                runtime->resizeFramebuffer(rays.size(), 1);
+            else
+                runtime->reset();
         }
 
-        const size_t SPI          = runtime->samplesPerIteration();
-        const size_t desired_iter = std::max<size_t>(1, static_cast<size_t>(std::ceil(cmd.SPP.value_or(1) / (float)SPI)));
-
-        if (cmd.SPP.has_value() && (cmd.SPP.value() % SPI) != 0)
-            IG_LOG(L_WARNING) << "Given spp " << cmd.SPP.value() << " is not a multiple of the spi " << SPI << ". Using spp " << desired_iter * SPI << " instead" << std::endl;
+        for (size_t iter = 0; iter < desired_iter; ++iter)
+            runtime->trace(rays);
 
-        std::vector<float> accum_data;
-        std::vector<float> iter_data;
-        for (size_t iter = 0; iter < desired_iter; ++iter) {
-            runtime->trace(rays, iter_data);
-
-            if (accum_data.size() != iter_data.size())
-                accum_data.resize(iter_data.size(), 0.0f);
-            for (size_t i = 0; i < iter_data.size(); ++i)
-                accum_data[i] = iter_data[i];
-        }
-
-        if (accum_data.size() != rays.size() * 3) {
-            IG_LOG(L_FATAL) << "Got trace output size " << accum_data.size() << " but expected " << rays.size() * 3 << std::endl;
+        if (runtime->framebufferWidth() != rays.size()) {
+            IG_LOG(L_FATAL) << "Got trace output size " << runtime->framebufferWidth() * 3 << " but expected " << rays.size() * 3 << std::endl;
             return EXIT_FAILURE;
         }
 
         // Extract data
-        if (cmd.Output.empty()) {
-            write_output(std::cout, accum_data.data(), rays.size(), runtime->currentIterationCount());
+        const float* data = runtime->getFramebuffer(0);
+        const size_t spp  = runtime->currentIterationCount();
+        if (binaryOutput) {
+            write_binary_output(std::cout, data, rays.size(), spp);
+        } else if (cmd.Output.empty()) {
+            write_output(std::cout, data, rays.size(), spp);
+        } else if (npyOutput) {
+            // Only the latest batch is kept
+            if (!write_npy_output(cmd.Output, data, rays.size(), spp))
+                return EXIT_FAILURE;
         } else {
             std::ofstream stream(cmd.Output, firstRound ? std::ofstream::out : (std::ofstream::out | std::ofstream::app));
-            write_output(stream, accum_data.data(), rays.size(), runtime->currentIterationCount());
+            write_output(stream, data, rays.size(), spp);
         }
 
         firstRound = false;
-        if (!isInteractive || !isAtty)
+        if (!keepAlive)
             break;
     }
 
+    if (runtime && !cmd.TimelineFile.empty()) {
+        if (runtime->saveTimeline(cmd.TimelineFile))
+            IG_LOG(L_INFO) << "Timeline saved to " << cmd.TimelineFile << std::endl;
+    }
+
     return EXIT_SUCCESS;
-}
+}
\ No newline at end of file
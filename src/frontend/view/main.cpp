@@ -88,6 +88,11 @@ int main(int argc, char** argv)
         return EXIT_FAILURE;
     }
 
+    if (!cmd.SnapshotFile.empty()) {
+        if (runtime->saveSnapshot(cmd.SnapshotFile))
+            IG_LOG(L_INFO) << "Snapshot saved to " << cmd.SnapshotFile << std::endl;
+    }
+
     timer_loading.stop();
 
     const auto def = runtime->initialCameraOrientation();
@@ -242,6 +247,11 @@ int main(int argc, char** argv)
             << "    Saving>  " << beautiful_time(timer_saving.duration_ms) << std::endl;
     }
 
+    if (!cmd.TimelineFile.empty()) {
+        if (runtime->saveTimeline(cmd.TimelineFile))
+            IG_LOG(L_INFO) << "Timeline saved to " << cmd.TimelineFile << std::endl;
+    }
+
     runtime.reset();
 
     if (!samples_stats.empty())
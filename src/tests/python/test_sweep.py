@@ -0,0 +1,51 @@
+# Sweep a float parameter with numpy values. The values have to end up in the float registry used by param(name, num)
+import json
+import unittest
+
+import numpy as np
+
+import ignis
+
+# No geometry is visible, therefore every pixel shows the radiance of the environment
+SCENE = {
+    "technique": {"type": "path", "max_depth": 2},
+    "camera": {"type": "perspective", "fov": 40, "near_clip": 0.1, "far_clip": 100},
+    "film": {"size": [8, 8]},
+    "bsdfs": [{"type": "diffuse", "name": "mat"}],
+    "shapes": [{"type": "rectangle", "name": "Plane", "transform": [1, 0, 0, 100, 0, 1, 0, 0, 0, 0, 1, 0, 0, 0, 0, 1]}],
+    "entities": [{"name": "Plane", "shape": "Plane", "bsdf": "mat"}],
+    "lights": [{"type": "env", "name": "Environment", "radiance": "param(\"scale\", 0.5)"}]
+}
+
+
+class TestSweep(unittest.TestCase):
+    def check_sweep(self, values):
+        with ignis.loadFromString(json.dumps(SCENE)) as runtime:
+            self.assertIsNotNone(runtime)
+
+            for value, image in runtime.sweep("scale", values, 2):
+                self.assertAlmostEqual(runtime.getParameter("scale"), float(value), places=5)
+                np.testing.assert_allclose(image, float(value), rtol=1e-4)
+
+    def test_float32(self):
+        self.check_sweep(np.linspace(0.1, 0.9, 5, dtype=np.float32))
+
+    def test_float64(self):
+        self.check_sweep(np.linspace(0.1, 0.9, 5, dtype=np.float64))
+
+    def test_float(self):
+        self.check_sweep([0.25, 0.7])
+
+    def test_registry(self):
+        with ignis.loadFromString(json.dumps(SCENE)) as runtime:
+            self.assertIsNotNone(runtime)
+
+            runtime.setParameter("count", 3)
+            runtime.setParameter("scale", np.float32(0.7))
+            self.assertIsInstance(runtime.getParameter("count"), int)
+            self.assertIsInstance(runtime.getParameter("scale"), float)
+            self.assertAlmostEqual(runtime.getParameter("scale"), 0.7, places=5)
+
+
+if __name__ == "__main__":
+    unittest.main()
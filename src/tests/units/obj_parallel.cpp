@@ -0,0 +1,123 @@
+#include "mesh/ObjFile.h"
+
+#include <catch2/catch_test_macros.hpp>
+#include <catch2/matchers/catch_matchers_floating_point.hpp>
+
+#include <algorithm>
+#include <array>
+#include <fstream>
+
+using namespace IG;
+
+// Quads, v//vn and a face without normals. The last line has no line end
+static const char* ObjQuads = R"(# Test file
+v 0 0 0
+v 1 0 0
+v 1 1 0
+v 0 1 0
+v 0.5 2 0.5
+v 2 0.5 0
+vn 0 0 1
+vn 0 1 0
+f 1//1 2//1 3//1 4//1
+f 4//2 3//2 5//2
+f 2//1 6//1 3//1
+f 1 2 4)";
+
+// Planar quads and a convex pentagon. The last line has no line end
+static const char* ObjPolygons = R"(v 0 0 0
+v 2 0 0
+v 3 1 0
+v 1 2 0
+v -1 1 0
+v 3 -1 0
+v 0 -2 0
+f 1 2 3 4 5
+f 1 7 6 2)";
+
+static std::filesystem::path write_obj(const std::string& name, const char* content)
+{
+    const auto path = std::filesystem::temp_directory_path() / name;
+    std::ofstream stream(path, std::ios::binary);
+    stream << content;
+    return path;
+}
+
+using VertexKey = std::array<float, 6>;
+static std::vector<VertexKey> sorted_vertices(const TriMesh& mesh)
+{
+    std::vector<VertexKey> keys;
+    for (size_t i = 0; i < mesh.vertices.size(); ++i) {
+        const auto& v = mesh.vertices[i];
+        const auto& n = mesh.normals[i];
+        keys.push_back(VertexKey{ v.x(), v.y(), v.z(), n.x(), n.y(), n.z() });
+    }
+    std::sort(keys.begin(), keys.end());
+    return keys;
+}
+
+// Triangles given by the positions of their corners, independent of the vertex order
+using TriangleKey = std::array<std::array<float, 3>, 3>;
+static std::vector<TriangleKey> sorted_triangles(const TriMesh& mesh)
+{
+    std::vector<TriangleKey> keys;
+    for (size_t i = 0; i < mesh.indices.size(); i += 4) {
+        TriangleKey key;
+        for (size_t k = 0; k < 3; ++k) {
+            const auto& v = mesh.vertices[mesh.indices[i + k]];
+            key[k]        = { v.x(), v.y(), v.z() };
+        }
+        std::sort(key.begin(), key.end());
+        keys.push_back(key);
+    }
+    std::sort(keys.begin(), keys.end());
+    return keys;
+}
+
+static void check_vertices(const TriMesh& a, const TriMesh& b)
+{
+    const auto va = sorted_vertices(a);
+    const auto vb = sorted_vertices(b);
+    REQUIRE(va.size() == vb.size());
+    for (size_t i = 0; i < va.size(); ++i) {
+        for (size_t k = 0; k < va[i].size(); ++k)
+            CHECK_THAT(va[i][k], Catch::Matchers::WithinAbs(vb[i][k], 1e-5f));
+    }
+}
+
+TEST_CASE("Parallel obj loader matches the sequential loader for quads", "[ObjFile]")
+{
+    const auto path = write_obj("ig_test_obj_quads.obj", ObjQuads);
+
+    const TriMesh seq = obj::load_sequential(path);
+    for (size_t chunk_size : { size_t(1), size_t(16), size_t(1024) }) {
+        const auto par = obj::load_parallel(path, chunk_size);
+        REQUIRE(par.has_value());
+
+        CHECK(par->faceCount() == 5);
+        CHECK(par->faceCount() == seq.faceCount());
+        check_vertices(par.value(), seq);
+        CHECK(sorted_triangles(par.value()) == sorted_triangles(seq));
+    }
+
+    std::filesystem::remove(path);
+}
+
+TEST_CASE("Parallel obj loader matches the sequential loader for n-gons", "[ObjFile]")
+{
+    const auto path = write_obj("ig_test_obj_polygons.obj", ObjPolygons);
+
+    const TriMesh seq = obj::load_sequential(path);
+    for (size_t chunk_size : { size_t(1), size_t(16), size_t(1024) }) {
+        const auto par = obj::load_parallel(path, chunk_size);
+        REQUIRE(par.has_value());
+
+        // The triangulation of n-gons may differ, but has to cover the same area
+        CHECK(par->faceCount() == 5);
+        CHECK(par->faceCount() == seq.faceCount());
+        check_vertices(par.value(), seq);
+        CHECK_THAT(par->computeArea(), Catch::Matchers::WithinRel(seq.computeArea(), 1e-5f));
+    }
+
+    std::filesystem::remove(path);
+}
\ No newline at end of file
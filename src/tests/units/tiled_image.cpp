@@ -0,0 +1,179 @@
+#include "TiledImage.h"
+
+#include <catch2/catch_test_macros.hpp>
+#include <catch2/matchers/catch_matchers_floating_point.hpp>
+
+#include <fstream>
+
+using namespace IG;
+
+constexpr size_t Width  = 100;
+constexpr size_t Height = 70;
+
+static float pattern(size_t x, size_t y, size_t c)
+{
+    return (float)((x * 7 + y * 13 + c * 29) % 256) / 64.0f;
+}
+
+// High dynamic range source with values above one
+static std::filesystem::path write_exr(const std::string& name)
+{
+    std::vector<float> rgba(Width * Height * 4);
+    for (size_t y = 0; y < Height; ++y) {
+        for (size_t x = 0; x < Width; ++x) {
+            for (size_t c = 0; c < 4; ++c)
+                rgba[4 * (y * Width + x) + c] = c == 3 ? 1.0f : pattern(x, y, c);
+        }
+    }
+
+    const auto path = std::filesystem::temp_directory_path() / name;
+    REQUIRE(Image::save(path, rgba.data(), Width, Height));
+    return path;
+}
+
+// Low dynamic range source as binary PPM
+static std::filesystem::path write_ppm(const std::string& name)
+{
+    const auto path = std::filesystem::temp_directory_path() / name;
+    std::ofstream stream(path, std::ios::binary);
+    stream << "P6\n"
+           << Width << " " << Height << "\n255\n";
+    for (size_t y = 0; y < Height; ++y) {
+        for (size_t x = 0; x < Width; ++x) {
+            for (size_t c = 0; c < 3; ++c)
+                stream.put((char)(uint8)(pattern(x, y, c) * 63.75f));
+        }
+    }
+    return path;
+}
+
+static std::filesystem::path convert(const std::filesystem::path& src)
+{
+    std::filesystem::path dst = src;
+    dst.replace_extension(".igt");
+    TiledImage::convert(src, dst);
+    return dst;
+}
+
+static void check_level0(const TiledImage& tiled, const Image& src, float tolerance)
+{
+    REQUIRE(tiled.levelCount() == 7); // 100x70 down to 1x1
+    REQUIRE(tiled.level(0).Width == Width);
+    REQUIRE(tiled.level(0).Height == Height);
+    REQUIRE(tiled.level(0).TilesX == 2);
+    REQUIRE(tiled.level(0).TilesY == 2);
+
+    const Image level0 = tiled.readLevel(0);
+    REQUIRE(level0.width == src.width);
+    REQUIRE(level0.height == src.height);
+    for (size_t i = 0; i < Width * Height * 4; ++i)
+        CHECK_THAT(level0.pixels[i], Catch::Matchers::WithinAbs(src.pixels[i], tolerance));
+
+    // The border of a tile is padded by clamping
+    std::vector<float> tile(TiledImage::TileSize * TiledImage::TileSize * 4);
+    tiled.readTile(0, 1, 1, tile.data());
+    const size_t last = TiledImage::TileSize * TiledImage::TileSize - 1;
+    for (size_t c = 0; c < 4; ++c)
+        CHECK_THAT(tile[4 * last + c], Catch::Matchers::WithinAbs(src.pixels[4 * (Width * Height - 1) + c], tolerance));
+}
+
+static void check_level1(const TiledImage& tiled, float tolerance)
+{
+    const Image level0 = tiled.readLevel(0);
+    const Image level1 = tiled.readLevel(1);
+    REQUIRE(level1.width == Width / 2);
+    REQUIRE(level1.height == Height / 2);
+
+    for (size_t y = 0; y < level1.height; ++y) {
+        for (size_t x = 0; x < level1.width; ++x) {
+            for (size_t c = 0; c < 4; ++c) {
+                const float avg = (level0.pixels[4 * ((2 * y) * Width + 2 * x) + c]
+                                   + level0.pixels[4 * ((2 * y) * Width + 2 * x + 1) + c]
+                                   + level0.pixels[4 * ((2 * y + 1) * Width + 2 * x) + c]
+                                   + level0.pixels[4 * ((2 * y + 1) * Width + 2 * x + 1) + c])
+                                  / 4;
+                CHECK_THAT(level1.pixels[4 * (y * level1.width + x) + c], Catch::Matchers::WithinAbs(avg, tolerance));
+            }
+        }
+    }
+}
+
+TEST_CASE("Tiled image of a high dynamic range source keeps floats", "[TiledImage]")
+{
+    const auto src = write_exr("ig_test_tiled.exr");
+    const auto dst = convert(src);
+
+    {
+        const TiledImage tiled(dst);
+        CHECK(tiled.format() == TiledImage::Format::RGBA32F);
+        check_level0(tiled, Image::load(src), 1e-6f);
+        check_level1(tiled, 1e-5f);
+    }
+
+    std::filesystem::remove(src);
+    std::filesystem::remove(dst);
+}
+
+TEST_CASE("Tiled image of a low dynamic range source is packed", "[TiledImage]")
+{
+    const auto src = write_ppm("ig_test_tiled.ppm");
+    const auto dst = convert(src);
+
+    {
+        const TiledImage tiled(dst);
+        CHECK(tiled.format() == TiledImage::Format::RGBA8);
+        CHECK(tiled.tileBytes() * 4 == TiledImage::tileBytes(TiledImage::Format::RGBA32F));
+        check_level0(tiled, Image::load(src), 0.5f / 255 + 1e-6f);
+        check_level1(tiled, 1.0f / 255 + 1e-6f);
+    }
+
+    std::filesystem::remove(src);
+    std::filesystem::remove(dst);
+}
+
+TEST_CASE("Tile cache evicts the least recently used tile", "[TileCache]")
+{
+    const auto src = write_exr("ig_test_tile_cache.exr");
+    const auto dst = convert(src);
+
+    {
+        const Image level0     = TiledImage(dst).readLevel(0);
+        const auto check_texel = [&](TileCache& cache, uint32 handle, size_t x, size_t y) {
+            float rgba[4];
+            cache.fetch(handle, 0, x, y, rgba);
+
+            x = std::min(x, Width - 1);
+            y = std::min(y, Height - 1);
+            for (size_t c = 0; c < 4; ++c)
+                CHECK(rgba[c] == level0.pixels[4 * (y * Width + x) + c]);
+        };
+
+        // A single shard with space for two tiles
+        const size_t tileBytes = TiledImage::tileBytes(TiledImage::Format::RGBA32F);
+        TileCache cache(2 * tileBytes, 1);
+        const uint32 handle = cache.add(std::make_unique<TiledImage>(dst));
+
+        check_texel(cache, handle, 10, 10); // Tile (0, 0)
+        check_texel(cache, handle, 70, 10); // Tile (1, 0)
+        check_texel(cache, handle, 11, 12); // Tile (0, 0) is now the most recently used
+        CHECK(cache.memoryUsage() == 2 * tileBytes);
+
+        check_texel(cache, handle, 10, 69); // Tile (0, 1) evicts tile (1, 0)
+        CHECK(cache.isCached(handle, 0, 0, 0));
+        CHECK_FALSE(cache.isCached(handle, 0, 1, 0));
+        CHECK(cache.isCached(handle, 0, 0, 1));
+        CHECK(cache.memoryUsage() == 2 * tileBytes);
+
+        // Evicted tiles are paged in again and coordinates outside are clamped
+        check_texel(cache, handle, 1000, 1000); // Tile (1, 1) evicts tile (0, 0)
+        check_texel(cache, handle, 70, 10);     // Tile (1, 0) evicts tile (0, 1)
+        CHECK_FALSE(cache.isCached(handle, 0, 0, 0));
+        CHECK_FALSE(cache.isCached(handle, 0, 0, 1));
+        CHECK(cache.isCached(handle, 0, 1, 1));
+        CHECK(cache.isCached(handle, 0, 1, 0));
+        CHECK(cache.memoryUsage() == 2 * tileBytes);
+    }
+
+    std::filesystem::remove(src);
+    std::filesystem::remove(dst);
+}
\ No newline at end of file